@@ -0,0 +1,207 @@
+# mavlink_transport_sender/async_sender.py
+"""
+asyncio mode of the sender, for embedding it in an event loop next to other I/O.
+
+Every message stream runs on its own loop timer (AsyncScheduler) and the
+serial device is written and read from fd readiness callbacks
+(transports.async_transport), so no threads are involved and the sender
+only takes the loop for the few microseconds each message needs:
+
+    sender = AsyncSender()
+    task = asyncio.create_task(sender.run())
+    ...
+    sender.stop()
+
+or standalone: python -m mavlink_transport_sender.async_sender [port] [--duration S]
+"""
+import argparse
+import asyncio
+
+from .config import (
+    TRANSPORT_TYPE, MUX_PATH, MUX_ADDR, BAUDRATE, LINK_TYPE,
+    TRANSPORT_QUEUE_SIZE, TRANSPORT_BATCH_MS, TRANSPORT_COALESCE, TRANSPORT_RECONNECT, RECEIVE_ENABLED,
+    MESSAGE_PRIORITIES, MESSAGE_MUX_ROUTES, MUX_CHANNEL_WEIGHTS,
+    RATE_CONTROL_ENABLED, RATE_CONTROL_INTERVAL, LINK_TARGET_UTILIZATION, RATE_CONTROL_MIN_FACTOR, CRITICAL_STREAMS,
+    INTERVAL_STATS_REPORT
+)
+from .coordinate_providers import BaseCoordinateProvider
+from .mavlink_manager import MavlinkManager
+from .rate_control import RateController
+from .scheduler import Scheduler, ScheduledStream, format_stats
+from .transports.base_transport import BaseTransport
+
+class AsyncScheduler(Scheduler):
+    """
+    Scheduler running every stream on its own asyncio timer (loop.call_at)
+    instead of a sleeping loop, so it shares the event loop with other
+    coroutines. Deadlines, skipping of missed periods and the statistics are
+    those of Scheduler, on the loop's clock.
+
+    An exception raised by a stream callback stops run() and is re-raised by it.
+    """
+    def __init__(self):
+        super().__init__()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handles: dict[str, asyncio.TimerHandle] = {}
+        self._stopped: asyncio.Event | None = None
+        self._error: Exception | None = None
+
+    def start(self):
+        """Anchors all registered streams to the current loop time. Must be called on the loop."""
+        self._loop = asyncio.get_running_loop()
+        self.clock = self._loop.time
+        super().start()
+
+    def _push(self, stream: ScheduledStream):
+        if self._loop is not None:
+            self._handles[stream.name] = self._loop.call_at(stream.next_deadline, self._on_timer,
+                                                            stream, stream.next_deadline)
+
+    def _on_timer(self, stream: ScheduledStream, deadline: float):
+        if stream.next_deadline != deadline or self.streams.get(stream.name) is not stream:
+            return # rescheduled or removed
+        try:
+            self._fire(stream, deadline, self.clock())
+        except Exception as e:
+            self._error = e
+            self.stop()
+            return
+        self._push(stream)
+
+    def remove_stream(self, name: str):
+        super().remove_stream(name)
+        handle = self._handles.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+
+    def run_pending(self) -> int:
+        raise RuntimeError("AsyncScheduler fires its streams from loop timers; await run() instead")
+
+    async def run(self, duration: float | None = None):
+        """
+        Runs the streams until stop() is called or, if given, until `duration`
+        seconds have elapsed. Resuming after a previous run() continues the
+        schedule, with the periods in between counted as missed.
+        """
+        if self.start_time is None:
+            self.start()
+        else:
+            self._loop = asyncio.get_running_loop()
+            self.clock = self._loop.time
+            for stream in self.streams.values():
+                self._push(stream)
+
+        self._stopped = asyncio.Event()
+        self._error = None
+        self._running = True
+        try:
+            await asyncio.wait_for(self._stopped.wait(), duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._running = False
+            for handle in self._handles.values():
+                handle.cancel()
+            self._handles.clear()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        """Makes run() return; streams firing at the same time may still run."""
+        self._running = False
+        if self._stopped is not None:
+            self._stopped.set()
+
+def build_async_transport(port: str | None = None, link_type: str = LINK_TYPE) -> BaseTransport:
+    """
+    Creates the transport selected by TRANSPORT_TYPE for the event loop: serial
+    links use transports.async_transport; the null link writes nothing and is
+    used as is. Network links are not available in asyncio mode.
+    """
+    if link_type == "serial":
+        from .transports.async_transport import AsyncRawTransport, AsyncSlipTransport
+        raw_class, slip_class = AsyncRawTransport, AsyncSlipTransport
+        port = port or MUX_PATH
+    elif link_type == "null":
+        from .transports.null_transport import NullRawTransport, NullSlipTransport
+        raw_class, slip_class = NullRawTransport, NullSlipTransport
+        port = port or "null"
+    else:
+        raise ValueError(f"LINK_TYPE '{link_type}' is not supported in asyncio mode (use serial or null)")
+
+    options = dict(baudrate=BAUDRATE, queue_size=TRANSPORT_QUEUE_SIZE, batch_ms=TRANSPORT_BATCH_MS)
+    if TRANSPORT_TYPE == "raw":
+        transport = raw_class(port, **options)
+    elif TRANSPORT_TYPE == "slip":
+        transport = slip_class(port, MUX_ADDR, priorities=MESSAGE_PRIORITIES, message_routes=MESSAGE_MUX_ROUTES,
+                               channel_weights=MUX_CHANNEL_WEIGHTS, **options)
+    else:
+        raise ValueError(f"Unknown TRANSPORT_TYPE '{TRANSPORT_TYPE}' in config.py")
+    transport.coalesce = TRANSPORT_COALESCE or TRANSPORT_RECONNECT # reconnecting sends the latest state
+    transport.reconnect = TRANSPORT_RECONNECT
+    return transport
+
+class AsyncSender:
+    """
+    The configured message streams on an asyncio event loop. Construct it
+    anywhere; run() opens the transport on the running loop and closes it
+    when it returns or is cancelled.
+    """
+    def __init__(self, transport: BaseTransport | None = None, coord_provider: BaseCoordinateProvider | None = None,
+                 report_stats: bool = True):
+        from .main import build_coordinate_provider, register_message_streams
+
+        self.transport = transport or build_async_transport()
+        self.manager = MavlinkManager(self.transport, coord_provider or build_coordinate_provider())
+        self.scheduler = AsyncScheduler()
+        register_message_streams(self.scheduler, self.manager)
+
+        self.rate_controller = None
+        if RATE_CONTROL_ENABLED:
+            self.rate_controller = RateController(self.scheduler, self.transport, CRITICAL_STREAMS,
+                                                  target_utilization=LINK_TARGET_UTILIZATION,
+                                                  min_factor=RATE_CONTROL_MIN_FACTOR)
+            self.scheduler.add_stream("RATE_CONTROL", RATE_CONTROL_INTERVAL,
+                                      lambda deadline: self.rate_controller.update(), phase=RATE_CONTROL_INTERVAL)
+        if report_stats:
+            self.scheduler.add_stream("STATS_REPORT", INTERVAL_STATS_REPORT, self._report_stats,
+                                      phase=INTERVAL_STATS_REPORT)
+
+    def _report_stats(self, deadline: float):
+        print(format_stats(self.scheduler.stats(reset=True)))
+        if self.rate_controller:
+            print(self.rate_controller.report())
+        print()
+
+    async def run(self, duration: float | None = None):
+        """Sends until stop() is called, `duration` seconds have elapsed or the task is cancelled."""
+        self.transport.open()
+        try:
+            if RECEIVE_ENABLED:
+                self.manager.add_message_handler("*", lambda msg: print(f"Received: {msg}"))
+                self.manager.start_receiving()
+            await self.scheduler.run(duration)
+        finally:
+            self.transport.close()
+
+    def stop(self):
+        self.scheduler.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the sender on an asyncio event loop.")
+    parser.add_argument("port", nargs="?", default=None, help="serial device (default: MUX_PATH)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run (default: until Ctrl-C)")
+    args = parser.parse_args()
+
+    sender = AsyncSender(build_async_transport(args.port, "serial"))
+    print(f"Sending MAVLink packets using {TRANSPORT_TYPE.upper()} transport from an asyncio event loop "
+          f"to {sender.transport.port}. Hit Ctrl-C to stop.")
+    try:
+        asyncio.run(sender.run(args.duration))
+    except IOError as e:
+        print(f"Link error: {e}")
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# mavlink_transport_sender/benchmark.py
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import TYPE_CHECKING
+
+from .transports.base_transport import hex_dump
+from .transports.null_transport import NullRawTransport
+from .transports.slip_transport import Slip, SlipTransport
+from .coordinate_providers import CyclingCoordinateProvider
+from .mavlink_manager import MavlinkManager
+from .config import MUX_ADDR, BAUDRATE
+
+if TYPE_CHECKING:
+    from .dri_receiver import DriStandIn
+
+# Largest MAVLink 2 packet: 10 header + 255 payload + 2 checksum bytes
+MAX_PACKET_LEN = 267
+
+# Allowed regression per kind of result, as a fraction of the baseline value. Timings vary
+# between runs even on an idle machine; memory use and lost frames hardly do.
+TOLERANCE_CPU = 0.25 # in-process timings (median of several runs)
+TOLERANCE_SYSTEM = 0.5 # timings involving process startup, threads or the pseudo-terminal
+TOLERANCE_MEMORY = 0.1
+
+class BenchmarkResult:
+    """
+    A single measured value, compared against a baseline by `higher_is_better`:
+    it regresses when it is worse than the baseline by more than `tolerance`.
+    """
+    def __init__(self, name: str, value: float, unit: str, higher_is_better: bool,
+                 tolerance: float = TOLERANCE_CPU):
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.tolerance = tolerance
+
+    def to_dict(self) -> dict:
+        return {"value": self.value, "unit": self.unit, "higher_is_better": self.higher_is_better,
+                "tolerance": self.tolerance}
+
+def _median_time_per_call(func, number: int, repeat: int = 7) -> float:
+    """Returns the median of the mean time per call in seconds over `repeat` runs of `number` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times)
+
+def bench_slip_encode(number: int) -> list[BenchmarkResult]:
+    """SLIP encoding throughput on typical and worst-case (all bytes escaped) packets."""
+    worst = bytes([Slip.END, Slip.ESC] * (MAX_PACKET_LEN // 2 + 1))[:MAX_PACKET_LEN]
+    typical = bytes(range(256)) + bytes(MAX_PACKET_LEN - 256)
+    results = []
+    for label, payload in (("typical", typical), ("worst_case", worst)):
+        per_call = _median_time_per_call(lambda: Slip.encode(payload), number)
+        results.append(BenchmarkResult(f"slip_encode_{label}", len(payload) / per_call / 1e6, "MB/s", True))
+    return results
+
+def bench_frame_pooled(number: int) -> list[BenchmarkResult]:
+    """SlipTransport framing of a typical packet into a pooled buffer, including its release."""
+    transport = SlipTransport("bench", MUX_ADDR)
+    packet = bytes(range(60))
+    def frame():
+        transport.pool.release(transport.encode_frame(packet, "OPEN_DRONE_ID_LOCATION"))
+    return [BenchmarkResult("slip_frame_pooled", _median_time_per_call(frame, number) * 1e6, "us", False)]
+
+def bench_send_messages(number: int) -> list[BenchmarkResult]:
+    """Cost of every MavlinkManager.send_* method with a transport that discards the packets."""
+    transport = NullRawTransport("null")
+    transport.open()
+    sender = MavlinkManager(transport, CyclingCoordinateProvider())
+    calls = {
+        "heartbeat": sender.send_heartbeat,
+        "system_time": lambda: sender.send_system_time(1000),
+        "scaled_pressure": lambda: sender.send_scaled_pressure(1000),
+        "gps_raw_int": lambda: sender.send_gps_raw_int(1_700_000_000_000_000, 1000),
+        "global_position_int": lambda: sender.send_global_position_int(1000),
+        "odid_arm_status": sender.send_odid_arm_status,
+        "odid_basic_id": sender.send_odid_basic_id,
+        "odid_location": lambda: sender.send_odid_location(1000),
+        "odid_operator_id": sender.send_odid_operator_id,
+        "odid_system": sender.send_odid_system,
+    }
+    return [
+        BenchmarkResult(f"send_{name}", _median_time_per_call(call, number) * 1e6, "us", False)
+        for name, call in calls.items()
+    ]
+
+def bench_hex_dump(number: int) -> list[BenchmarkResult]:
+    """Overhead of hex_dump() on a typical ODID LOCATION sized frame, printed to /dev/null."""
+    frame = bytes(range(60))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        per_call = _median_time_per_call(lambda: hex_dump("OPEN_DRONE_ID_LOCATION", frame), number)
+    return [BenchmarkResult("hex_dump", per_call * 1e6, "us", False)]
+
+# Latency probes per loopback latency run at most; each waits for the previous one to arrive
+LATENCY_PROBES = 500
+LATENCY_PROBE_TIMEOUT_S = 0.5
+
+def _run_loopback(send_loop) -> "DriStandIn":
+    """
+    Runs `send_loop(sender, receiver)` with a SlipTransport writing into a
+    DriStandIn pseudo-terminal and returns the receiver once it has read
+    everything that was in flight.
+    """
+    from .dri_receiver import DriStandIn
+
+    receiver = DriStandIn("slip", MUX_ADDR)
+    transport = SlipTransport(receiver.port, MUX_ADDR, baudrate=BAUDRATE, writer_thread=True)
+    sender = MavlinkManager(transport, CyclingCoordinateProvider())
+    receiver.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        transport.open()
+        send_loop(sender, receiver)
+        transport.close()
+    time.sleep(0.2) # let the receiver read what is still in flight
+    receiver.stop()
+    return receiver
+
+def bench_loopback(duration: float) -> list[BenchmarkResult]:
+    """
+    End-to-end frames/sec and latency through a SlipTransport into a DriStandIn
+    pseudo-terminal, in two runs of `duration`: throughput with SYSTEM_TIME
+    packets sent as fast as possible, and latency with one SYSTEM_TIME probe in
+    flight at a time, so frames never wait in the writer queue.
+    """
+    def flood(sender, receiver):
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            sender.send_system_time(int((time.monotonic() - start) * 1e3))
+
+    def probe(sender, receiver):
+        start = time.monotonic()
+        for _ in range(LATENCY_PROBES):
+            if time.monotonic() - start >= duration:
+                break
+            stats = receiver.messages.get("SYSTEM_TIME")
+            received = stats.count if stats else 0
+            sender.send_system_time(int((time.monotonic() - start) * 1e3))
+            deadline = time.monotonic() + LATENCY_PROBE_TIMEOUT_S
+            while time.monotonic() < deadline:
+                stats = receiver.messages.get("SYSTEM_TIME")
+                if stats and stats.count > received:
+                    break
+                time.sleep(0.0002)
+
+    receiver = _run_loopback(flood)
+    stats = receiver.messages.get("SYSTEM_TIME")
+    received = stats.count if stats else 0
+    lost = receiver.dropped_packets + receiver.corrupt_frames
+
+    receiver = _run_loopback(probe)
+    stats = receiver.messages.get("SYSTEM_TIME")
+    latency_ms = stats.latency_sum / stats.latency_count * 1e3 if stats and stats.latency_count else 0.0
+    lost += receiver.dropped_packets + receiver.corrupt_frames
+    return [
+        BenchmarkResult("loopback_frames_per_s", received / duration, "frames/s", True, TOLERANCE_SYSTEM),
+        BenchmarkResult("loopback_latency", latency_ms, "ms", False, TOLERANCE_SYSTEM),
+        BenchmarkResult("loopback_lost_frames", lost, "frames", False),
+    ]
+
+# Run in a fresh interpreter: loads a dialect (or the sender) and prints "<seconds> <peak RSS in KiB>".
+# The peak RSS is read from VmHWM: on Linux ru_maxrss survives fork and exec, so a child started
+# from a large parent would report the parent's peak. Other systems fall back to ru_maxrss.
+STARTUP_SCRIPT = """
+import resource, sys, time
+
+def peak_rss_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+start = time.perf_counter()
+if sys.argv[1] == "sender":
+    from {package}.main import build_coordinate_provider
+    from {package}.mavlink_manager import MavlinkManager
+    from {package}.transports.null_transport import NullRawTransport
+    MavlinkManager(NullRawTransport("null"), build_coordinate_provider())
+else:
+    from {package}.dialect import load_dialect
+    load_dialect(sys.argv[1])
+print(time.perf_counter() - start, peak_rss_kib())
+"""
+
+def bench_startup(repeat: int = 5) -> list[BenchmarkResult]:
+    """
+    Startup time (best of `repeat`) and peak RSS of a fresh interpreter loading
+    the minimal dialect, the full common dialect, and the whole configured sender.
+    """
+    package = __package__ or "mavlink_transport_sender"
+    env = dict(os.environ)
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [parent_dir, env.get("PYTHONPATH")]))
+    script = STARTUP_SCRIPT.format(package=package)
+
+    results = []
+    for target in ("minimal", "common", "sender"):
+        times = []
+        rss_kib = 0
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", script, target], env=env, check=True,
+                                    capture_output=True, text=True).stdout.split()
+            times.append(float(output[-2]))
+            rss_kib = int(output[-1])
+        results.append(BenchmarkResult(f"startup_{target}", statistics.median(times) * 1e3, "ms", False,
+                                       TOLERANCE_SYSTEM))
+        results.append(BenchmarkResult(f"startup_{target}_rss", rss_kib / 1024, "MiB", False, TOLERANCE_MEMORY))
+    return results
+
+def run_all(number: int, loopback_duration: float) -> list[BenchmarkResult]:
+    results = []
+    results += bench_slip_encode(number)
+    results += bench_frame_pooled(number)
+    results += bench_send_messages(number)
+    results += bench_hex_dump(number)
+    results += bench_startup()
+    if loopback_duration > 0:
+        results += bench_loopback(loopback_duration)
+    return results
+
+def compare(results: list[BenchmarkResult], baseline: dict, threshold: float | None = None) -> list[str]:
+    """
+    Returns a description of every result that is worse than the baseline by more
+    than its tolerance (from the baseline, else the result's own), or by more than
+    `threshold` for all results if it is given.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        tolerance = threshold if threshold is not None else base.get("tolerance", result.tolerance)
+        if base["value"] == 0:
+            # No relative change from zero; any increase of a lower-is-better value (e.g. lost frames) counts
+            if not result.higher_is_better and result.value > 0:
+                regressions.append(f"{result.name}: 0 -> {result.value:.3f} {result.unit}")
+            continue
+        change = (result.value - base["value"]) / abs(base["value"])
+        worse_by = -change if result.higher_is_better else change
+        if worse_by > tolerance:
+            regressions.append(f"{result.name}: {base['value']:.3f} -> {result.value:.3f} {result.unit} "
+                               f"({worse_by * 100:.1f}% worse)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the encode, frame and transport hot paths.")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--loopback", type=float, default=2.0, help="loopback test duration in seconds (0 to skip)")
+    parser.add_argument("--output", help="write results as JSON to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="JSON results to compare against, e.g. benchmarks/baseline.json")
+    parser.add_argument("--save-baseline", help="write results as the new baseline to this file")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed regression of every result as a fraction (default: per result)")
+    args = parser.parse_args()
+
+    results = run_all(args.number, args.loopback)
+    report = {r.name: r.to_dict() for r in results}
+
+    for r in results:
+        print(f"{r.name:<28}{r.value:>14.3f} {r.unit}", file=sys.stderr)
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    elif args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions beyond the tolerance:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions beyond the tolerance.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import struct
+import threading
+import time
+from collections import deque
+from .clock import Clock, SYSTEM_CLOCK
+
+TLOG_EXTENSION = ".tlog"
+FRAMES_EXTENSION = ".frames"
+
+# A .tlog record is an 8-byte big-endian UNIX timestamp in microseconds followed
+# by the MAVLink packet, which is the format pymavlink's mavutil reads.
+TLOG_RECORD_HEADER = struct.Struct(">Q")
+# A .frames record additionally stores the frame length, as framed bytes (MUX + SLIP)
+# cannot be delimited by parsing them as MAVLink.
+FRAMES_RECORD_HEADER = struct.Struct(">QH")
+
+class _RotatingFile:
+    """Append-only file that is replaced by a new one after a size or age limit."""
+    def __init__(self, directory: str, prefix: str, extension: str,
+                 max_bytes: int, max_seconds: float, buffer_size: int, clock: Clock = SYSTEM_CLOCK):
+        self.directory = directory
+        self.prefix = prefix
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.file = None
+        self.path: str | None = None
+        self.size = 0
+        self.opened_at = 0.0
+        self.index = 0
+
+    def write(self, data: bytes | bytearray):
+        if self.file is None or self._needs_rotation():
+            self._rotate()
+        self.file.write(data)
+        self.size += len(data)
+
+    def _needs_rotation(self) -> bool:
+        return ((self.max_bytes and self.size >= self.max_bytes) or
+                (self.max_seconds and self.clock.monotonic() - self.opened_at >= self.max_seconds))
+
+    def _rotate(self):
+        self.close()
+        # UTC, so file names do not depend on the host's time zone (e.g. for corpora)
+        stamp = time.strftime("%Y%m%d-%H%M%SZ", time.gmtime(self.clock.time()))
+        self.path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{self.index:03d}{self.extension}")
+        self.index += 1
+        self.file = open(self.path, "ab", buffering=self.buffer_size)
+        self.size = 0
+        self.opened_at = self.clock.monotonic()
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class CaptureRecorder:
+    """
+    Records every packet written by a transport, with timestamps, to rotating
+    pymavlink-compatible .tlog files and optionally the exact wire frames to .frames files.
+
+    record() only appends to an in-memory queue; serialization and file I/O are
+    done in batches by a background thread, so recording costs the sender close
+    to nothing even at full rate. Timestamps and file rotation follow `clock`.
+    """
+    def __init__(self, directory: str, prefix: str = "capture", record_frames: bool = False,
+                 max_bytes: int = 256 * 1024 * 1024, max_seconds: float = 3600.0,
+                 buffer_size: int = 1024 * 1024, flush_interval: float = 1.0,
+                 max_pending: int = 100000, clock: Clock = SYSTEM_CLOCK):
+        self.directory = directory
+        self.clock = clock
+        self.record_frames = record_frames
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._tlog = _RotatingFile(directory, prefix, TLOG_EXTENSION, max_bytes, max_seconds, buffer_size, clock)
+        self._frames = (_RotatingFile(directory, prefix, FRAMES_EXTENSION, max_bytes, max_seconds, buffer_size, clock)
+                        if record_frames else None)
+
+        self._pending: deque[tuple[float, bytes, bytes]] = deque()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._running = False
+
+        self.records = 0
+        self.dropped = 0
+
+    def start(self, background: bool = True):
+        """
+        Creates the capture directory and starts the writer thread. With
+        `background=False` no thread is started and the caller writes the
+        recorded packets with flush(), e.g. to never drop any.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._running = True
+        if background:
+            self._thread = threading.Thread(target=self._writer_loop, name="capture-writer", daemon=True)
+            self._thread.start()
+        print(f"Capturing sent packets to {self.directory}")
+
+    def flush(self):
+        """Writes the recorded packets in the calling thread (only without the writer thread)."""
+        self._drain()
+
+    def stop(self):
+        """Writes out everything recorded so far and closes the files."""
+        if not self._running:
+            return
+        self._running = False
+        if self._thread is not None:
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        else:
+            self._drain()
+        self._tlog.close()
+        if self._frames is not None:
+            self._frames.close()
+        print(f"Capture stopped: {self.records} packets recorded, {self.dropped} dropped")
+
+    def record(self, raw_mavlink_packet: bytes, frame: bytes):
+        """Queues a sent packet and its wire frame for writing. Safe to call from any thread."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((self.clock.time(), raw_mavlink_packet, frame))
+
+    def _writer_loop(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        pending = self._pending
+        if not pending:
+            return
+
+        tlog_buf = bytearray()
+        frames_buf = bytearray() if self._frames is not None else None
+        count = 0
+        while pending:
+            timestamp, raw_mavlink_packet, frame = pending.popleft()
+            timestamp_us = int(timestamp * 1e6)
+            tlog_buf += TLOG_RECORD_HEADER.pack(timestamp_us)
+            tlog_buf += raw_mavlink_packet
+            if frames_buf is not None:
+                frames_buf += FRAMES_RECORD_HEADER.pack(timestamp_us, len(frame))
+                frames_buf += frame
+            count += 1
+
+        self._tlog.write(tlog_buf)
+        self._tlog.flush()
+        if frames_buf is not None:
+            self._frames.write(frames_buf)
+            self._frames.flush()
+        self.records += count
@@ -0,0 +1,54 @@
+import time
+from abc import ABC, abstractmethod
+
+class Clock(ABC):
+    """Source of time for scheduling and message timestamps."""
+    @abstractmethod
+    def time(self) -> float:
+        """UNIX time in seconds, used for message timestamps."""
+        pass
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Seconds on a clock that never goes backwards, used for scheduling."""
+        pass
+
+    @abstractmethod
+    def sleep(self, seconds: float):
+        pass
+
+class SystemClock(Clock):
+    """The machine's wall clock and monotonic clock."""
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class SimulatedClock(Clock):
+    """
+    Virtual clock for generating traffic faster than real time.
+
+    sleep() advances the clock instead of waiting, so a Scheduler driven by
+    it (Scheduler(clock=c.monotonic, sleep=c.sleep)) runs the whole schedule
+    as fast as the CPU allows, and every deadline and timestamp depends only
+    on `start_unix` and the schedule, not on how long sending took.
+    """
+    def __init__(self, start_unix: float = 1_700_000_000.0):
+        self.start_unix = start_unix
+        self.elapsed = 0.0
+
+    def time(self) -> float:
+        return self.start_unix + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.elapsed += seconds
+
+SYSTEM_CLOCK = SystemClock()
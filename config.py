@@ -8,15 +8,191 @@ MUX_PATH = "/dev/ttyACM0"
 MUX_ADDR = 0xAB # The custom mux address byte that precedes a SLIP message (only used for SLIP)
 BAUDRATE = 500000
 
+# Link carrying the frames: "serial" (MUX_PATH), "udp"/"tcp" to NETWORK_ADDRESS, e.g. a local
+# MAVLink router, ground station or test harness, or "null" to discard them (e.g. with capture).
+# TRANSPORT_TYPE selects the framing on all of them.
+LINK_TYPE = "serial"
+NETWORK_ADDRESS = "127.0.0.1:14550"
+# Link budget of network links in bit/s, used for batch sizing and rate control instead of BAUDRATE
+NETWORK_BITRATE = 100_000_000
+
+# The optional subsystems below (writer thread, coalescing, reconnects, rate control, metrics,
+# receiving) are off by default, so a plain run sends like the original sender: each frame is
+# written directly from the scheduler.
+
+# Write frames from a background thread; frames ready in the same tick are
+# coalesced into one write and one flush. The queue is bounded to TRANSPORT_QUEUE_SIZE frames.
+# Multi-device mode and TCP links always use it.
+TRANSPORT_WRITER_THREAD = False
+TRANSPORT_QUEUE_SIZE = 256
+# Each write carries at most about this much link time, so frames queue up (and can be
+# prioritized) while the link is saturated instead of piling up in the kernel tty buffer
+TRANSPORT_BATCH_MS = 5
+# Keep only the newest queued frame of each message type: while the link is slow or down, a newer
+# frame (e.g. a GPS fix) replaces the queued one instead of waiting behind it. Needs a queue
+# (TRANSPORT_WRITER_THREAD or asyncio mode); the virtual fleet always queues every frame.
+TRANSPORT_COALESCE = False
+# Reopen the serial device with backoff when it disappears (e.g. USB re-enumeration) instead of
+# stopping. Implies TRANSPORT_COALESCE: frames wait in the queue meanwhile, one per message type,
+# and the latest state is sent as soon as it is back. Where every frame is queued (virtual fleet),
+# a full queue drops its oldest frames instead of blocking. Without a queue, frames written
+# while the device is gone are dropped.
+TRANSPORT_RECONNECT = False
+
+# --- MUX Channel Scheduling (SLIP only, requires TRANSPORT_WRITER_THREAD) ---
+# Priority per message type: 0 = critical, 1 = normal (default), 2 = low.
+# When the link is saturated, more important messages are sent first and evict less important ones.
+MESSAGE_PRIORITIES = {
+    "OPEN_DRONE_ID_LOCATION": 0,
+    "OPEN_DRONE_ID_BASIC_ID": 0,
+    "OPEN_DRONE_ID_SYSTEM": 0,
+    "OPEN_DRONE_ID_OPERATOR_ID": 0,
+    "OPEN_DRONE_ID_ARM_STATUS": 1,
+    "HEARTBEAT": 1,
+    "GPS_RAW_INT": 1,
+    "GLOBAL_POSITION_INT": 1,
+    "SCALED_PRESSURE": 2,
+    "SYSTEM_TIME": 2,
+}
+# Message types sent to a MUX address other than MUX_ADDR, e.g. {"SCALED_PRESSURE": 0xAC}
+MESSAGE_MUX_ROUTES = {}
+# Relative share of the link per MUX address when several channels have frames of the same priority
+MUX_CHANNEL_WEIGHTS = {MUX_ADDR: 1}
+
+# --- Link Rate Control ---
+# Slow down non-critical streams when their frames (including SLIP/MUX overhead) need more than
+# LINK_TARGET_UTILIZATION of BAUDRATE, or when the link shows backpressure (bytes waiting in the
+# tty output buffer, a full writer queue, slow or short writes). Rates are restored once the link recovers.
+RATE_CONTROL_ENABLED = False
+RATE_CONTROL_INTERVAL = 1.0
+LINK_TARGET_UTILIZATION = 0.8
+# Lowest fraction of their configured rate the non-critical streams are slowed down to
+RATE_CONTROL_MIN_FACTOR = 0.1
+# Streams that always keep their configured rate
+CRITICAL_STREAMS = [
+    "OPEN_DRONE_ID_LOCATION",
+    "OPEN_DRONE_ID_BASIC_ID",
+    "OPEN_DRONE_ID_SYSTEM",
+    "OPEN_DRONE_ID_OPERATOR_ID",
+    "HEARTBEAT",
+]
+
+# --- Metrics and Debug Output ---
+# Count messages/bytes per type and measure encode, write and scheduling latencies.
+# A snapshot is printed with the stats report; with METRICS_HTTP_PORT set, the metrics are
+# also served in Prometheus text format at http://METRICS_HTTP_HOST:METRICS_HTTP_PORT/metrics
+METRICS_ENABLED = False
+METRICS_HTTP_HOST = "127.0.0.1"
+METRICS_HTTP_PORT = None # e.g. 9464 to serve the endpoint
+# Print a hex dump of every frame sent (slow; for debugging only)
+DEBUG_HEX_DUMP = False
+
+# --- MAVLink Dialect ---
+# "minimal" builds packets with a generated dialect containing only the messages this sender
+# uses (cached in DIALECT_CACHE_DIR, default: generated/ next to this file), which starts
+# faster and uses less memory than pymavlink's full "common" dialect. Received messages
+# outside the dialect are reported as UNKNOWN_<id>; add their names to DIALECT_EXTRA_MESSAGES.
+MAVLINK_DIALECT = "minimal"
+DIALECT_EXTRA_MESSAGES = []
+DIALECT_CACHE_DIR = None
+
+# Read and parse the MAVLink messages the DRI unit sends back and print them (one console line
+# per message, from the reader; for debugging only)
+RECEIVE_ENABLED = False
+
+# --- Capture Configuration ---
+# Record every sent packet with its timestamp to pymavlink-compatible .tlog files in CAPTURE_DIR.
+# With CAPTURE_RAW_FRAMES the exact wire frames (MUX + SLIP) are also written to .frames files.
+# Files are rotated after CAPTURE_MAX_BYTES bytes or CAPTURE_MAX_SECONDS seconds.
+CAPTURE_ENABLED = False
+CAPTURE_DIR = "captures"
+CAPTURE_RAW_FRAMES = False
+CAPTURE_MAX_BYTES = 256 * 1024 * 1024
+CAPTURE_MAX_SECONDS = 3600
+
+# --- Replay Configuration ---
+# Set REPLAY_FILE to a .tlog or .frames capture to stream it instead of generating messages.
+# REPLAY_SPEED: 1.0 = original timing, N = N times faster, 0 = as fast as the link allows
+REPLAY_FILE = None
+REPLAY_SPEED = 1.0
+REPLAY_LOOP = False
+
 # UAS ID and OPERATOR ID
 DEMO_UAS_ID = "DEMO_UAS_XY123456789"
 DEMO_OPERATOR_ID = "DEMO_OPID_X123456789"
 
+# --- Multi-Device Mode ---
+# Drive several DRI units from one process with a shared scheduler. Each entry needs a "port" and
+# may set "name", "uas_id", "operator_id", "system_id", "coordinate_source" and "link_type";
+# anything left out uses the single-device settings. Empty = single device on MUX_PATH.
+# e.g. [{"port": "/dev/ttyACM0", "uas_id": "DEMO_UAS_0001"}, {"port": "/dev/ttyACM1", "uas_id": "DEMO_UAS_0002"}]
+DEVICES = []
+
+# --- Virtual Fleet (python -m mavlink_transport_sender.fleet) ---
+# Simulates FLEET_SIZE UAS with their own system/UAS/operator IDs, each flying the trajectory of
+# COORDINATE_SOURCE from its own start point, phase and speed, and sends their ODID messages.
+FLEET_SIZE = 200 # up to 255 for a distinct system ID per UAS (larger fleets also use component IDs)
+FLEET_WORKERS = 2 # encoding processes; 0 = encode in the main process
+FLEET_CHUNK_SIZE = 100 # UAS per encoding task
+FLEET_SEED = 1
+FLEET_SPREAD_M = 1000.0 # start points are spread this far north/east/south/west of the trajectory
+FLEET_UAS_ID_PREFIX = "FLEET"
+FLEET_OPERATOR_ID_PREFIX = "FLEETOP"
+# Bytes/s written to each output; None = LINK_TARGET_UTILIZATION of its link (BAUDRATE or NETWORK_BITRATE)
+FLEET_OUTPUT_BYTES_PER_S = None
+# Encoded packets waiting for an output are dropped, oldest first, beyond this much link time
+FLEET_MAX_BACKLOG_S = 0.5
+
+# --- Corpus Generation (python -m mavlink_transport_sender.corpus) ---
+# Runs the message schedule on a simulated clock as fast as the CPU allows and captures it to
+# CORPUS_DIR. The simulated time starts at CORPUS_START_UNIX plus a whole number of seconds
+# picked by the seed; the same seed and configuration always produce the same bytes.
+CORPUS_DIR = "corpus"
+CORPUS_START_UNIX = 1_700_000_000
+
 # --- Coordinate Data Source Configuration ---
 # Set to "fixed" to use a single fixed GPS coordinate
-# Set to "cycling" to cycle through the pre-defined logo coordinates
+# Set to "cycling" to fly along the pre-defined logo coordinates
+# Set to "circle" to fly a circle around the base origin
+# Set to "survey" to fly a lawnmower survey pattern starting at the base origin
+# Set to "waypoints" to fly through WAYPOINTS_E7
+# Set to "file" to replay the flight track recorded in FLIGHT_LOG_FILE
+# Set to "shared" to send the live position another process publishes in shared memory
 COORDINATE_SOURCE = "cycling"
 
+# --- Flight Log Configuration (COORDINATE_SOURCE = "file") ---
+# GPX track points, CSV rows (header with time, lat, lon and optionally alt, speed, heading)
+# or NMEA RMC/GGA sentences. The file is read lazily, so tracks of any length can be replayed.
+FLIGHT_LOG_FILE = None
+FLIGHT_LOG_FORMAT = None # "gpx", "csv" or "nmea"; None = from the file extension
+FLIGHT_LOG_LOOP = True # start over at the end of the track, else hold the last position
+FLIGHT_LOG_START_S = 0.0 # Seconds into the track at which the run starts
+# Minimum spacing of the entries of the sparse time index built while the track is read
+FLIGHT_LOG_INDEX_INTERVAL_S = 30.0
+
+# --- Shared Position Feed (COORDINATE_SOURCE = "shared") ---
+# Name of the multiprocessing.shared_memory block the position is read from at every tick;
+# the block layout and a writer are in shared_position.py
+SHARED_POSITION_NAME = "mavlink_position"
+# A feed not updated for this long is reported as stalled (its last position is kept)
+SHARED_POSITION_TIMEOUT_S = 1.0
+
+# --- Trajectory Configuration ---
+# Positions are looked up by time, so all messages sent in one tick report the same position
+TRAJECTORY_ALT_M = 250.0 # Flight altitude above MSL
+HOME_ALT_M = 245.0 # Altitude of the home/take-off point above MSL
+TRAJECTORY_SPEED_MS = 5.0 # Ground speed for circle, survey and waypoints
+LOGO_SEGMENT_DURATION_S = 3.0 # Time spent flying between two consecutive logo points
+CIRCLE_RADIUS_M = 100.0
+SURVEY_WIDTH_M = 200.0
+SURVEY_HEIGHT_M = 300.0
+SURVEY_SPACING_M = 25.0
+WAYPOINTS_E7 = [ # Absolute (lon_e7, lat_e7) waypoints, flown as a closed loop
+    (int(14.4378 * 1e7), int(50.0755 * 1e7)),
+    (int(14.4398 * 1e7), int(50.0765 * 1e7)),
+    (int(14.4418 * 1e7), int(50.0755 * 1e7)),
+]
+
 # --- Coordinate Data ---
 # Fixed coordinates for raw mode
 FIXED_LAT_E7 = int(50.0755 * 1e7)
@@ -45,6 +221,7 @@ LOGO_RELATIVE_COORDS_RAW = [
 ]
 
 # --- Message Sending Intervals (in seconds) ---
+# Each interval is the period of its own stream; streams are scheduled independently
 INTERVAL_SCALED_PRESSURE = 0.1
 INTERVAL_GPS_RAW_INT = 0.1
 INTERVAL_SYSTEM_TIME = 0.1
@@ -55,4 +232,6 @@ INTERVAL_ODID_BASIC_ID = 0.1
 INTERVAL_ODID_LOCATION = 0.1
 INTERVAL_ODID_OPERATOR_ID = 0.1
 INTERVAL_ODID_SYSTEM = 0.1
-INTERVAL_MAIN_LOOP_PAUSE = 0.5
+
+# Period of the scheduler statistics report (rates, jitter, missed deadlines)
+INTERVAL_STATS_REPORT = 5.0
@@ -1,5 +1,26 @@
+import math
+import time
 from abc import ABC, abstractmethod
-from .config import LOGO_RELATIVE_COORDS_RAW, BASE_LAT_E7, BASE_LON_E7, FIXED_LAT_E7, FIXED_LON_E7
+from typing import NamedTuple, TYPE_CHECKING
+from .config import (
+    LOGO_RELATIVE_COORDS_RAW, BASE_LAT_E7, BASE_LON_E7, FIXED_LAT_E7, FIXED_LON_E7,
+    TRAJECTORY_ALT_M, HOME_ALT_M, LOGO_SEGMENT_DURATION_S
+)
+
+if TYPE_CHECKING:
+    from .trajectory import Trajectory # imported where needed; trajectory imports this module
+
+EARTH_RADIUS_M = 6378137.0
+METERS_PER_E7 = EARTH_RADIUS_M * math.pi / 180.0 / 1e7 # metres per 1e-7 degree of latitude
+
+class PositionSample(NamedTuple):
+    """Vehicle state at one point in time."""
+    lon_e7: int
+    lat_e7: int
+    alt_m: float # Altitude above MSL
+    speed_ms: float # Horizontal ground speed
+    heading_deg: float # Course over ground, 0 = north, clockwise
+    climb_ms: float # Vertical rate, positive up
 
 class BaseCoordinateProvider(ABC):
     """Abstract base class for coordinate providers."""
@@ -8,11 +29,25 @@ class BaseCoordinateProvider(ABC):
         """Returns the next absolute (lon_e7, lat_e7) coordinate."""
         pass
 
+    @abstractmethod
+    def get_state_at(self, t: float) -> PositionSample:
+        """Returns the vehicle state `t` seconds after the start of the run."""
+        pass
+
+    def get_coordinate_at(self, t: float) -> tuple[int, int]:
+        """Returns the absolute (lon_e7, lat_e7) coordinate `t` seconds after the start of the run."""
+        sample = self.get_state_at(t)
+        return sample.lon_e7, sample.lat_e7
+
     @abstractmethod
     def get_current_operator_location(self) -> tuple[int, int]:
         """Returns the operator's fixed base location (lon_e7, lat_e7)."""
         pass
 
+    def get_home_altitude(self) -> float:
+        """Returns the altitude of the take-off point above MSL, the reference for heights above ground."""
+        return HOME_ALT_M
+
 class FixedCoordinateProvider(BaseCoordinateProvider):
     """Provides a fixed set of coordinates."""
     def __init__(self):
@@ -20,25 +55,62 @@ class FixedCoordinateProvider(BaseCoordinateProvider):
         self.lat_e7 = FIXED_LAT_E7
         self.operator_lon_e7 = BASE_LON_E7 # Default operator location
         self.operator_lat_e7 = BASE_LAT_E7
+        self._sample = PositionSample(self.lon_e7, self.lat_e7, TRAJECTORY_ALT_M, 0.0, 0.0, 0.0)
 
     def get_next_coordinate(self) -> tuple[int, int]:
         """Returns the fixed coordinate."""
         return self.lon_e7, self.lat_e7
 
+    def get_state_at(self, t: float) -> PositionSample:
+        """Returns the fixed coordinate, hovering."""
+        return self._sample
+
     def get_current_operator_location(self) -> tuple[int, int]:
         """Returns the fixed operator location."""
         return self.operator_lon_e7, self.operator_lat_e7
 
-class CyclingCoordinateProvider(BaseCoordinateProvider):
-    """Cycles through a predefined list of relative coordinates."""
-    def __init__(self):
+class TrajectoryCoordinateProvider(BaseCoordinateProvider):
+    """Provides positions along a precomputed, time-indexed Trajectory."""
+    def __init__(self, trajectory: "Trajectory"):
+        self.trajectory = trajectory
         self.current_coord_index = 0
-        self.coords_list = LOGO_RELATIVE_COORDS_RAW
-        self.num_coords = len(self.coords_list)
 
         self.operator_lon_e7 = BASE_LON_E7 # Default operator location
         self.operator_lat_e7 = BASE_LAT_E7
 
+    def get_next_coordinate(self) -> tuple[int, int]:
+        """
+        Returns the next trajectory sample regardless of time, and advances the index.
+        """
+        i = self.current_coord_index
+        self.current_coord_index = (i + 1) % len(self.trajectory)
+        return int(self.trajectory.lon_e7[i]), int(self.trajectory.lat_e7[i])
+
+    def get_state_at(self, t: float) -> PositionSample:
+        """Returns the interpolated state on the trajectory at time `t`."""
+        return PositionSample(*self.trajectory.sample(t))
+
+    def get_current_operator_location(self) -> tuple[int, int]:
+        """Returns the base operator location in 1e7 degrees."""
+        return self.operator_lon_e7, self.operator_lat_e7
+
+class CyclingCoordinateProvider(TrajectoryCoordinateProvider):
+    """
+    Flies the predefined logo path: the relative coordinates become waypoints
+    one LOGO_SEGMENT_DURATION_S apart, and positions are interpolated by time
+    along them, looping. get_next_coordinate() still steps through the raw
+    waypoints one per call.
+    """
+    def __init__(self):
+        from .trajectory import Trajectory
+
+        self.coords_list = LOGO_RELATIVE_COORDS_RAW
+        self.num_coords = len(self.coords_list)
+        waypoints = [self._convert_relative_to_abs_e7(lon, lat) for lon, lat in self.coords_list]
+        super().__init__(Trajectory.from_waypoints(
+            waypoints, alt_m=TRAJECTORY_ALT_M, segment_duration_s=LOGO_SEGMENT_DURATION_S
+        ))
+
     def _convert_relative_to_abs_e7(self, relative_lon_raw, relative_lat_raw):
         """
         Converts raw relative integer coordinates (already in 1e7 degrees delta)
@@ -54,13 +126,119 @@ class CyclingCoordinateProvider(BaseCoordinateProvider):
         and advances the index.
         """
         relative_lon_raw, relative_lat_raw = self.coords_list[self.current_coord_index]
-        
+
         abs_lon_e7, abs_lat_e7 = self._convert_relative_to_abs_e7(relative_lon_raw, relative_lat_raw)
-        
+
         self.current_coord_index = (self.current_coord_index + 1) % self.num_coords
-        
+
         return abs_lon_e7, abs_lat_e7
 
+class FlightLogCoordinateProvider(BaseCoordinateProvider):
+    """
+    Replays a recorded GPX, CSV or NMEA flight track, read lazily from the file
+    (see flight_log.FlightLog). Altitude, speed and course come from the log
+    where it has them. The operator stands at the first position of the track,
+    which is also the take-off point.
+    """
+    def __init__(self, path: str, fmt: str | None = None, loop: bool = True, start_s: float = 0.0,
+                 index_interval_s: float = 30.0):
+        from .flight_log import FlightLog, FlightLogCursor
+
+        self.log = FlightLog(path, fmt, index_interval_s)
+        self.cursor = FlightLogCursor(self.log, loop, default_alt_m=TRAJECTORY_ALT_M)
+        self.start_s = start_s # offset into the track at the start of the run
+        self._next_offset = self.log.seek(self.log.start_time + start_s)
+
+        first = self.log.first
+        self.operator_lon_e7 = first.lon_e7
+        self.operator_lat_e7 = first.lat_e7
+        self.home_alt_m = TRAJECTORY_ALT_M if first.alt_m is None else first.alt_m
+
+    def get_next_coordinate(self) -> tuple[int, int]:
+        """Returns the next sample of the log regardless of time, starting over at the end."""
+        read = self.log.read(self._next_offset) or self.log.read(0)
+        sample, self._next_offset = read
+        return sample.lon_e7, sample.lat_e7
+
+    def get_state_at(self, t: float) -> PositionSample:
+        """Returns the state interpolated between the log samples around `t`."""
+        return PositionSample(*self.cursor.sample(self.start_s + t))
+
+    def get_current_operator_location(self) -> tuple[int, int]:
+        """Returns the first position of the track."""
+        return self.operator_lon_e7, self.operator_lat_e7
+
+    def get_home_altitude(self) -> float:
+        """Returns the altitude of the first sample of the track."""
+        return self.home_alt_m
+
+class SharedPositionCoordinateProvider(BaseCoordinateProvider):
+    """
+    Reports the latest fix an external process publishes into a shared memory
+    block (see shared_position.py), read once per scheduler tick. Until the block
+    exists and holds a fix, the vehicle hovers at the base origin. A feed that
+    stops updating for `timeout_s` is reported, and its last fix is held.
+    """
+    ATTACH_RETRY_S = 1.0
+
+    def __init__(self, name: str, timeout_s: float = 1.0):
+        self.name = name
+        self.timeout_s = timeout_s
+        self.reader = None
+        self._next_attach = 0.0
+        self._sample = PositionSample(BASE_LON_E7, BASE_LAT_E7, TRAJECTORY_ALT_M, 0.0, 0.0, 0.0)
+        self._sequence = 0
+        self._updated_at = time.monotonic()
+        self._stalled = False
+
+        self.operator_lon_e7 = BASE_LON_E7 # Default operator location
+        self.operator_lat_e7 = BASE_LAT_E7
+        self._attach()
+        if self.reader is None:
+            print(f"Waiting for shared position feed '{name}'")
+
+    def _attach(self):
+        from .shared_position import SharedPositionReader
+        self._next_attach = time.monotonic() + self.ATTACH_RETRY_S
+        try:
+            self.reader = SharedPositionReader(self.name)
+        except (FileNotFoundError, ValueError):
+            return # not created yet, or created but its header not written yet
+        print(f"Reading positions from shared position feed '{self.name}'")
+
+    def _update(self):
+        if self.reader is None:
+            if time.monotonic() < self._next_attach:
+                return
+            self._attach()
+            if self.reader is None:
+                return
+
+        fix = self.reader.read()
+        now = time.monotonic()
+        if self.reader.sequence != self._sequence:
+            self._sequence = self.reader.sequence
+            self._updated_at = now
+            _, lat_e7, lon_e7, alt_m, v_north, v_east, v_up = fix
+            self._sample = PositionSample(lon_e7, lat_e7, alt_m, math.hypot(v_north, v_east),
+                                          math.degrees(math.atan2(v_east, v_north)) % 360.0, v_up)
+            if self._stalled:
+                self._stalled = False
+                print(f"Shared position feed '{self.name}' resumed")
+        elif not self._stalled and now - self._updated_at > self.timeout_s:
+            self._stalled = True
+            print(f"Shared position feed '{self.name}' has not been updated for {self.timeout_s:g} s")
+
+    def get_next_coordinate(self) -> tuple[int, int]:
+        """Returns the latest published coordinate."""
+        self._update()
+        return self._sample.lon_e7, self._sample.lat_e7
+
+    def get_state_at(self, t: float) -> PositionSample:
+        """Returns the latest published state; `t` is not used, as the feed is live."""
+        self._update()
+        return self._sample
+
     def get_current_operator_location(self) -> tuple[int, int]:
         """Returns the base operator location in 1e7 degrees."""
-        return self.operator_lon_e7, self.operator_lat_e7
\ No newline at end of file
+        return self.operator_lon_e7, self.operator_lat_e7
@@ -0,0 +1,90 @@
+# mavlink_transport_sender/corpus.py
+"""
+Generates deterministic MAVLink test corpora faster than real time.
+
+The configured message schedule runs on a SimulatedClock against a link
+without a device, so an hour of traffic takes seconds. Every packet is
+captured to .tlog (and with --frames, the wire frames to .frames):
+
+    python -m mavlink_transport_sender.corpus --duration 3600 --seed 7
+
+Timestamps, positions and sequence numbers depend only on the seed and the
+configuration, so two runs with the same seed produce identical files.
+Without --output nothing is written and only the packets are counted.
+"""
+import argparse
+import random
+import time
+
+from .config import CORPUS_DIR, CORPUS_START_UNIX, CAPTURE_MAX_BYTES, CAPTURE_MAX_SECONDS
+from .clock import SimulatedClock
+from .mavlink_manager import MavlinkManager
+from .scheduler import Scheduler
+
+# Simulated time between two writes of the captured packets
+FLUSH_STEP_S = 10.0
+
+def seeded_start_time(seed: int) -> float:
+    """Simulated UNIX start time for `seed`: CORPUS_START_UNIX plus up to a year, in whole seconds."""
+    return float(CORPUS_START_UNIX + random.Random(seed).randrange(365 * 86400))
+
+def generate_corpus(duration: float, seed: int = 0, output_dir: str | None = CORPUS_DIR,
+                    record_frames: bool = False) -> dict:
+    """
+    Runs `duration` simulated seconds of the message schedule and captures it to
+    `output_dir` (None = count only). Returns the number of packets and bytes
+    and the wall time taken.
+    """
+    from .main import build_transport, build_coordinate_provider, register_message_streams
+
+    clock = SimulatedClock(seeded_start_time(seed))
+    # No writer thread: frames are handled in schedule order, independent of thread timing
+    transport = build_transport(link_type="null")
+    transport.writer_thread = False
+    mavlink_sender = MavlinkManager(transport, build_coordinate_provider(), clock=clock)
+    scheduler = Scheduler(clock=clock.monotonic, sleep=clock.sleep)
+    register_message_streams(scheduler, mavlink_sender, clock)
+
+    capture = None
+    if output_dir is not None:
+        from .capture import CaptureRecorder
+        capture = CaptureRecorder(output_dir, prefix=f"corpus-seed{seed}", record_frames=record_frames,
+                                  max_bytes=CAPTURE_MAX_BYTES, max_seconds=CAPTURE_MAX_SECONDS,
+                                  max_pending=1 << 30, clock=clock)
+        transport.capture = capture
+        capture.start(background=False)
+
+    started = time.perf_counter()
+    transport.open()
+    try:
+        scheduler.start()
+        while clock.monotonic() < duration:
+            scheduler.run(min(FLUSH_STEP_S, duration - clock.monotonic()))
+            if capture:
+                capture.flush()
+    finally:
+        transport.close()
+        if capture:
+            capture.stop()
+    return {
+        "packets": transport.frames_written,
+        "bytes": transport.bytes_written,
+        "simulated_s": clock.monotonic(),
+        "wall_s": time.perf_counter() - started,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a deterministic MAVLink corpus on a simulated clock.")
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds to generate")
+    parser.add_argument("--seed", type=int, default=0, help="selects the simulated start time")
+    parser.add_argument("--output", default=CORPUS_DIR, help="capture directory ('-' = count only)")
+    parser.add_argument("--frames", action="store_true", help="also write the wire frames (.frames)")
+    args = parser.parse_args()
+
+    result = generate_corpus(args.duration, args.seed, None if args.output == "-" else args.output, args.frames)
+    print(f"Generated {result['packets']} packets ({result['bytes']} bytes) covering "
+          f"{result['simulated_s']:.0f} s in {result['wall_s']:.2f} s "
+          f"({result['simulated_s'] / max(result['wall_s'], 1e-9):.0f}x real time)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# mavlink_transport_sender/dialect.py
+"""
+Generates, caches and loads a minimal MAVLink 2 dialect module.
+
+pymavlink's `common` dialect defines hundreds of messages and enums, and
+importing it dominates the sender's startup time and memory. The minimal
+dialect is generated with mavgen from pymavlink's own common.xml, keeping
+only the messages MavlinkManager sends (plus configured extras) and the
+enums their fields refer to. Message IDs, field layouts and CRC extras are
+unchanged, so the packets on the wire are identical.
+
+Build the cache ahead of time (e.g. when installing on a gateway) with:
+
+    python -m mavlink_transport_sender.dialect
+"""
+import importlib
+import os
+import sys
+import types
+import zlib
+from importlib.machinery import SourceFileLoader
+# Generation needs xml.etree, tempfile and mavgen; they are imported there, not on every start
+
+# Every message MavlinkManager sends
+SENT_MESSAGES = (
+    "HEARTBEAT",
+    "SYSTEM_TIME",
+    "SCALED_PRESSURE",
+    "GPS_RAW_INT",
+    "GLOBAL_POSITION_INT",
+    "OPEN_DRONE_ID_ARM_STATUS",
+    "OPEN_DRONE_ID_BASIC_ID",
+    "OPEN_DRONE_ID_LOCATION",
+    "OPEN_DRONE_ID_OPERATOR_ID",
+    "OPEN_DRONE_ID_SYSTEM",
+)
+SOURCE_DIALECT = "common"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated")
+# Bump when the generated output changes, so stale cache files are not reused
+GENERATOR_VERSION = 1
+# Written next to the cached module when generating it failed, so later starts do not retry
+FAILED_SUFFIX = ".failed"
+
+_warned = False
+
+def _pymavlink_dir() -> str:
+    import importlib.util
+
+    spec = importlib.util.find_spec("pymavlink")
+    if spec is None or not spec.submodule_search_locations:
+        raise ImportError("pymavlink is not installed")
+    return list(spec.submodule_search_locations)[0]
+
+def _pymavlink_version() -> str:
+    from pymavlink import __version__
+    return __version__
+
+def _message_set(extra_messages) -> list[str]:
+    return sorted(set(SENT_MESSAGES) | set(extra_messages))
+
+def cached_dialect_path(extra_messages=(), cache_dir: str | None = None) -> str:
+    """Path of the cached module for this message set and pymavlink version."""
+    key = "\n".join([str(GENERATOR_VERSION), _pymavlink_version(), SOURCE_DIALECT] + _message_set(extra_messages))
+    digest = f"{zlib.crc32(key.encode()):08x}"
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"mavlink_minimal_{digest}.py")
+
+def _read_definitions(path: str, messages: dict, enums: dict, seen: set) -> str:
+    """Collects the messages and enums of a definition file and its includes. Returns its <version>."""
+    import xml.etree.ElementTree as ET
+
+    path = os.path.realpath(path)
+    if path in seen:
+        return ""
+    seen.add(path)
+    root = ET.parse(path).getroot()
+    version = root.findtext("version", "")
+    for include in root.findall("include"):
+        version = _read_definitions(os.path.join(os.path.dirname(path), include.text.strip()),
+                                    messages, enums, seen) or version
+    for enum in root.iter("enum"):
+        existing = enums.get(enum.get("name"))
+        if existing is None:
+            enums[enum.get("name")] = enum
+        else:
+            # Enums may be extended by other files
+            existing.extend(enum.findall("entry"))
+    for message in root.iter("message"):
+        messages[message.get("name")] = message
+    return version
+
+def generate_dialect(output_path: str, extra_messages=()):
+    """Writes a dialect module containing only the sent messages and `extra_messages`."""
+    import contextlib
+    import py_compile
+    import tempfile
+    import xml.etree.ElementTree as ET
+    from pymavlink.generator import mavgen
+
+    wanted = _message_set(extra_messages)
+    messages: dict[str, ET.Element] = {}
+    enums: dict[str, ET.Element] = {}
+    source = os.path.join(_pymavlink_dir(), "dialects", "v20", f"{SOURCE_DIALECT}.xml")
+    version = _read_definitions(source, messages, enums, set())
+
+    unknown = [name for name in wanted if name not in messages]
+    if unknown:
+        raise ValueError(f"Messages not defined in {SOURCE_DIALECT}.xml: {', '.join(unknown)}")
+    kept_messages = [messages[name] for name in wanted]
+    enum_names = sorted({field.get("enum") for message in kept_messages
+                         for field in message.iter("field") if field.get("enum")})
+
+    root = ET.Element("mavlink")
+    ET.SubElement(root, "version").text = version or "3"
+    ET.SubElement(root, "dialect").text = "0"
+    enums_element = ET.SubElement(root, "enums")
+    enums_element.extend(enums[name] for name in enum_names if name in enums)
+    messages_element = ET.SubElement(root, "messages")
+    messages_element.extend(kept_messages)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "mavlink_minimal.xml")
+        ET.ElementTree(root).write(xml_path, encoding="utf-8", xml_declaration=True)
+        py_path = os.path.join(tmp, "mavlink_minimal.py")
+        opts = mavgen.Opts(py_path, wire_protocol="2.0", language="Python3", validate=False)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            ok = mavgen.mavgen(opts, [xml_path])
+        if not ok:
+            raise RuntimeError("mavgen failed to generate the minimal dialect")
+        # Replace atomically so a concurrently starting sender never imports a partial file
+        tmp_output = f"{output_path}.{os.getpid()}.tmp"
+        with open(py_path, "rb") as src, open(tmp_output, "wb") as dst:
+            dst.write(src.read())
+        os.replace(tmp_output, output_path)
+    # Compile now, so starting the sender never compiles the module (even with PYTHONDONTWRITEBYTECODE)
+    py_compile.compile(output_path, doraise=True)
+
+def _load_module(path: str):
+    name = os.path.splitext(os.path.basename(path))[0]
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    loader = SourceFileLoader(name, path)
+    module = types.ModuleType(name)
+    module.__file__ = path
+    module.__loader__ = loader
+    # Registered before executing, like a regular import (packet_templates finds the CRC through it)
+    sys.modules[name] = module
+    try:
+        loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+def _cache_dir_writable(cache_dir: str) -> bool:
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(cache_dir, os.W_OK)
+
+def _fall_back(reason: str):
+    """Returns the source dialect instead of the minimal one, warning once per process."""
+    global _warned
+    if not _warned:
+        _warned = True
+        print(f"Warning: could not generate the minimal MAVLink dialect ({reason}), using {SOURCE_DIALECT}")
+    return importlib.import_module(f"pymavlink.dialects.v20.{SOURCE_DIALECT}")
+
+def load_dialect(name: str = "minimal", extra_messages=(), cache_dir: str | None = None):
+    """
+    Returns the MAVLink 2 dialect module to build packets with.
+    "minimal" loads the cached minimal dialect, generating it on first use, and
+    falls back to the full common dialect if it cannot be generated. Generation
+    is not attempted when the cache directory is not writable, and a failure is
+    recorded in the cache so later starts do not retry it (until the message
+    set or pymavlink version changes, or `python -m ...dialect` is run).
+    Any other name imports that pymavlink dialect (e.g. "common").
+    """
+    if name != "minimal":
+        return importlib.import_module(f"pymavlink.dialects.v20.{name}")
+    path = cached_dialect_path(extra_messages, cache_dir)
+    if os.path.exists(path):
+        return _load_module(path)
+    failed_path = path + FAILED_SUFFIX
+    try:
+        with open(failed_path) as f:
+            return _fall_back(f.read().strip() or "failed before")
+    except OSError:
+        pass
+    if not _cache_dir_writable(os.path.dirname(path)):
+        return _fall_back(f"cache directory {os.path.dirname(path)} is not writable")
+    try:
+        generate_dialect(path, extra_messages)
+    except (OSError, ValueError, RuntimeError) as e:
+        try:
+            with open(failed_path, "w") as f:
+                f.write(f"{e}\n")
+        except OSError:
+            pass
+        return _fall_back(str(e))
+    return _load_module(path)
+
+def main():
+    import argparse
+    from .config import DIALECT_EXTRA_MESSAGES, DIALECT_CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Generates the cached minimal MAVLink dialect.")
+    parser.add_argument("--output", help="module path to write (default: the cache used by the sender)")
+    args = parser.parse_args()
+
+    path = args.output or cached_dialect_path(DIALECT_EXTRA_MESSAGES, DIALECT_CACHE_DIR)
+    generate_dialect(path, DIALECT_EXTRA_MESSAGES)
+    if os.path.exists(path + FAILED_SUFFIX):
+        os.remove(path + FAILED_SUFFIX) # let the sender use it again
+    print(f"Wrote {path} ({len(_message_set(DIALECT_EXTRA_MESSAGES))} messages)")
+
+if __name__ == "__main__":
+    main()
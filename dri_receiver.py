@@ -0,0 +1,235 @@
+# mavlink_transport_sender/dri_receiver.py
+import argparse
+import math
+import os
+import select
+import threading
+import time
+import tty
+from pymavlink.dialects.v20 import common as mavlink2
+
+from .config import TRANSPORT_TYPE, MUX_ADDR
+from .transports.slip_transport import SlipDecoder
+
+# Messages carrying the sender's UNIX time, used to measure end-to-end latency (field, scale to seconds)
+LATENCY_FIELDS = {
+    "SYSTEM_TIME": ("time_unix_usec", 1e-6),
+    "GPS_RAW_INT": ("time_usec", 1e-6),
+}
+
+class MessageStats:
+    """Arrival statistics of one message type."""
+    def __init__(self):
+        self.count = 0
+        self.first_arrival: float | None = None
+        self.last_arrival: float | None = None
+        # Welford's running mean/variance of the inter-arrival interval
+        self._interval_n = 0
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_count = 0
+
+    def add(self, arrival: float):
+        if self.last_arrival is not None:
+            interval = arrival - self.last_arrival
+            self._interval_n += 1
+            delta = interval - self._interval_mean
+            self._interval_mean += delta / self._interval_n
+            self._interval_m2 += delta * (interval - self._interval_mean)
+        else:
+            self.first_arrival = arrival
+        self.last_arrival = arrival
+        self.count += 1
+
+    def add_latency(self, latency: float):
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_count += 1
+
+    @property
+    def rate_hz(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return (self.count - 1) / (self.last_arrival - self.first_arrival)
+
+    @property
+    def jitter_ms(self) -> float:
+        """Standard deviation of the inter-arrival interval."""
+        if self._interval_n < 2:
+            return 0.0
+        return math.sqrt(self._interval_m2 / (self._interval_n - 1)) * 1e3
+
+class DriStandIn:
+    """
+    Hardware-free stand-in for the Dronetag DRI unit.
+
+    Creates a pseudo-terminal whose slave end (`port`) the sender opens like
+    /dev/ttyACM0. Everything written to it is read from the master end,
+    stripped of the MUX address, SLIP-decoded (SLIP mode) and parsed as
+    MAVLink with CRC validation. Sequence gaps, corrupt frames, per-message
+    rate, inter-arrival jitter and end-to-end latency are tracked.
+    """
+    def __init__(self, transport_type: str = TRANSPORT_TYPE, mux_address: int = MUX_ADDR):
+        self.transport_type = transport_type
+        self.mux_address = mux_address
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.mav = mavlink2.MAVLink(None)
+        self.mav.robust_parsing = True
+
+        self.messages: dict[str, MessageStats] = {}
+        # Per (system, component): [first unwrapped seq, highest unwrapped seq, packets received]
+        self._seq_state: dict[tuple[int, int], list[int]] = {}
+        self.reordered_packets = 0
+        self._decoder = SlipDecoder()
+        self.bytes_received = 0
+        self.foreign_frames = 0
+        self.corrupt_packets = 0
+
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """Starts reading the pseudo-terminal in a background thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="dri-stand-in", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the reader and closes the pseudo-terminal."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def _read_loop(self):
+        while self._running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+            if not readable:
+                continue
+            data = os.read(self.master_fd, 65536)
+            arrival = time.time()
+            self.bytes_received += len(data)
+            if self.transport_type == "slip":
+                self._feed_slip(data, arrival)
+            else:
+                self._feed_mavlink(data, arrival)
+
+    @property
+    def dropped_packets(self) -> int:
+        """Packets missing from the sequence ranges seen so far."""
+        return sum(max(0, highest - first + 1 - received) for first, highest, received in self._seq_state.values())
+
+    @property
+    def frames(self) -> int:
+        return self._decoder.frames
+
+    @property
+    def corrupt_frames(self) -> int:
+        """Frames with broken SLIP framing plus frames/bytes failing MAVLink parsing or CRC."""
+        return self._decoder.corrupt_frames + self.corrupt_packets
+
+    def _feed_slip(self, data: bytes, arrival: float):
+        for mux_address, packet in self._decoder.feed(data):
+            if mux_address != self.mux_address:
+                self.foreign_frames += 1
+                continue
+            self._feed_mavlink(packet, arrival, framed=True)
+
+    def _feed_mavlink(self, data: bytes, arrival: float, framed: bool = False):
+        messages = self.mav.parse_buffer(data) or []
+        if framed and len(messages) != 1:
+            # A SLIP frame must carry exactly one complete MAVLink packet
+            self.corrupt_packets += 1
+        for msg in messages:
+            if msg.get_type() == "BAD_DATA":
+                if not framed:
+                    self.corrupt_packets += 1
+                continue
+            self._on_message(msg, arrival)
+
+    def _on_message(self, msg, arrival: float):
+        msg_type = msg.get_type()
+        stats = self.messages.get(msg_type)
+        if stats is None:
+            stats = self.messages[msg_type] = MessageStats()
+        stats.add(arrival)
+
+        # Sequence numbers are unwrapped; a packet up to half the sequence space
+        # behind the highest one seen is counted as reordered (e.g. by priority scheduling)
+        source = (msg.get_srcSystem(), msg.get_srcComponent())
+        seq = msg.get_seq()
+        state = self._seq_state.get(source)
+        if state is None:
+            self._seq_state[source] = [seq, seq, 1]
+        else:
+            ahead = (seq - state[1]) % 256
+            if ahead < 128:
+                state[1] += ahead
+            else:
+                self.reordered_packets += 1
+            state[2] += 1
+
+        latency_field = LATENCY_FIELDS.get(msg_type)
+        if latency_field is not None:
+            field, scale = latency_field
+            stats.add_latency(arrival - getattr(msg, field) * scale)
+
+    def report(self, elapsed: float) -> str:
+        """Returns a human readable summary of everything received so far."""
+        lines = [
+            f"Received {self.bytes_received} bytes in {elapsed:.1f} s "
+            f"({self.bytes_received * 10 / elapsed / 1e3:.1f} kbaud equivalent)",
+            f"frames={self.frames} corrupt={self.corrupt_frames} foreign_mux={self.foreign_frames} "
+            f"dropped_packets={self.dropped_packets} reordered_packets={self.reordered_packets}",
+            f"{'message':<28}{'count':>8}{'rate':>9}{'jitter':>10}{'latency avg':>13}{'latency max':>13}",
+        ]
+        for name, s in sorted(self.messages.items()):
+            latency = (f"{s.latency_sum / s.latency_count * 1e3:>11.2f}ms{s.latency_max * 1e3:>11.2f}ms"
+                       if s.latency_count else f"{'-':>13}{'-':>13}")
+            lines.append(f"{name:<28}{s.count:>8}{s.rate_hz:>7.1f}Hz{s.jitter_ms:>8.2f}ms{latency}")
+        return "\n".join(lines)
+
+def main():
+    """Runs the configured sender against a DriStandIn and prints what arrived."""
+    from .main import build_transport, build_coordinate_provider, register_message_streams
+    from .mavlink_manager import MavlinkManager
+    from .scheduler import Scheduler, format_stats
+
+    parser = argparse.ArgumentParser(description="Loopback test of the sender against a PTY stand-in DRI receiver.")
+    parser.add_argument("duration", type=float, nargs="?", default=10.0, help="test duration in seconds")
+    args = parser.parse_args()
+
+    receiver = DriStandIn()
+    transport = build_transport(receiver.port, link_type="serial")
+    mavlink_sender = MavlinkManager(transport, build_coordinate_provider())
+    scheduler = Scheduler()
+    register_message_streams(scheduler, mavlink_sender)
+
+    receiver.start()
+    transport.open()
+    print(f"Loopback test on {receiver.port} for {args.duration:.0f} s using {TRANSPORT_TYPE.upper()} transport")
+    start = time.monotonic()
+    try:
+        scheduler.run(args.duration)
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        transport.close()
+        time.sleep(0.2) # let the receiver read what is still in flight
+        receiver.stop()
+
+    print("\n--- Sender ---")
+    print(format_stats(scheduler.stats()))
+    print("\n--- Receiver ---")
+    print(receiver.report(time.monotonic() - start))
+
+if __name__ == "__main__":
+    main()
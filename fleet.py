@@ -0,0 +1,432 @@
+# mavlink_transport_sender/fleet.py
+"""
+Virtual fleet of simulated UAS for stress-testing Remote ID receivers.
+
+Every UAS has its own UAS ID, operator ID and operator location, and its
+own MAVLink source: fleets of up to 255 UAS get one system ID each; larger
+fleets (up to 255 x 255) reuse system IDs with a component ID per group of
+255 UAS, so the (system, component) pair stays unique. Every UAS flies
+the trajectory of COORDINATE_SOURCE from its own start point,
+phase and speed. Positions of the whole fleet are computed with one
+vectorized Trajectory.sample_many() call per tick; packing is split into
+chunks of UAS that are encoded in a process pool, and the packets are
+merged into one or more outputs, each paced to a byte rate:
+
+    python -m mavlink_transport_sender.fleet --size 500 --duration 60
+"""
+import argparse
+import math
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+from .config import (
+    FLEET_SIZE, FLEET_WORKERS, FLEET_CHUNK_SIZE, FLEET_SEED, FLEET_SPREAD_M,
+    FLEET_UAS_ID_PREFIX, FLEET_OPERATOR_ID_PREFIX, FLEET_OUTPUT_BYTES_PER_S, FLEET_MAX_BACKLOG_S,
+    COORDINATE_SOURCE, HOME_ALT_M, BASE_LON_E7, BASE_LAT_E7, FIXED_LON_E7, FIXED_LAT_E7, TRAJECTORY_ALT_M,
+    LINK_TYPE, LINK_TARGET_UTILIZATION,
+    INTERVAL_HEARTBEAT, INTERVAL_ODID_ARM_STATUS, INTERVAL_ODID_BASIC_ID, INTERVAL_ODID_LOCATION,
+    INTERVAL_ODID_OPERATOR_ID, INTERVAL_ODID_SYSTEM, INTERVAL_STATS_REPORT,
+)
+from .clock import Clock, SYSTEM_CLOCK
+from .mavlink_manager import mavlink2, padded_id
+from .packet_templates import FastPacker
+from .scheduler import Scheduler, format_stats
+from .coordinate_providers import METERS_PER_E7
+from .transports.base_transport import BaseTransport
+
+# MAVLink system IDs are one byte; UAS beyond 255 also get their own component ID
+MAX_FLEET_SIZE = 255 * 255
+UNIX_EPOCH_2019 = 1546300800 # ODID timestamps count from 2019-01-01
+
+FLEET_MESSAGES = {
+    "HEARTBEAT": (mavlink2.MAVLink_heartbeat_message, INTERVAL_HEARTBEAT),
+    "OPEN_DRONE_ID_ARM_STATUS": (mavlink2.MAVLink_open_drone_id_arm_status_message, INTERVAL_ODID_ARM_STATUS),
+    "OPEN_DRONE_ID_BASIC_ID": (mavlink2.MAVLink_open_drone_id_basic_id_message, INTERVAL_ODID_BASIC_ID),
+    "OPEN_DRONE_ID_LOCATION": (mavlink2.MAVLink_open_drone_id_location_message, INTERVAL_ODID_LOCATION),
+    "OPEN_DRONE_ID_OPERATOR_ID": (mavlink2.MAVLink_open_drone_id_operator_id_message, INTERVAL_ODID_OPERATOR_ID),
+    "OPEN_DRONE_ID_SYSTEM": (mavlink2.MAVLink_open_drone_id_system_message, INTERVAL_ODID_SYSTEM),
+}
+
+def fleet_source(index: int) -> tuple[int, int]:
+    """
+    System and component ID of the UAS with the given index. System IDs are
+    distinct for the first 255 UAS; beyond that the component ID tells apart
+    UAS sharing a system ID.
+    """
+    return 1 + index % 255, 1 + index // 255
+
+# --- Encoding (runs in the worker processes) ---
+
+_packers: dict[str, FastPacker] | None = None
+
+def _worker_packers() -> dict[str, FastPacker]:
+    global _packers
+    if _packers is None:
+        mav = mavlink2.MAVLink(None)
+        _packers = {name: FastPacker(msg_class, mav) for name, (msg_class, _) in FLEET_MESSAGES.items()}
+    return _packers
+
+def _warm_up(_=None):
+    _worker_packers()
+
+def encode_chunk(message: str, first: int, seqs: np.ndarray, columns: dict) -> tuple:
+    """
+    Packs `message` for the UAS `first`, `first + 1`, ... with the given
+    sequence numbers. Array and list columns hold one value per UAS, other
+    columns are the same for all. Returns (message, first, packets, lengths,
+    seconds), with the packets concatenated into one bytearray.
+    """
+    started = time.perf_counter()
+    packer = _worker_packers()[message]
+    per_uas = {name: column.tolist() if isinstance(column, np.ndarray) else column
+               for name, column in columns.items() if isinstance(column, (np.ndarray, list))}
+    fields = {name: column for name, column in columns.items() if name not in per_uas}
+    names = list(per_uas)
+    rows = zip(*per_uas.values()) if per_uas else [()] * len(seqs)
+
+    packets = bytearray()
+    lengths = array("H")
+    for index, seq, values in zip(range(first, first + len(seqs)), seqs.tolist(), rows):
+        packer.set_source(*fleet_source(index))
+        fields.update(zip(names, values))
+        packet = packer.pack(seq, **fields) # a view of the packer's buffer, copied below
+        packets += packet
+        lengths.append(len(packet))
+    return message, first, packets, lengths, time.perf_counter() - started
+
+# --- Fleet state (main process) ---
+
+class VirtualFleet:
+    """Per-UAS identities, trajectory offsets and sequence numbers, stored as arrays."""
+    def __init__(self, size: int, trajectory=None, spread_m: float = FLEET_SPREAD_M, seed: int = FLEET_SEED,
+                 uas_id_prefix: str = FLEET_UAS_ID_PREFIX, operator_id_prefix: str = FLEET_OPERATOR_ID_PREFIX,
+                 clock: Clock = SYSTEM_CLOCK):
+        if not 0 < size <= MAX_FLEET_SIZE:
+            raise ValueError(f"Fleet size must be between 1 and {MAX_FLEET_SIZE} (255 system IDs x 255 component "
+                             f"IDs), got {size}")
+        self.size = size
+        self.trajectory = trajectory # None = every UAS hovers at its start point
+        self.clock = clock # source of the ODID timestamps
+        rng = np.random.default_rng(seed)
+
+        cos_lat = math.cos(math.radians(BASE_LAT_E7 / 1e7))
+        north_m, east_m = rng.uniform(-spread_m, spread_m, (2, size))
+        self.lat_offset_e7 = north_m / METERS_PER_E7
+        self.lon_offset_e7 = east_m / (METERS_PER_E7 * cos_lat)
+        duration = trajectory.duration if trajectory is not None else 0.0
+        self.phase_s = rng.uniform(0.0, duration, size)
+        self.speed_factor = rng.uniform(0.5, 1.5, size)
+
+        # Operators stand near the start point of their UAS
+        self.operator_lat_e7 = np.rint(BASE_LAT_E7 + self.lat_offset_e7).astype(np.int64)
+        self.operator_lon_e7 = np.rint(BASE_LON_E7 + self.lon_offset_e7).astype(np.int64)
+
+        width = len(str(size - 1))
+        self.uas_ids = [bytes(padded_id(f"{uas_id_prefix}{i:0{width}d}")) for i in range(size)]
+        self.operator_ids = [bytes(padded_id(f"{operator_id_prefix}{i:0{width}d}")) for i in range(size)]
+        self.seq = np.zeros(size, dtype=np.uint8)
+
+    def positions(self, t: float) -> tuple[np.ndarray, ...]:
+        """(lon_e7, lat_e7, alt_m, speed_ms, heading_deg, climb_ms) of every UAS at time `t`."""
+        if self.trajectory is None:
+            zeros = np.zeros(self.size)
+            return (np.rint(FIXED_LON_E7 + self.lon_offset_e7).astype(np.int64),
+                    np.rint(FIXED_LAT_E7 + self.lat_offset_e7).astype(np.int64),
+                    np.full(self.size, TRAJECTORY_ALT_M), zeros, zeros, zeros)
+        lon, lat, alt, speed, heading, climb = self.trajectory.sample_many(self.phase_s + t * self.speed_factor)
+        return (np.rint(lon + self.lon_offset_e7).astype(np.int64), np.rint(lat + self.lat_offset_e7).astype(np.int64),
+                alt, speed * self.speed_factor, heading, climb * self.speed_factor)
+
+    def next_seqs(self) -> np.ndarray:
+        """Sequence numbers for one packet of every UAS; advances the counters."""
+        seqs = self.seq.copy()
+        self.seq += 1 # uint8, wraps at 256
+        return seqs
+
+    def columns(self, message: str, t: float) -> dict:
+        """Field values of `message` for every UAS at time `t`."""
+        if message == "HEARTBEAT":
+            return dict(type=mavlink2.MAV_TYPE_GENERIC, autopilot=mavlink2.MAV_AUTOPILOT_GENERIC,
+                        system_status=mavlink2.MAV_STATE_ACTIVE, mavlink_version=3)
+        if message == "OPEN_DRONE_ID_ARM_STATUS":
+            return dict(status=mavlink2.MAV_ODID_ARM_STATUS_GOOD_TO_ARM) # no error text
+        if message == "OPEN_DRONE_ID_BASIC_ID":
+            return dict(id_type=mavlink2.MAV_ODID_ID_TYPE_SERIAL_NUMBER,
+                        ua_type=mavlink2.MAV_ODID_UA_TYPE_HELICOPTER_OR_MULTIROTOR, uas_id=self.uas_ids)
+        if message == "OPEN_DRONE_ID_OPERATOR_ID":
+            return dict(operator_id_type=mavlink2.MAV_ODID_OPERATOR_ID_TYPE_CAA, operator_id=self.operator_ids)
+        if message == "OPEN_DRONE_ID_SYSTEM":
+            return dict(
+                operator_location_type=mavlink2.MAV_ODID_OPERATOR_LOCATION_TYPE_FIXED,
+                classification_type=mavlink2.MAV_ODID_CLASSIFICATION_TYPE_EU,
+                operator_latitude=self.operator_lat_e7, operator_longitude=self.operator_lon_e7,
+                area_count=1, area_ceiling=120.0, area_floor=0.0,
+                category_eu=mavlink2.MAV_ODID_CATEGORY_EU_OPEN, class_eu=mavlink2.MAV_ODID_CLASS_EU_CLASS_0,
+                operator_altitude_geo=300.0, timestamp=max(int(self.clock.time()) - UNIX_EPOCH_2019, 0),
+            )
+        if message == "OPEN_DRONE_ID_LOCATION":
+            lon, lat, alt, speed, heading, climb = self.positions(t)
+            return dict(
+                status=mavlink2.MAV_ODID_STATUS_AIRBORNE,
+                direction=np.rint(heading * 100).astype(np.int64) % 36000,
+                speed_horizontal=(speed * 100).astype(np.int64),
+                speed_vertical=(climb * 100).astype(np.int64),
+                latitude=lat, longitude=lon,
+                altitude_barometric=alt + 5.0, altitude_geodetic=alt,
+                height_reference=mavlink2.MAV_ODID_HEIGHT_REF_OVER_GROUND, height=alt - HOME_ALT_M,
+                horizontal_accuracy=mavlink2.MAV_ODID_HOR_ACC_1_METER,
+                vertical_accuracy=mavlink2.MAV_ODID_VER_ACC_1_METER,
+                barometer_accuracy=mavlink2.MAV_ODID_VER_ACC_1_METER,
+                speed_accuracy=mavlink2.MAV_ODID_SPEED_ACC_1_METERS_PER_SECOND,
+                timestamp=float(self.clock.time() % 3600),
+                timestamp_accuracy=mavlink2.MAV_ODID_TIME_ACC_0_3_SECOND,
+            )
+        raise ValueError(f"Unknown fleet message '{message}'")
+
+# --- Output ---
+
+class RateLimitedOutput:
+    """
+    Writes encoded fleet packets to one transport at up to `bytes_per_s`.
+
+    Chunks from the encoder are queued and written by a thread that paces
+    the packets with a token bucket (bursts up to `burst_s` of link time),
+    so a tick for thousands of UAS is spread out instead of flooding the
+    link. When more than `max_backlog_s` of link time is queued, the oldest
+    chunks are dropped; the queue never blocks the scheduler.
+    """
+    def __init__(self, transport: BaseTransport, bytes_per_s: float,
+                 max_backlog_s: float = FLEET_MAX_BACKLOG_S, burst_s: float = 0.01):
+        self.transport = transport
+        self.bytes_per_s = bytes_per_s
+        self.max_backlog_bytes = max(bytes_per_s * max_backlog_s, 1)
+        self.burst_bytes = max(bytes_per_s * burst_s, 300) # at least one packet
+
+        self._chunks: deque[tuple[str, bytearray, array]] = deque()
+        self._cond = threading.Condition()
+        self._queued_bytes = 0
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+        self.packets_written = 0
+        self.bytes_written = 0
+        self.packets_dropped = 0
+        self.error: Exception | None = None
+
+    @property
+    def backlog_bytes(self) -> int:
+        return self._queued_bytes
+
+    def submit(self, message: str, packets: bytearray, lengths: array):
+        with self._cond:
+            self._chunks.append((message, packets, lengths))
+            self._queued_bytes += len(packets)
+            while self._queued_bytes > self.max_backlog_bytes and len(self._chunks) > 1:
+                _, dropped, dropped_lengths = self._chunks.popleft()
+                self._queued_bytes -= len(dropped)
+                self.packets_dropped += len(dropped_lengths)
+            self._cond.notify()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._write_loop, name=f"fleet-{self.transport.port}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _write_loop(self):
+        tokens = self.burst_bytes
+        refilled = time.monotonic()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._chunks or not self._running)
+                if not self._running:
+                    return
+                message, packets, lengths = self._chunks.popleft()
+                self._queued_bytes -= len(packets)
+
+            view = memoryview(packets)
+            offset = 0
+            for length in lengths:
+                now = time.monotonic()
+                tokens = min(self.burst_bytes, tokens + (now - refilled) * self.bytes_per_s)
+                refilled = now
+                if tokens < length:
+                    time.sleep((length - tokens) / self.bytes_per_s)
+                    tokens = length
+                    refilled = time.monotonic()
+                tokens -= length
+                try:
+                    self.transport.write_packet(view[offset:offset + length], message)
+                except IOError as e:
+                    self.error = e
+                    print(f"Fleet output {self.transport.port} failed: {e}")
+                    return
+                offset += length
+            self.packets_written += len(lengths)
+            self.bytes_written += offset
+
+class FleetSender:
+    """
+    Encodes fleet messages in chunks of `chunk_size` UAS, in a process pool
+    of `workers` processes (0 = in this process), and hands each chunk to
+    the outputs in turn, in the order the chunks were submitted.
+
+    At most `max_in_flight` chunks (default: two rounds of every fleet
+    message) are encoding at a time. When the workers fall behind, a tick
+    (one message for the whole fleet) that does not fit is skipped as a
+    whole and counted in `ticks_skipped`, so the backlog stays bounded and
+    every UAS's sequence numbers stay contiguous.
+    """
+    def __init__(self, fleet: VirtualFleet, outputs: list[RateLimitedOutput], workers: int = FLEET_WORKERS,
+                 chunk_size: int = FLEET_CHUNK_SIZE, max_in_flight: int | None = None):
+        self.fleet = fleet
+        self.outputs = outputs
+        self.chunk_size = max(1, chunk_size)
+        chunks_per_tick = -(-fleet.size // self.chunk_size)
+        self.max_in_flight = max(max_in_flight or 2 * len(FLEET_MESSAGES) * chunks_per_tick, chunks_per_tick)
+        # Submitted chunks in submission order; finished ones are handed on from the front
+        self._pending: deque[Future] = deque()
+        self._pending_lock = threading.Lock()
+        self._pool = None
+        if workers > 0:
+            # Started (forked) here, before the transports start their threads
+            self._pool = ProcessPoolExecutor(workers)
+            for _ in self._pool.map(_warm_up, range(workers)):
+                pass
+
+        self.packets_encoded = 0
+        self.encode_seconds = 0.0
+        self.errors = 0
+        self.ticks_skipped = 0
+
+    def send(self, message: str, t: float):
+        """Encodes `message` for the whole fleet at time `t` (seconds since start)."""
+        firsts = range(0, self.fleet.size, self.chunk_size)
+        if self._pool is not None:
+            with self._pending_lock:
+                if len(self._pending) + len(firsts) > self.max_in_flight:
+                    self.ticks_skipped += 1
+                    return
+        columns = self.fleet.columns(message, t)
+        seqs = self.fleet.next_seqs()
+        for first in firsts:
+            stop = min(first + self.chunk_size, self.fleet.size)
+            chunk_columns = {name: column[first:stop] if isinstance(column, (np.ndarray, list)) else column
+                             for name, column in columns.items()}
+            if self._pool is None:
+                self._encoded(encode_chunk(message, first, seqs[first:stop], chunk_columns))
+            else:
+                future = self._pool.submit(encode_chunk, message, first, seqs[first:stop], chunk_columns)
+                with self._pending_lock:
+                    self._pending.append(future)
+                future.add_done_callback(self._hand_on_finished)
+
+    def _hand_on_finished(self, _future: Future):
+        """Hands the finished chunks at the front of the pending queue to the outputs."""
+        with self._pending_lock:
+            while self._pending and self._pending[0].done():
+                future = self._pending.popleft()
+                if future.cancelled():
+                    continue # shutting down
+                try:
+                    self._encoded(future.result())
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Fleet encoding failed: {e}")
+
+    def _encoded(self, result: tuple):
+        message, first, packets, lengths, seconds = result
+        self.packets_encoded += len(lengths)
+        self.encode_seconds += seconds
+        self.outputs[(first // self.chunk_size) % len(self.outputs)].submit(message, packets, lengths)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def format_stats(self) -> str:
+        per_packet_us = self.encode_seconds / self.packets_encoded * 1e6 if self.packets_encoded else 0.0
+        lines = [f"Fleet of {self.fleet.size} UAS: {self.packets_encoded} packets encoded "
+                 f"({per_packet_us:.1f} us/packet, {self.errors} errors, "
+                 f"{self.ticks_skipped} ticks skipped)"]
+        for output in self.outputs:
+            lines.append(f"  {output.transport.port}: {output.packets_written} packets, "
+                         f"{output.bytes_written} bytes, {output.packets_dropped} dropped, "
+                         f"backlog {output.backlog_bytes} bytes")
+        return "\n".join(lines)
+
+def run_fleet(size: int = FLEET_SIZE, ports: list[str] | None = None, workers: int = FLEET_WORKERS,
+              duration: float | None = None, bytes_per_s: float | None = FLEET_OUTPUT_BYTES_PER_S,
+              link_type: str = LINK_TYPE):
+    """Sends the fleet's messages to `ports` (default: the configured link) until stopped."""
+    from .main import build_transport, build_coordinate_provider
+
+    provider = build_coordinate_provider(COORDINATE_SOURCE)
+    fleet = VirtualFleet(size, getattr(provider, "trajectory", None))
+    transports = [build_transport(port, link_type) for port in (ports or [None])]
+    for transport in transports:
+        transport.coalesce = False # frames of one type come from many UAS
+    outputs = []
+    for transport in transports:
+        rate = bytes_per_s or transport.baudrate / 10 * LINK_TARGET_UTILIZATION
+        outputs.append(RateLimitedOutput(transport, rate))
+    sender = FleetSender(fleet, outputs, workers)
+
+    scheduler = Scheduler()
+    for message, (_, interval) in FLEET_MESSAGES.items():
+        scheduler.add_stream(message, interval,
+                             lambda deadline, message=message: sender.send(message, deadline - scheduler.start_time))
+
+    def report_stats(deadline: float):
+        print(format_stats(scheduler.stats(reset=True)))
+        print(sender.format_stats())
+        print()
+    scheduler.add_stream("STATS_REPORT", INTERVAL_STATS_REPORT, report_stats, phase=INTERVAL_STATS_REPORT)
+
+    try:
+        for transport, output in zip(transports, outputs):
+            transport.open()
+            output.start()
+        print(f"Sending a fleet of {size} UAS to {', '.join(t.port for t in transports)}. Hit Ctrl-C to stop.")
+        scheduler.run(duration)
+    except IOError as e:
+        print(f"Link error: {e}")
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        sender.close()
+        for output in outputs:
+            output.stop()
+        for transport in transports:
+            transport.close()
+        print(sender.format_stats())
+
+def main():
+    parser = argparse.ArgumentParser(description="Sends the Remote ID messages of a virtual fleet of UAS.")
+    parser.add_argument("ports", nargs="*", help="outputs (default: MUX_PATH, or NETWORK_ADDRESS for network links)")
+    parser.add_argument("--link", choices=("serial", "udp", "tcp", "null"), default=LINK_TYPE, help="link type of the outputs")
+    parser.add_argument("--size", type=int, default=FLEET_SIZE, help="number of UAS")
+    parser.add_argument("--workers", type=int, default=FLEET_WORKERS, help="encoding processes (0 = none)")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--rate", type=float, default=FLEET_OUTPUT_BYTES_PER_S, help="bytes/s per output")
+    args = parser.parse_args()
+    try:
+        run_fleet(args.size, args.ports, args.workers, args.duration, args.rate, args.link)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
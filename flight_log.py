@@ -0,0 +1,473 @@
+import bisect
+import math
+import mmap
+import os
+import re
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from .coordinate_providers import METERS_PER_E7
+
+# A position between two samples further apart than this is looked up by bisecting
+# the file instead of reading it sample by sample from the last position
+SEEK_SCAN_BYTES = 4096
+
+FORMATS_BY_EXTENSION = {
+    ".gpx": "gpx",
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".nmea": "nmea",
+    ".nma": "nmea",
+    ".log": "nmea",
+}
+
+# CSV header names (lower case) accepted for each field
+CSV_COLUMNS = {
+    "time": ("time", "timestamp", "t", "datetime", "date_time", "utc", "time_s"),
+    "lat": ("lat", "latitude", "lat_deg"),
+    "lon": ("lon", "lng", "long", "longitude", "lon_deg"),
+    "alt": ("alt", "altitude", "alt_m", "altitude_m", "ele", "elevation", "alt_msl"),
+    "speed": ("speed", "speed_ms", "ground_speed", "groundspeed", "velocity"),
+    "heading": ("heading", "heading_deg", "course", "cog", "track", "direction"),
+}
+
+KNOTS_TO_MS = 0.514444
+
+class LogSample(NamedTuple):
+    """One sample read from a flight log. Fields the log does not have are None."""
+    t: float # UNIX time (or seconds from an arbitrary origin) of the sample
+    lon_e7: int
+    lat_e7: int
+    alt_m: float | None
+    speed_ms: float | None
+    heading_deg: float | None
+
+def _parse_time(text: str) -> float:
+    """Parses seconds as a number or an ISO 8601 date and time (UTC unless an offset is given)."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    stamp = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+def _float_or_none(text) -> float | None:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+class FlightLog:
+    """
+    Time-indexed access to a GPX, CSV or NMEA flight log without loading it.
+
+    The file is memory-mapped and a sample is parsed only when it is read.
+    Samples are expected in time order, so a time is found by bisecting byte
+    offsets: jump into the file, resynchronize on the next sample and compare
+    its time. Times and offsets seen on the way are kept in a sparse index
+    (at least `index_interval_s` apart), which narrows down later seeks.
+    Only the first and the last sample are read when the log is opened.
+    """
+    def __init__(self, path: str, fmt: str | None = None, index_interval_s: float = 30.0):
+        self.path = path
+        self.format = fmt or FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+        if self.format not in ("gpx", "csv", "nmea"):
+            raise ValueError(f"Unknown flight log format for '{path}'; set FLIGHT_LOG_FORMAT to gpx, csv or nmea")
+        self.index_interval_s = index_interval_s
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Flight log '{path}' is empty")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mm)
+
+        self._data_start = 0
+        # NMEA only, for samples without a date: UNIX time of the midnight before the first
+        # sample, and the first sample's time of day
+        self._date = 0.0
+        self._start_time_of_day = 0.0
+        if self.format == "csv":
+            self._read_csv_header()
+        elif self.format == "nmea":
+            self._find_nmea_start()
+        self._parse = {"gpx": self._parse_gpx, "csv": self._parse_line, "nmea": self._parse_nmea}[self.format]
+
+        first = self.read(self._data_start)
+        if first is None:
+            raise ValueError(f"Flight log '{path}' has no timed position samples")
+        self.first: LogSample = first[0]
+        self.last: LogSample = self._last_sample()
+        self.start_time = self.first.t
+        self.duration = self.last.t - self.first.t
+        if self.duration <= 0:
+            raise ValueError(f"Flight log '{path}' needs samples at two or more different times")
+
+        self._index_t = [self.first.t]
+        self._index_offset = [self._data_start]
+
+    def close(self):
+        self._mm.close()
+
+    # --- Reading ---
+
+    def read(self, offset: int) -> tuple[LogSample, int] | None:
+        """
+        Returns the first sample starting at or after byte `offset`, which must be
+        the start of a sample (see sync()), and the offset following it, or None at the end.
+        """
+        while offset < self.size:
+            sample, offset = self._parse(offset)
+            if sample is not None:
+                return sample, offset
+        return None
+
+    def sync(self, offset: int) -> int:
+        """Returns the offset of the first sample starting at or after `offset`."""
+        if offset <= self._data_start:
+            return self._data_start
+        if self.format == "gpx":
+            found = self._mm.find(b"<trkpt", offset)
+            return self.size if found < 0 else found
+        # Line-based formats restart at the next line
+        if self._mm[offset - 1] != 0x0A:
+            newline = self._mm.find(b"\n", offset)
+            if newline < 0:
+                return self.size
+            offset = newline + 1
+        if self.format == "nmea":
+            offset = self._next_nmea_epoch(offset)
+        return offset
+
+    def seek(self, t: float) -> int:
+        """
+        Returns the offset of the last sample at or before UNIX time `t` (the first
+        sample if `t` is earlier).
+        """
+        i = bisect.bisect_right(self._index_t, t) - 1
+        if i < 0:
+            return self._data_start
+        lo = self._index_offset[i]
+        hi = self._index_offset[i + 1] if i + 1 < len(self._index_offset) else self.size
+
+        while hi - lo > SEEK_SCAN_BYTES:
+            offset = self.sync((lo + hi) // 2)
+            read = self.read(offset) if offset < hi else None
+            if read is None or read[1] > hi:
+                hi = (lo + hi) // 2
+                continue
+            sample = read[0]
+            self.add_index(sample.t, offset)
+            if sample.t <= t:
+                lo = offset
+            else:
+                hi = offset
+
+        # Scan the remaining stretch sample by sample
+        read = self.read(lo)
+        while read is not None:
+            next_read = self.read(read[1])
+            if next_read is None or next_read[0].t > t:
+                break
+            lo, read = read[1], next_read
+        return lo
+
+    def add_index(self, t: float, offset: int):
+        """Records a sample time and offset in the sparse index if no entry is close to it."""
+        i = bisect.bisect_left(self._index_t, t)
+        if i < len(self._index_t) and self._index_t[i] - t < self.index_interval_s:
+            return
+        if i > 0 and t - self._index_t[i - 1] < self.index_interval_s:
+            return
+        self._index_t.insert(i, t)
+        self._index_offset.insert(i, offset)
+
+    @property
+    def index_size(self) -> int:
+        return len(self._index_t)
+
+    def _last_sample(self) -> LogSample:
+        """Reads the last sample by searching backwards from the end in growing steps."""
+        step = SEEK_SCAN_BYTES
+        while True:
+            offset = self.sync(max(self._data_start, self.size - step))
+            last = None
+            read = self.read(offset)
+            while read is not None:
+                last = read[0]
+                read = self.read(read[1])
+            if last is not None:
+                return last
+            step *= 4
+
+    # --- GPX ---
+
+    _GPX_TRKPT = re.compile(rb"<trkpt\b([^>]*?)(?:/>|>(.*?)</trkpt>)", re.S)
+    _GPX_ATTR = re.compile(rb"""\b(lat|lon)\s*=\s*["']([^"']+)["']""")
+    _GPX_CHILD = re.compile(rb"<(?:\w+:)?(ele|time|speed|course)>\s*([^<\s]+)\s*<")
+
+    def _parse_gpx(self, offset: int) -> tuple[LogSample | None, int]:
+        start = self._mm.find(b"<trkpt", offset)
+        if start < 0:
+            return None, self.size
+        match = self._GPX_TRKPT.match(self._mm, start)
+        if match is None:
+            return None, start + 6
+        attrs = dict(self._GPX_ATTR.findall(match.group(1)))
+        children = dict(self._GPX_CHILD.findall(match.group(2) or b""))
+        if b"lat" not in attrs or b"lon" not in attrs or b"time" not in children:
+            return None, match.end()
+        sample = LogSample(
+            _parse_time(children[b"time"].decode()),
+            int(round(float(attrs[b"lon"]) * 1e7)),
+            int(round(float(attrs[b"lat"]) * 1e7)),
+            _float_or_none(children.get(b"ele")),
+            _float_or_none(children.get(b"speed")),
+            _float_or_none(children.get(b"course")),
+        )
+        return sample, match.end()
+
+    # --- CSV ---
+
+    def _read_csv_header(self):
+        end = self._mm.find(b"\n")
+        header = self._mm[:end if end >= 0 else self.size].decode("utf-8-sig").strip()
+        self._delimiter = max((",", ";", "\t"), key=header.count)
+        names = [name.strip().strip('"').lower() for name in header.split(self._delimiter)]
+        self._columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in names:
+                    self._columns[field] = names.index(alias)
+                    break
+        missing = [field for field in ("time", "lat", "lon") if field not in self._columns]
+        if missing:
+            raise ValueError(f"Flight log '{self.path}' has no {', '.join(missing)} column")
+        self._data_start = end + 1 if end >= 0 else self.size
+
+    def _parse_line(self, offset: int) -> tuple[LogSample | None, int]:
+        end = self._mm.find(b"\n", offset)
+        if end < 0:
+            end = self.size
+        values = self._mm[offset:end].decode("utf-8", "replace").strip().split(self._delimiter)
+        columns = self._columns
+        try:
+            values = [value.strip().strip('"') for value in values]
+            sample = LogSample(
+                _parse_time(values[columns["time"]]),
+                int(round(float(values[columns["lon"]]) * 1e7)),
+                int(round(float(values[columns["lat"]]) * 1e7)),
+                *(_float_or_none(values[columns[field]]) if field in columns else None
+                  for field in ("alt", "speed", "heading")),
+            )
+        except (IndexError, ValueError):
+            sample = None # blank, comment or malformed line
+        return sample, end + 1
+
+    # --- NMEA ---
+
+    # Consecutive RMC and GGA sentences with the same UTC time form one sample:
+    # RMC carries the date, speed and course, GGA the altitude.
+
+    @staticmethod
+    def _nmea_fields(line: bytes) -> list[str] | None:
+        """Returns the fields of a valid RMC or GGA sentence, or None."""
+        line = line.strip()
+        if len(line) < 7 or line[:1] != b"$" or line[3:6] not in (b"RMC", b"GGA"):
+            return None
+        star = line.rfind(b"*")
+        if star > 0:
+            checksum = 0
+            for byte in line[1:star]:
+                checksum ^= byte
+            if line[star + 1:star + 3].upper() != b"%02X" % checksum:
+                return None
+            line = line[:star]
+        fields = line.decode("ascii", "replace").split(",")
+        return fields if len(fields) > 6 and fields[1] else None
+
+    def _nmea_line(self, offset: int) -> tuple[list[str] | None, int]:
+        end = self._mm.find(b"\n", offset)
+        if end < 0:
+            end = self.size
+        return self._nmea_fields(self._mm[offset:end]), end + 1
+
+    @staticmethod
+    def _nmea_degrees(value: str, hemisphere: str) -> float:
+        dot = value.index(".") if "." in value else len(value)
+        degrees = float(value[:dot - 2]) + float(value[dot - 2:]) / 60.0
+        return -degrees if hemisphere in ("S", "W") else degrees
+
+    @staticmethod
+    def _nmea_time_of_day(value: str) -> float:
+        return int(value[0:2]) * 3600 + int(value[2:4]) * 60 + float(value[4:])
+
+    @staticmethod
+    def _nmea_date(value: str) -> float:
+        return datetime.strptime(value, "%d%m%y").replace(tzinfo=timezone.utc).timestamp()
+
+    def _find_nmea_start(self):
+        """
+        Finds the time of day of the first sentence and the date of that day (from
+        the first RMC sentence), used for samples without a date (logs with GGA
+        sentences only).
+        """
+        offset = 0
+        start = None
+        while offset < min(self.size, 1024 * 1024):
+            fields, offset = self._nmea_line(offset)
+            if not fields:
+                continue
+            try:
+                time_of_day = self._nmea_time_of_day(fields[1])
+            except ValueError:
+                continue
+            if start is None:
+                start = self._start_time_of_day = time_of_day
+            if fields[0].endswith("RMC") and len(fields) > 9 and fields[9]:
+                try:
+                    date = self._nmea_date(fields[9])
+                except ValueError:
+                    continue
+                # The RMC sentence may already be past midnight
+                self._date = date - 86400 if time_of_day < start else date
+                return
+
+    def _nmea_day(self, time_of_day: float) -> float:
+        """
+        UNIX time of the midnight before a sample without a date. Samples are in
+        time order, so a time of day before the first sample's is on the next day
+        (logs without dates cannot be longer than a day).
+        """
+        return self._date + 86400 if time_of_day < self._start_time_of_day else self._date
+
+    def _next_nmea_epoch(self, offset: int) -> int:
+        """Skips the rest of the sample whose sentences may start before `offset`."""
+        time_of_day = None
+        while offset < self.size:
+            fields, next_offset = self._nmea_line(offset)
+            if fields:
+                if time_of_day is None:
+                    time_of_day = fields[1]
+                elif fields[1] != time_of_day:
+                    return offset
+            offset = next_offset
+        return self.size
+
+    def _parse_nmea(self, offset: int) -> tuple[LogSample | None, int]:
+        time_of_day = date = lon = lat = alt = speed = heading = None
+        while offset < self.size:
+            fields, next_offset = self._nmea_line(offset)
+            if fields:
+                if time_of_day is None:
+                    time_of_day = fields[1]
+                elif fields[1] != time_of_day:
+                    break
+                try:
+                    if fields[0].endswith("RMC") and fields[2] == "A":
+                        lat = self._nmea_degrees(fields[3], fields[4])
+                        lon = self._nmea_degrees(fields[5], fields[6])
+                        speed = float(fields[7]) * KNOTS_TO_MS if fields[7] else None
+                        heading = _float_or_none(fields[8]) if len(fields) > 8 else None
+                        date = self._nmea_date(fields[9]) if len(fields) > 9 and fields[9] else None
+                    elif fields[0].endswith("GGA") and fields[6] not in ("", "0"):
+                        lat = self._nmea_degrees(fields[2], fields[3])
+                        lon = self._nmea_degrees(fields[4], fields[5])
+                        alt = _float_or_none(fields[9]) if len(fields) > 9 else None
+                except (IndexError, ValueError):
+                    pass # malformed sentence
+            offset = next_offset
+
+        if lat is None:
+            return None, offset
+        seconds = self._nmea_time_of_day(time_of_day)
+        t = (self._nmea_day(seconds) if date is None else date) + seconds
+        return LogSample(t, int(round(lon * 1e7)), int(round(lat * 1e7)), alt, speed, heading), offset
+
+class FlightLogCursor:
+    """
+    Reads interpolated positions from a FlightLog at increasing times.
+
+    Keeps the two samples around the last requested time, so a run that asks
+    for steadily increasing times reads every sample once. Jumps backwards or
+    further ahead than `index_interval_s` seek instead. Times are seconds from
+    the first sample; with `loop` they wrap around at the end of the log,
+    otherwise the last position is held.
+    """
+    def __init__(self, log: FlightLog, loop: bool = True, default_alt_m: float = 0.0):
+        self.log = log
+        self.loop = loop
+        self.default_alt_m = default_alt_m
+        self._a: LogSample | None = None
+        self._b: LogSample | None = None
+        self._next_offset = 0
+
+    def _load(self, offset: int):
+        self._a, offset = self.log.read(offset)
+        read = self.log.read(offset)
+        if read is None:
+            self._b = None
+            self._next_offset = self.log.size
+        else:
+            self._b, self._next_offset = read
+
+    def _advance(self) -> bool:
+        read = self.log.read(self._next_offset)
+        if read is None:
+            return False
+        sample, next_offset = read
+        self.log.add_index(sample.t, self._next_offset)
+        self._a, self._b, self._next_offset = self._b, sample, next_offset
+        return True
+
+    def _position(self, t: float):
+        """Makes _a the last sample at or before UNIX time `t`."""
+        if (self._a is None or t < self._a.t or
+                (self._b is not None and t - self._b.t > self.log.index_interval_s)):
+            self._load(self.log.seek(t))
+        while self._b is not None and self._b.t <= t:
+            if not self._advance():
+                break
+
+    def sample(self, t: float) -> tuple[int, int, float, float, float, float]:
+        """
+        Returns (lon_e7, lat_e7, alt_m, speed_ms, heading_deg, climb_ms) `t` seconds
+        after the first sample of the log.
+        """
+        log = self.log
+        if self.loop:
+            t %= log.duration
+        else:
+            t = min(max(t, 0.0), log.duration)
+        t += log.start_time
+        self._position(t)
+        a, b = self._a, self._b
+        if b is None or b.t <= a.t:
+            # Holding the last position
+            return (a.lon_e7, a.lat_e7, self._alt(a), 0.0, a.heading_deg or 0.0, 0.0)
+
+        dt = b.t - a.t
+        f = min(max((t - a.t) / dt, 0.0), 1.0)
+        alt_a, alt_b = self._alt(a), self._alt(b)
+        lon = a.lon_e7 + f * (b.lon_e7 - a.lon_e7)
+        lat = a.lat_e7 + f * (b.lat_e7 - a.lat_e7)
+
+        # Speed and course from the log where it has them, else from the segment
+        if a.speed_ms is not None and b.speed_ms is not None:
+            speed = a.speed_ms + f * (b.speed_ms - a.speed_ms)
+        else:
+            speed = None
+        heading = a.heading_deg
+        if speed is None or heading is None:
+            v_north = (b.lat_e7 - a.lat_e7) * METERS_PER_E7 / dt
+            v_east = (b.lon_e7 - a.lon_e7) * METERS_PER_E7 * math.cos(math.radians(a.lat_e7 / 1e7)) / dt
+            if speed is None:
+                speed = math.hypot(v_north, v_east)
+            if heading is None:
+                heading = math.degrees(math.atan2(v_east, v_north)) % 360.0
+        return (int(round(lon)), int(round(lat)), alt_a + f * (alt_b - alt_a),
+                speed, heading, (alt_b - alt_a) / dt)
+
+    def _alt(self, sample: LogSample) -> float:
+        return self.default_alt_m if sample.alt_m is None else sample.alt_m
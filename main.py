@@ -1,95 +1,235 @@
 # mavlink_transport_sender/main.py
-import time
 import sys
 
 from .config import (
     TRANSPORT_TYPE, MUX_PATH, MUX_ADDR, BAUDRATE, COORDINATE_SOURCE,
+    LINK_TYPE, NETWORK_ADDRESS, NETWORK_BITRATE, DEVICES,
+    TRANSPORT_WRITER_THREAD, TRANSPORT_QUEUE_SIZE, TRANSPORT_BATCH_MS, RECEIVE_ENABLED,
+    TRANSPORT_COALESCE, TRANSPORT_RECONNECT,
+    MESSAGE_PRIORITIES, MESSAGE_MUX_ROUTES, MUX_CHANNEL_WEIGHTS,
+    CAPTURE_ENABLED, CAPTURE_DIR, CAPTURE_RAW_FRAMES, CAPTURE_MAX_BYTES, CAPTURE_MAX_SECONDS,
+    REPLAY_FILE, REPLAY_SPEED, REPLAY_LOOP,
+    METRICS_ENABLED, METRICS_HTTP_HOST, METRICS_HTTP_PORT, DEBUG_HEX_DUMP,
+    RATE_CONTROL_ENABLED, RATE_CONTROL_INTERVAL, LINK_TARGET_UTILIZATION, RATE_CONTROL_MIN_FACTOR, CRITICAL_STREAMS,
+    BASE_LON_E7, BASE_LAT_E7, TRAJECTORY_ALT_M, TRAJECTORY_SPEED_MS, WAYPOINTS_E7,
+    CIRCLE_RADIUS_M, SURVEY_WIDTH_M, SURVEY_HEIGHT_M, SURVEY_SPACING_M,
+    FLIGHT_LOG_FILE, FLIGHT_LOG_FORMAT, FLIGHT_LOG_LOOP, FLIGHT_LOG_START_S, FLIGHT_LOG_INDEX_INTERVAL_S,
+    SHARED_POSITION_NAME, SHARED_POSITION_TIMEOUT_S,
     INTERVAL_SCALED_PRESSURE, INTERVAL_GPS_RAW_INT, INTERVAL_SYSTEM_TIME,
     INTERVAL_GLOBAL_POSITION_INT, INTERVAL_HEARTBEAT,
     INTERVAL_ODID_ARM_STATUS, INTERVAL_ODID_BASIC_ID, INTERVAL_ODID_LOCATION,
-    INTERVAL_ODID_OPERATOR_ID, INTERVAL_ODID_SYSTEM, INTERVAL_MAIN_LOOP_PAUSE
+    INTERVAL_ODID_OPERATOR_ID, INTERVAL_ODID_SYSTEM, INTERVAL_STATS_REPORT
 )
 from .mavlink_manager import MavlinkManager
-from .coordinate_providers import FixedCoordinateProvider, CyclingCoordinateProvider
+from .coordinate_providers import (
+    BaseCoordinateProvider, FixedCoordinateProvider, CyclingCoordinateProvider, TrajectoryCoordinateProvider,
+    FlightLogCoordinateProvider, SharedPositionCoordinateProvider
+)
+from .transports.base_transport import BaseTransport, hex_dump
+from .scheduler import Scheduler, format_stats
+from .clock import Clock, SYSTEM_CLOCK
+from .rate_control import RateController
+# capture, replay, metrics and trajectory are imported when the configuration uses them
+
+def register_message_streams(scheduler: Scheduler, mavlink_sender: MavlinkManager, clock: Clock = SYSTEM_CLOCK):
+    """
+    Registers every MAVLink/ODID message as its own periodic stream, so each
+    INTERVAL_* value in config.py is the actual period of that message.
+    """
+    def boot_ms(deadline: float) -> int:
+        return int((deadline - scheduler.start_time) * 1e3) & 0xFFFFFFFF
+
+    scheduler.add_stream("SCALED_PRESSURE", INTERVAL_SCALED_PRESSURE,
+                         lambda d: mavlink_sender.send_scaled_pressure(boot_ms(d)))
+    scheduler.add_stream("GPS_RAW_INT", INTERVAL_GPS_RAW_INT,
+                         lambda d: mavlink_sender.send_gps_raw_int(int(clock.time() * 1e6), boot_ms(d)))
+    scheduler.add_stream("SYSTEM_TIME", INTERVAL_SYSTEM_TIME,
+                         lambda d: mavlink_sender.send_system_time(boot_ms(d)))
+    scheduler.add_stream("GLOBAL_POSITION_INT", INTERVAL_GLOBAL_POSITION_INT,
+                         lambda d: mavlink_sender.send_global_position_int(boot_ms(d)))
+    scheduler.add_stream("HEARTBEAT", INTERVAL_HEARTBEAT,
+                         lambda d: mavlink_sender.send_heartbeat())
+
+    # Open Drone ID messages
+    scheduler.add_stream("OPEN_DRONE_ID_ARM_STATUS", INTERVAL_ODID_ARM_STATUS,
+                         lambda d: mavlink_sender.send_odid_arm_status())
+    scheduler.add_stream("OPEN_DRONE_ID_BASIC_ID", INTERVAL_ODID_BASIC_ID,
+                         lambda d: mavlink_sender.send_odid_basic_id())
+    scheduler.add_stream("OPEN_DRONE_ID_LOCATION", INTERVAL_ODID_LOCATION,
+                         lambda d: mavlink_sender.send_odid_location(boot_ms(d)))
+    scheduler.add_stream("OPEN_DRONE_ID_OPERATOR_ID", INTERVAL_ODID_OPERATOR_ID,
+                         lambda d: mavlink_sender.send_odid_operator_id())
+    scheduler.add_stream("OPEN_DRONE_ID_SYSTEM", INTERVAL_ODID_SYSTEM,
+                         lambda d: mavlink_sender.send_odid_system())
+
+def build_transport(port: str | None = None, link_type: str = LINK_TYPE) -> BaseTransport:
+    """
+    Creates the transport selected by TRANSPORT_TYPE on the link selected by
+    `link_type`. `port` defaults to MUX_PATH, or NETWORK_ADDRESS for network links.
+    """
+    options = dict(writer_thread=TRANSPORT_WRITER_THREAD, queue_size=TRANSPORT_QUEUE_SIZE,
+                   batch_ms=TRANSPORT_BATCH_MS)
+    if link_type == "serial":
+        from .transports.raw_transport import RawTransport
+        from .transports.slip_transport import SlipTransport
+        raw_class, slip_class = RawTransport, SlipTransport
+        port = port or MUX_PATH
+        options["baudrate"] = BAUDRATE
+    elif link_type in ("udp", "tcp"):
+        from .transports import network_transport
+        if link_type == "udp":
+            raw_class, slip_class = network_transport.UdpRawTransport, network_transport.UdpSlipTransport
+        else:
+            raw_class, slip_class = network_transport.TcpRawTransport, network_transport.TcpSlipTransport
+        port = port or NETWORK_ADDRESS
+        options["baudrate"] = NETWORK_BITRATE
+    elif link_type == "null":
+        from .transports.null_transport import NullRawTransport, NullSlipTransport
+        raw_class, slip_class = NullRawTransport, NullSlipTransport
+        port = port or "null"
+        options["baudrate"] = BAUDRATE
+    else:
+        raise ValueError(f"Unknown LINK_TYPE '{link_type}' in config.py")
 
-def main():
-    # --- 1. Choose and Instantiate Transport Layer ---
-    transport = None
     if TRANSPORT_TYPE == "raw":
-        from .transports.raw_transport import RawTransport
-        transport = RawTransport(MUX_PATH, baudrate=BAUDRATE)
+        transport = raw_class(port, **options)
     elif TRANSPORT_TYPE == "slip":
-        from .transports.slip_transport import SlipTransport    
-        transport = SlipTransport(MUX_PATH, MUX_ADDR, baudrate=BAUDRATE)
+        transport = slip_class(port, MUX_ADDR, priorities=MESSAGE_PRIORITIES, message_routes=MESSAGE_MUX_ROUTES,
+                               channel_weights=MUX_CHANNEL_WEIGHTS, **options)
     else:
-        print(f"Error: Unknown TRANSPORT_TYPE '{TRANSPORT_TYPE}' in config.py")
-        sys.exit(1)
+        raise ValueError(f"Unknown TRANSPORT_TYPE '{TRANSPORT_TYPE}' in config.py")
+    transport.coalesce = TRANSPORT_COALESCE or TRANSPORT_RECONNECT # reconnecting sends the latest state
+    transport.reconnect = TRANSPORT_RECONNECT
+    return transport
+
+def build_coordinate_provider(source: str = COORDINATE_SOURCE) -> BaseCoordinateProvider:
+    """Creates the coordinate provider for `source` (see COORDINATE_SOURCE)."""
+    if source == "fixed":
+        return FixedCoordinateProvider()
+    elif source == "cycling":
+        return CyclingCoordinateProvider()
+    elif source == "file":
+        if not FLIGHT_LOG_FILE:
+            raise ValueError("COORDINATE_SOURCE 'file' needs FLIGHT_LOG_FILE in config.py")
+        return FlightLogCoordinateProvider(FLIGHT_LOG_FILE, FLIGHT_LOG_FORMAT, FLIGHT_LOG_LOOP,
+                                           FLIGHT_LOG_START_S, FLIGHT_LOG_INDEX_INTERVAL_S)
+    elif source == "shared":
+        return SharedPositionCoordinateProvider(SHARED_POSITION_NAME, SHARED_POSITION_TIMEOUT_S)
+    from .trajectory import Trajectory
+    if source == "circle":
+        return TrajectoryCoordinateProvider(Trajectory.circle(
+            BASE_LON_E7, BASE_LAT_E7, CIRCLE_RADIUS_M, TRAJECTORY_SPEED_MS, TRAJECTORY_ALT_M))
+    elif source == "survey":
+        return TrajectoryCoordinateProvider(Trajectory.survey(
+            BASE_LON_E7, BASE_LAT_E7, SURVEY_WIDTH_M, SURVEY_HEIGHT_M, SURVEY_SPACING_M,
+            TRAJECTORY_SPEED_MS, TRAJECTORY_ALT_M))
+    elif source == "waypoints":
+        return TrajectoryCoordinateProvider(Trajectory.from_waypoints(
+            WAYPOINTS_E7, TRAJECTORY_ALT_M, speed_ms=TRAJECTORY_SPEED_MS))
+    raise ValueError(f"Unknown coordinate source '{source}'")
 
-    # --- 2. Choose and Instantiate Coordinate Provider ---
-    coord_provider = None
-    if COORDINATE_SOURCE == "fixed":
-        coord_provider = FixedCoordinateProvider()
-    elif COORDINATE_SOURCE == "cycling":
-        coord_provider = CyclingCoordinateProvider()
-    else:
-        print(f"Error: Unknown COORDINATE_SOURCE '{COORDINATE_SOURCE}' in config.py")
+def main():
+    if DEVICES:
+        from .multi_device import run_devices
+        run_devices(DEVICES)
+        return
+
+    # --- 1. Choose and Instantiate Transport Layer and Coordinate Provider ---
+    try:
+        transport = build_transport()
+        coord_provider = build_coordinate_provider()
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
-    # --- 3. Instantiate MavlinkManager ---
+    # --- 2. Instantiate MavlinkManager ---
     mavlink_sender = MavlinkManager(transport, coord_provider)
 
+    # --- 3. Register one scheduled stream per message type ---
+    scheduler = Scheduler()
+    register_message_streams(scheduler, mavlink_sender)
+    rate_controller = None
+    if RATE_CONTROL_ENABLED:
+        rate_controller = RateController(scheduler, transport, CRITICAL_STREAMS,
+                                         target_utilization=LINK_TARGET_UTILIZATION,
+                                         min_factor=RATE_CONTROL_MIN_FACTOR)
+        scheduler.add_stream("RATE_CONTROL", RATE_CONTROL_INTERVAL,
+                             lambda deadline: rate_controller.update(), phase=RATE_CONTROL_INTERVAL)
+
+    metrics = None
+    metrics_server = None
+    if METRICS_ENABLED:
+        from .metrics import Metrics, MetricsServer, format_snapshot
+        metrics = Metrics()
+        transport.metrics = mavlink_sender.metrics = scheduler.metrics = metrics
+        metrics.add_gauge("queued_frames", lambda: transport.queue_depth, "Frames waiting for the writer thread")
+        metrics.add_gauge("out_waiting_bytes", lambda: transport.out_waiting, "Bytes in the device output buffer")
+        metrics.add_counter("short_writes_total", lambda: transport.short_writes,
+                            "Writes the device accepted only partly")
+        metrics.add_counter("dropped_bytes_total", lambda: transport.bytes_dropped, "Bytes dropped on a stalled link")
+        metrics.add_counter("coalesced_frames_total", lambda: transport.frames_coalesced,
+                            "Queued frames replaced by a newer frame of the same type")
+        metrics.add_counter("reconnects_total", lambda: transport.reconnects, "Times the link was reconnected")
+        if rate_controller:
+            metrics.add_gauge("rate_factor", lambda: rate_controller.factor, "Rate factor of the non-critical streams")
+        if METRICS_HTTP_PORT is not None:
+            metrics_server = MetricsServer(metrics, METRICS_HTTP_PORT, METRICS_HTTP_HOST)
+    if DEBUG_HEX_DUMP:
+        transport.debug_sink = hex_dump
+
+    def report_stats(deadline: float):
+        print(format_stats(scheduler.stats(reset=True)))
+        if rate_controller:
+            print(rate_controller.report())
+        if metrics:
+            print(format_snapshot(metrics.snapshot()))
+        print()
+    scheduler.add_stream("STATS_REPORT", INTERVAL_STATS_REPORT, report_stats, phase=INTERVAL_STATS_REPORT)
+
+    capture = None
+    if CAPTURE_ENABLED:
+        from .capture import CaptureRecorder
+        capture = CaptureRecorder(CAPTURE_DIR, record_frames=CAPTURE_RAW_FRAMES,
+                                  max_bytes=CAPTURE_MAX_BYTES, max_seconds=CAPTURE_MAX_SECONDS)
+        transport.capture = capture
+
     try:
+        if capture:
+            capture.start()
+        if metrics_server:
+            try:
+                metrics_server.start()
+            except OSError as e:
+                print(f"Metrics endpoint disabled: {e}")
+                metrics_server = None
         transport.open()
-        print(f"Sending MAVLink packets using {TRANSPORT_TYPE.upper()} transport with {COORDINATE_SOURCE.upper()} coordinates to {MUX_PATH}. Hit Ctrl-C to stop.")
-        script_start_time = time.time()
-
-        while True:
-            now_us = int(time.time() * 1e6)
-            time_boot_ms = int((time.time() - script_start_time) * 1e3) & 0xFFFFFFFF
-
-            mavlink_sender.send_scaled_pressure(time_boot_ms)
-            time.sleep(INTERVAL_SCALED_PRESSURE)
-
-            mavlink_sender.send_gps_raw_int(now_us, time_boot_ms)
-            time.sleep(INTERVAL_GPS_RAW_INT)
-
-            mavlink_sender.send_system_time(time_boot_ms)
-            time.sleep(INTERVAL_SYSTEM_TIME)
-
-            mavlink_sender.send_global_position_int(time_boot_ms)
-            time.sleep(INTERVAL_GLOBAL_POSITION_INT)
-
-            mavlink_sender.send_heartbeat()
-            time.sleep(INTERVAL_HEARTBEAT)
-
-            # Open Drone ID messages
-            mavlink_sender.send_odid_arm_status()
-            time.sleep(INTERVAL_ODID_ARM_STATUS)
-
-            mavlink_sender.send_odid_basic_id()
-            time.sleep(INTERVAL_ODID_BASIC_ID)
-
-            mavlink_sender.send_odid_location()
-            time.sleep(INTERVAL_ODID_LOCATION)
-
-            mavlink_sender.send_odid_operator_id()
-            time.sleep(INTERVAL_ODID_OPERATOR_ID)
-
-            mavlink_sender.send_odid_system()
-            time.sleep(INTERVAL_ODID_SYSTEM)
-
-            print("Sent MAVLink and ODID messages\n")
-            time.sleep(INTERVAL_MAIN_LOOP_PAUSE)
+        if RECEIVE_ENABLED:
+            mavlink_sender.add_message_handler("*", lambda msg: print(f"Received: {msg}"))
+            mavlink_sender.start_receiving()
+        if REPLAY_FILE:
+            speed_text = f"{REPLAY_SPEED}x speed" if REPLAY_SPEED > 0 else "full link speed"
+            print(f"Replaying {REPLAY_FILE} at {speed_text} using {TRANSPORT_TYPE.upper()} transport to {transport.port}. Hit Ctrl-C to stop.")
+            from .replay import Replayer
+            replayer = Replayer(transport, REPLAY_SPEED)
+            replayer.replay_file(REPLAY_FILE, loop=REPLAY_LOOP)
+            print(f"Replay finished: {replayer.sent} packets sent, {replayer.late} behind schedule")
+        else:
+            print(f"Sending MAVLink packets using {TRANSPORT_TYPE.upper()} transport with {COORDINATE_SOURCE.upper()} coordinates to {transport.port}. Hit Ctrl-C to stop.")
+            scheduler.run()
 
     except FileNotFoundError as e:
         print(e)
     except IOError as e:
-        print(f"Serial port error: {e}")
+        print(f"Link error: {e}")
     except KeyboardInterrupt:
         print("\nStopped by user.")
     finally:
         if transport:
             transport.close() # Ensure the serial port is closed
+        if capture:
+            capture.stop()
+        if metrics_server:
+            metrics_server.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,156 +1,291 @@
+import math
 import time
-from pymavlink.dialects.v20 import common as mavlink2
+from typing import Callable
 from .transports.base_transport import BaseTransport # Import the interface
-from .coordinate_providers import BaseCoordinateProvider # Import the interface
-from .config import (DEMO_UAS_ID, DEMO_OPERATOR_ID)
+from .coordinate_providers import BaseCoordinateProvider, PositionSample # Import the interface
+from .packet_templates import StaticPacketTemplate, FastPacker
+from .dialect import load_dialect
+from .clock import Clock, SYSTEM_CLOCK
+from .config import (DEMO_UAS_ID, DEMO_OPERATOR_ID,
+                     MAVLINK_DIALECT, DIALECT_EXTRA_MESSAGES, DIALECT_CACHE_DIR)
+
+mavlink2 = load_dialect(MAVLINK_DIALECT, DIALECT_EXTRA_MESSAGES, DIALECT_CACHE_DIR)
+
+ODID_ID_LEN = 20
+
+# Wire ranges and "unknown" values of the position fields. Positions may come from recorded
+# flight logs, so every value is clamped (or NaN mapped to unknown) before it is packed.
+INT16_MIN, INT16_MAX = -32768, 32767
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+UINT16_MAX = 65535 # unknown vel, cog and hdg
+ODID_DIRECTION_UNKNOWN = 36001
+ODID_SPEED_H_MAX_CMS, ODID_SPEED_H_UNKNOWN = 25425, 25500
+ODID_SPEED_V_MAX_CMS, ODID_SPEED_V_UNKNOWN = 6200, 6300
+ODID_ALTITUDE_UNKNOWN_M = -1000.0
+
+def padded_id(id_str: str, length: int = ODID_ID_LEN) -> bytearray:
+    """Encodes an ASCII ID and pads/truncates it with zeros to the fixed field length."""
+    id_bytes = bytearray(id_str.encode('ascii'))
+    id_bytes.extend([0] * (length - len(id_bytes)))
+    return id_bytes[:length]
 
 class MavlinkManager:
     """
     Manages the creation and sending of various MAVLink messages.
     It uses a provided transport layer and coordinate provider.
+
+    Messages with a constant payload are packed once into StaticPacketTemplates;
+    messages with changing fields are packed by FastPackers into preallocated
+    buffers, so sending allocates no pymavlink objects or intermediate bytes.
+
+    Messages received from the device are parsed by a streaming MAVLink parser
+    and dispatched to the handlers registered for their type.
     """
-    def __init__(self, transport: BaseTransport, coord_provider: BaseCoordinateProvider):
+    def __init__(self, transport: BaseTransport, coord_provider: BaseCoordinateProvider,
+                 uas_id: str = DEMO_UAS_ID, operator_id: str = DEMO_OPERATOR_ID, system_id: int = 1,
+                 clock: Clock = SYSTEM_CLOCK):
         self.transport = transport
         self.coord_provider = coord_provider
-        
+        # Reference for the heights above ground (relative_alt, ODID height)
+        self.home_alt_m = coord_provider.get_home_altitude()
+        # Source of the UNIX timestamps in SYSTEM_TIME and the ODID messages
+        self.clock = clock
+        self.uas_id = uas_id
+        self.operator_id = operator_id
+
         # Initialize MAVLink dialect and source info
         self.mav = mavlink2.MAVLink(None)
-        self.mav.srcSystem = 1
+        self.mav.srcSystem = system_id
         self.mav.srcComponent = 1
 
         # Internal state for ODID messages (e.g., arm status, airborne status)
         self._is_armed = False
 
-    def _send_mavlink_message(self, msg_type_name: str, msg):
-        """
-        Packs a MAVLink message and sends it via the configured transport.
-        """
-        buf = msg.pack(self.mav)
-        self.transport.write_packet(buf, msg_type_name)
+        # Position of the last tick, shared by all messages sent in the same tick
+        self._sample_time_boot_ms: int | None = None
+        self._sample: PositionSample | None = None
 
-    def send_heartbeat(self):
-        msg = self.mav.heartbeat_encode(
+        self._build_templates()
+
+        # Optional metrics.Metrics; when set, the time spent packing each message is recorded
+        self.metrics = None
+
+        # Receive path: separate parser state, handlers keyed by message type ("*" = any)
+        self._rx_mav = mavlink2.MAVLink(None)
+        self._rx_mav.robust_parsing = True
+        self._message_handlers: dict[str, list[Callable]] = {}
+        self.messages_received = 0
+        self.bad_data_received = 0
+
+    def _build_templates(self):
+        """Packs the static messages once and prepares the fast-path packers."""
+        self._heartbeat_template = StaticPacketTemplate(self.mav.heartbeat_encode(
             type=mavlink2.MAV_TYPE_GENERIC,
             autopilot=mavlink2.MAV_AUTOPILOT_GENERIC,
             base_mode=0,
             custom_mode=0,
             system_status=mavlink2.MAV_STATE_ACTIVE
-        )
-        self._send_mavlink_message("HEARTBEAT", msg)
+        ), self.mav)
+
+        self._odid_arm_status_template = StaticPacketTemplate(self.mav.open_drone_id_arm_status_encode(
+            status=mavlink2.MAV_ODID_ARM_STATUS_GOOD_TO_ARM,
+            error=bytearray(32)
+        ), self.mav)
+
+        self._odid_basic_id_template = StaticPacketTemplate(self.mav.open_drone_id_basic_id_encode(
+            target_system=0,
+            target_component=0,
+            id_or_mac=bytearray(ODID_ID_LEN),
+            id_type=mavlink2.MAV_ODID_ID_TYPE_SERIAL_NUMBER,
+            ua_type=mavlink2.MAV_ODID_UA_TYPE_HELICOPTER_OR_MULTIROTOR,
+            uas_id=padded_id(self.uas_id)
+        ), self.mav)
+
+        self._odid_operator_id_template = StaticPacketTemplate(self.mav.open_drone_id_operator_id_encode(
+            target_system=0,
+            target_component=0,
+            id_or_mac=bytearray(ODID_ID_LEN),
+            operator_id_type=mavlink2.MAV_ODID_OPERATOR_ID_TYPE_CAA,
+            operator_id=padded_id(self.operator_id)
+        ), self.mav)
+
+        self._system_time_packer = FastPacker(mavlink2.MAVLink_system_time_message, self.mav)
+        self._scaled_pressure_packer = FastPacker(mavlink2.MAVLink_scaled_pressure_message, self.mav)
+        self._gps_raw_int_packer = FastPacker(mavlink2.MAVLink_gps_raw_int_message, self.mav)
+        self._global_position_int_packer = FastPacker(mavlink2.MAVLink_global_position_int_message, self.mav)
+        self._odid_location_packer = FastPacker(mavlink2.MAVLink_open_drone_id_location_message, self.mav)
+        self._odid_system_packer = FastPacker(mavlink2.MAVLink_open_drone_id_system_message, self.mav)
+
+    def _next_seq(self) -> int:
+        """Returns the sequence number for the next packet and advances the counter."""
+        seq = self.mav.seq
+        self.mav.seq = (seq + 1) % 256
+        return seq
+
+    def _send_packet(self, msg_type_name: str, pack: Callable[..., bytes], **fields):
+        """
+        Packs a message with `pack` (a template's or packer's pack method), passing the
+        next sequence number and `fields`, and sends it via the configured transport.
+        """
+        if self.metrics is None:
+            buf = pack(self._next_seq(), **fields)
+        else:
+            started = time.perf_counter()
+            buf = pack(self._next_seq(), **fields)
+            self.metrics.observe_encode(msg_type_name.split(" ", 1)[0], time.perf_counter() - started)
+        self.transport.write_packet(buf, msg_type_name)
+
+    def add_message_handler(self, msg_type: str, callback: Callable):
+        """
+        Registers `callback(msg)` for received messages of the given type,
+        e.g. "HEARTBEAT", or "*" for every message.
+        """
+        self._message_handlers.setdefault(msg_type, []).append(callback)
+
+    def start_receiving(self):
+        """Starts reading from the transport and dispatching received messages."""
+        self.transport.start_reader(self._on_received_bytes)
+
+    def _on_received_bytes(self, data: bytes):
+        """Feeds received MAVLink bytes to the parser and dispatches complete messages."""
+        for msg in self._rx_mav.parse_buffer(data) or ():
+            msg_type = msg.get_type()
+            if msg_type == "BAD_DATA":
+                self.bad_data_received += 1
+                continue
+            self.messages_received += 1
+            for callback in self._message_handlers.get(msg_type, ()):
+                callback(msg)
+            for callback in self._message_handlers.get("*", ()):
+                callback(msg)
+
+    def _position_at(self, time_boot_ms: int) -> PositionSample:
+        """
+        Returns the vehicle state at the given boot time. Messages scheduled for
+        the same tick share a time_boot_ms and therefore report the same position.
+        """
+        if time_boot_ms != self._sample_time_boot_ms:
+            self._sample = self.coord_provider.get_state_at(time_boot_ms / 1e3)
+            self._sample_time_boot_ms = time_boot_ms
+        return self._sample
+
+    @staticmethod
+    def _cdeg(heading_deg: float, unknown: int = UINT16_MAX) -> int:
+        """Converts a heading in degrees to centidegrees in the range 0..35999, or `unknown` if it is not finite."""
+        if not math.isfinite(heading_deg):
+            return unknown
+        return int(round(heading_deg * 100)) % 36000
+
+    @staticmethod
+    def _wire_int(value: float, scale: float, low: int, high: int, unknown: int = 0) -> int:
+        """Scales a value to an integer field clamped to low..high; NaN becomes `unknown`."""
+        scaled = value * scale
+        if scaled != scaled:
+            return unknown
+        return int(min(max(scaled, low), high))
+
+    @staticmethod
+    def _odid_altitude(alt_m: float) -> float:
+        return alt_m if math.isfinite(alt_m) else ODID_ALTITUDE_UNKNOWN_M
+
+    def send_heartbeat(self):
+        self._send_packet("HEARTBEAT", self._heartbeat_template.pack)
 
     def send_system_time(self, time_boot_ms: int):
-        time_unix_us = int(time.time() * 1e6)
-        msg = self.mav.system_time_encode(
+        time_unix_us = int(self.clock.time() * 1e6)
+        self._send_packet(
+            "SYSTEM_TIME", self._system_time_packer.pack,
             time_unix_usec=time_unix_us,
             time_boot_ms=time_boot_ms
         )
-        self._send_mavlink_message("SYSTEM_TIME", msg)
 
     def send_scaled_pressure(self, time_boot_ms: int):
-        msg = self.mav.scaled_pressure_encode(
+        self._send_packet(
+            "SCALED_PRESSURE", self._scaled_pressure_packer.pack,
             time_boot_ms=time_boot_ms,
             press_abs=1013.25,
             press_diff=0.12,
             temperature=2000
         )
-        self._send_mavlink_message("SCALED_PRESSURE", msg)
 
     def send_gps_raw_int(self, time_usec: int, time_boot_ms: int):
-        current_lon_e7, current_lat_e7 = self.coord_provider.get_next_coordinate()
+        position = self._position_at(time_boot_ms)
 
-        msg = self.mav.gps_raw_int_encode(
+        self._send_packet(
+            "GPS_RAW_INT", self._gps_raw_int_packer.pack,
             time_usec=time_usec,
             fix_type=3,
-            lat=current_lat_e7,
-            lon=current_lon_e7,
-            alt=int(250.0 * 1000), # Altitude in mm (250m)
+            lat=position.lat_e7,
+            lon=position.lon_e7,
+            alt=self._wire_int(position.alt_m, 1000, INT32_MIN, INT32_MAX), # Altitude in mm
             eph=100, epv=100,
-            vel=500, cog=0,
+            vel=self._wire_int(position.speed_ms, 100, 0, UINT16_MAX - 1, UINT16_MAX), # Ground speed in cm/s
+            cog=self._cdeg(position.heading_deg),
             satellites_visible=10
         )
-        self._send_mavlink_message("GPS_RAW_INT", msg)
 
     def send_global_position_int(self, time_boot_ms: int):
-        current_lon_e7, current_lat_e7 = self.coord_provider.get_next_coordinate()
+        position = self._position_at(time_boot_ms)
+        heading_rad = math.radians(position.heading_deg) if math.isfinite(position.heading_deg) else math.nan
 
-        msg = self.mav.global_position_int_encode(
+        self._send_packet(
+            "GLOBAL_POSITION_INT", self._global_position_int_packer.pack,
             time_boot_ms=time_boot_ms,
-            lat=current_lat_e7,
-            lon=current_lon_e7,
-            alt=int(250.0 * 1000), # Altitude in mm (250m)
-            relative_alt=int(5.0 * 1000), # Relative altitude in mm (5m above home)
-            vx=0, vy=0, vz=0,
-            hdg=0
+            lat=position.lat_e7,
+            lon=position.lon_e7,
+            alt=self._wire_int(position.alt_m, 1000, INT32_MIN, INT32_MAX), # Altitude in mm
+            # Relative altitude in mm above home
+            relative_alt=self._wire_int(position.alt_m - self.home_alt_m, 1000, INT32_MIN, INT32_MAX),
+            vx=self._wire_int(position.speed_ms * math.cos(heading_rad), 100, INT16_MIN, INT16_MAX), # North, cm/s
+            vy=self._wire_int(position.speed_ms * math.sin(heading_rad), 100, INT16_MIN, INT16_MAX), # East, cm/s
+            vz=self._wire_int(-position.climb_ms, 100, INT16_MIN, INT16_MAX), # Down velocity in cm/s
+            hdg=self._cdeg(position.heading_deg)
         )
-        self._send_mavlink_message("GLOBAL_POSITION_INT", msg)
 
     # --- Open Drone ID (ODID) Message Sending Functions ---
 
     def send_odid_arm_status(self):
-        status_text = ""
-        error_message_bytes = bytearray(32)
-        
-        status = mavlink2.MAV_ODID_ARM_STATUS_GOOD_TO_ARM
         status_text = "GOOD_TO_ARM"
-
-        msg = self.mav.open_drone_id_arm_status_encode(
-            status=status,
-            error=error_message_bytes
-        )
-        self._send_mavlink_message(f"OPEN_DRONE_ID_ARM_STATUS (Status: {status_text})", msg)
+        self._send_packet(f"OPEN_DRONE_ID_ARM_STATUS (Status: {status_text})", self._odid_arm_status_template.pack)
 
     def send_odid_basic_id(self):
-        uas_id_str = DEMO_UAS_ID
-        uas_id_bytes = bytearray(uas_id_str.encode('ascii'))
-        uas_id_bytes.extend([0] * (20 - len(uas_id_bytes)))
-        uas_id_bytes = uas_id_bytes[:20]
+        self._send_packet("OPEN_DRONE_ID_BASIC_ID", self._odid_basic_id_template.pack)
 
-        id_or_mac_bytes = bytearray([0] * 20)
+    def send_odid_location(self, time_boot_ms: int):
+        position = self._position_at(time_boot_ms)
 
-        msg = self.mav.open_drone_id_basic_id_encode(
-            target_system=0,
-            target_component=0,
-            id_or_mac=id_or_mac_bytes,
-            id_type=mavlink2.MAV_ODID_ID_TYPE_SERIAL_NUMBER,
-            ua_type=mavlink2.MAV_ODID_UA_TYPE_HELICOPTER_OR_MULTIROTOR,
-            uas_id=uas_id_bytes
-        )
-        self._send_mavlink_message("OPEN_DRONE_ID_BASIC_ID", msg)
-
-    def send_odid_location(self):
-        current_lon_e7, current_lat_e7 = self.coord_provider.get_next_coordinate()
-        
         status_val = mavlink2.MAV_ODID_STATUS_AIRBORNE
 
         target_system = 0
         target_component = 0
-        id_or_mac_bytes = bytearray([0] * 20)
 
-        latitude_e7 = current_lat_e7
-        longitude_e7 = current_lon_e7
+        latitude_e7 = position.lat_e7
+        longitude_e7 = position.lon_e7
 
-        altitude_barometric_m = 255.0
-        altitude_geodetic_m = 250.0
+        altitude_barometric_m = self._odid_altitude(position.alt_m + 5.0)
+        altitude_geodetic_m = self._odid_altitude(position.alt_m)
         height_reference_val = mavlink2.MAV_ODID_HEIGHT_REF_OVER_GROUND
-        height_m = 5.0
+        height_m = self._odid_altitude(position.alt_m - self.home_alt_m)
 
-        direction_cdeg = 4500
-        speed_horizontal_cms = 500
-        speed_vertical_cms = 50
+        direction_cdeg = self._cdeg(position.heading_deg, ODID_DIRECTION_UNKNOWN)
+        speed_horizontal_cms = self._wire_int(position.speed_ms, 100, 0, ODID_SPEED_H_MAX_CMS, ODID_SPEED_H_UNKNOWN)
+        speed_vertical_cms = self._wire_int(position.climb_ms, 100, -ODID_SPEED_V_MAX_CMS, ODID_SPEED_V_MAX_CMS,
+                                            ODID_SPEED_V_UNKNOWN)
 
         horizontal_accuracy_val = mavlink2.MAV_ODID_HOR_ACC_1_METER
         vertical_accuracy_val = mavlink2.MAV_ODID_VER_ACC_1_METER
         barometer_accuracy_val = mavlink2.MAV_ODID_VER_ACC_1_METER
         speed_accuracy_val = mavlink2.MAV_ODID_SPEED_ACC_1_METERS_PER_SECOND
 
-        current_utc_time = time.time()
+        current_utc_time = self.clock.time()
         timestamp_s = float(current_utc_time % 3600)
         timestamp_accuracy_val = mavlink2.MAV_ODID_TIME_ACC_0_3_SECOND
 
-        msg = self.mav.open_drone_id_location_encode(
+        # id_or_mac is left out and therefore sent as zeros
+        self._send_packet(
+            f"OPEN_DRONE_ID_LOCATION (Status: 'Airborne')", self._odid_location_packer.pack,
             target_system=target_system,
             target_component=target_component,
-            id_or_mac=id_or_mac_bytes,
             status=status_val,
             direction=direction_cdeg,
             speed_horizontal=speed_horizontal_cms,
@@ -168,31 +303,13 @@ class MavlinkManager:
             timestamp=timestamp_s,
             timestamp_accuracy=timestamp_accuracy_val
         )
-        self._send_mavlink_message(f"OPEN_DRONE_ID_LOCATION (Status: 'Airborne')", msg)
 
     def send_odid_operator_id(self):
-        target_system = 0
-        target_component = 0
-        id_or_mac_bytes = bytearray([0] * 20)
-        operator_id_type_val = mavlink2.MAV_ODID_OPERATOR_ID_TYPE_CAA
-        operator_id_str = DEMO_OPERATOR_ID
-        operator_id_bytes = bytearray(operator_id_str.encode('ascii'))
-        operator_id_bytes.extend([0] * (20 - len(operator_id_bytes)))
-        operator_id_bytes = operator_id_bytes[:20]
-
-        msg = self.mav.open_drone_id_operator_id_encode(
-            target_system=target_system,
-            target_component=target_component,
-            id_or_mac=id_or_mac_bytes,
-            operator_id_type=operator_id_type_val,
-            operator_id=operator_id_bytes
-        )
-        self._send_mavlink_message("OPEN_DRONE_ID_OPERATOR_ID", msg)
+        self._send_packet("OPEN_DRONE_ID_OPERATOR_ID", self._odid_operator_id_template.pack)
 
     def send_odid_system(self):
         target_system = 0
         target_component = 0
-        id_or_mac_bytes = bytearray([0] * 20)
         operator_location_type_val = mavlink2.MAV_ODID_OPERATOR_LOCATION_TYPE_FIXED
         classification_type_val = mavlink2.MAV_ODID_CLASSIFICATION_TYPE_EU
 
@@ -208,16 +325,17 @@ class MavlinkManager:
         class_eu_val = mavlink2.MAV_ODID_CLASS_EU_CLASS_0
 
         unix_epoch_2019_01_01_00_00_00 = 1546300800
-        current_unix_timestamp = int(time.time())
+        current_unix_timestamp = int(self.clock.time())
         timestamp_odid_s = current_unix_timestamp - unix_epoch_2019_01_01_00_00_00
         if timestamp_odid_s < 0:
             timestamp_odid_s = 0
         timestamp_odid_s = min(timestamp_odid_s, 0xFFFFFFFF)
 
-        msg = self.mav.open_drone_id_system_encode(
+        # id_or_mac is left out and therefore sent as zeros
+        self._send_packet(
+            "OPEN_DRONE_ID_SYSTEM", self._odid_system_packer.pack,
             target_system=target_system,
             target_component=target_component,
-            id_or_mac=id_or_mac_bytes,
             operator_location_type=operator_location_type_val,
             classification_type=classification_type_val,
             operator_latitude=operator_lat_e7,
@@ -231,4 +349,3 @@ class MavlinkManager:
             operator_altitude_geo=operator_altitude_geo_m,
             timestamp=timestamp_odid_s
         )
-        self._send_mavlink_message("OPEN_DRONE_ID_SYSTEM", msg)
\ No newline at end of file
@@ -0,0 +1,253 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Bucket upper bounds in seconds, from 10 us to 1 s
+LATENCY_BUCKETS = (
+    10e-6, 25e-6, 50e-6, 100e-6, 250e-6, 500e-6,
+    1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3, 250e-3, 500e-3, 1.0,
+)
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions."""
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-quantile (inf if it is in the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+class MessageMetrics:
+    """Counters and encode latency of one message type."""
+    def __init__(self):
+        self.messages = 0
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.encode_seconds = Histogram()
+        self.frame_seconds = Histogram()
+
+    @property
+    def expansion(self) -> float:
+        """Wire bytes per MAVLink byte (SLIP escaping plus MUX address and END byte)."""
+        return self.wire_bytes / self.raw_bytes if self.raw_bytes else 0.0
+
+class Metrics:
+    """
+    Instrumentation shared by MavlinkManager, the transports and the Scheduler.
+
+    Each component holds an optional `metrics` attribute and only measures
+    anything when it is set. Values are plain counters and fixed-bucket
+    histograms updated without locking; a snapshot taken while other threads
+    write may be off by the samples in flight, which is fine for monitoring.
+    """
+    PREFIX = "mavlink_sender"
+
+    def __init__(self):
+        self.messages: dict[str, MessageMetrics] = {}
+        self.write_seconds = Histogram()
+        self.jitter_seconds: dict[str, Histogram] = {}
+        # name -> (help text, callable returning the current value)
+        self.gauges: dict[str, tuple[str, Callable[[], float]]] = {}
+        self.counters: dict[str, tuple[str, Callable[[], float]]] = {}
+        self.started = time.time()
+
+    def message(self, msg_type: str) -> MessageMetrics:
+        metrics = self.messages.get(msg_type)
+        if metrics is None:
+            metrics = self.messages[msg_type] = MessageMetrics()
+        return metrics
+
+    def observe_encode(self, msg_type: str, seconds: float):
+        """Time spent packing one MAVLink message."""
+        self.message(msg_type).encode_seconds.observe(seconds)
+
+    def record_frame(self, msg_type: str, raw_len: int, wire_len: int, seconds: float):
+        """One packet framed for the link, with the time spent framing it."""
+        metrics = self.message(msg_type)
+        metrics.messages += 1
+        metrics.raw_bytes += raw_len
+        metrics.wire_bytes += wire_len
+        metrics.frame_seconds.observe(seconds)
+
+    def observe_write(self, seconds: float):
+        """Duration of one device write and flush."""
+        self.write_seconds.observe(seconds)
+
+    def observe_jitter(self, stream: str, seconds: float):
+        """Lateness of one scheduled stream tick."""
+        histogram = self.jitter_seconds.get(stream)
+        if histogram is None:
+            histogram = self.jitter_seconds[stream] = Histogram()
+        histogram.observe(seconds)
+
+    def add_gauge(self, name: str, value: Callable[[], float], help_text: str = ""):
+        """Exports the value returned by `value()` at snapshot time."""
+        self.gauges[name] = (help_text, value)
+
+    def add_counter(self, name: str, value: Callable[[], float], help_text: str = ""):
+        """
+        Exports a running total kept elsewhere (e.g. a transport attribute), read
+        from `value()` at snapshot time. Prometheus names should end in _total.
+        """
+        self.counters[name] = (help_text, value)
+
+    @property
+    def expansion(self) -> float:
+        raw = sum(m.raw_bytes for m in self.messages.values())
+        wire = sum(m.wire_bytes for m in self.messages.values())
+        return wire / raw if raw else 0.0
+
+    def snapshot(self) -> dict:
+        """Returns the current values as plain data."""
+        return {
+            "uptime_s": time.time() - self.started,
+            "messages": {
+                name: {
+                    "messages": m.messages,
+                    "raw_bytes": m.raw_bytes,
+                    "wire_bytes": m.wire_bytes,
+                    "expansion": m.expansion,
+                    "encode_mean_us": m.encode_seconds.mean * 1e6,
+                    "encode_p99_us": m.encode_seconds.quantile(0.99) * 1e6,
+                    "frame_mean_us": m.frame_seconds.mean * 1e6,
+                }
+                for name, m in sorted(self.messages.items())
+            },
+            "write_mean_ms": self.write_seconds.mean * 1e3,
+            "write_p99_ms": self.write_seconds.quantile(0.99) * 1e3,
+            "jitter_p99_ms": {name: h.quantile(0.99) * 1e3 for name, h in sorted(self.jitter_seconds.items())},
+            "expansion": self.expansion,
+            "gauges": {name: value() for name, (_, value) in self.gauges.items()},
+            "counters": {name: value() for name, (_, value) in self.counters.items()},
+        }
+
+    def format_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        p = self.PREFIX
+        lines = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        def histogram(name: str, labels: str, h: Histogram):
+            cumulative = 0
+            for bound, count in zip(h.bounds, h.counts):
+                cumulative += count
+                lines.append(f'{p}_{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{p}_{name}_bucket{{{labels}le="+Inf"}} {h.count}')
+            plain = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{p}_{name}_sum{plain} {h.sum:.9f}")
+            lines.append(f"{p}_{name}_count{plain} {h.count}")
+
+        messages = sorted(self.messages.items())
+        for name, attr, help_text in (
+            ("messages_sent_total", "messages", "MAVLink messages sent"),
+            ("mavlink_bytes_total", "raw_bytes", "MAVLink bytes sent, before framing"),
+            ("wire_bytes_total", "wire_bytes", "Bytes sent on the link, after framing"),
+        ):
+            header(name, "counter", help_text)
+            for msg_type, m in messages:
+                lines.append(f'{p}_{name}{{type="{msg_type}"}} {getattr(m, attr)}')
+
+        header("frame_expansion_ratio", "gauge", "Wire bytes per MAVLink byte (SLIP escaping and MUX overhead)")
+        for msg_type, m in messages:
+            lines.append(f'{p}_frame_expansion_ratio{{type="{msg_type}"}} {m.expansion:.6f}')
+
+        header("encode_seconds", "histogram", "Time spent packing a MAVLink message")
+        for msg_type, m in messages:
+            histogram("encode_seconds", f'type="{msg_type}",', m.encode_seconds)
+        header("frame_seconds", "histogram", "Time spent framing a packet for the link")
+        for msg_type, m in messages:
+            histogram("frame_seconds", f'type="{msg_type}",', m.frame_seconds)
+
+        header("write_seconds", "histogram", "Duration of a device write and flush")
+        histogram("write_seconds", "", self.write_seconds)
+
+        header("schedule_jitter_seconds", "histogram", "Lateness of scheduled stream ticks")
+        for stream, h in sorted(self.jitter_seconds.items()):
+            histogram("schedule_jitter_seconds", f'stream="{stream}",', h)
+
+        for name, (help_text, value) in self.gauges.items():
+            header(name, "gauge", help_text or name)
+            lines.append(f"{p}_{name} {value()}")
+        for name, (help_text, value) in self.counters.items():
+            header(name, "counter", help_text or name)
+            lines.append(f"{p}_{name} {value()}")
+        return "\n".join(lines) + "\n"
+
+def format_snapshot(snapshot: dict) -> str:
+    """Formats a Metrics.snapshot() as a human readable table."""
+    lines = [f"{'message':<28}{'sent':>8}{'wire bytes':>12}{'expansion':>11}{'encode avg':>12}{'encode p99':>12}"]
+    for name, m in snapshot["messages"].items():
+        lines.append(f"{name:<28}{m['messages']:>8}{m['wire_bytes']:>12}{m['expansion']:>11.3f}"
+                     f"{m['encode_mean_us']:>10.1f}us{m['encode_p99_us']:>10.0f}us")
+    lines.append(f"write avg {snapshot['write_mean_ms']:.2f}ms p99 <= {snapshot['write_p99_ms']:.2f}ms, "
+                 f"overall expansion {snapshot['expansion']:.3f}")
+    return "\n".join(lines)
+
+class MetricsServer:
+    """Serves Metrics.format_prometheus() at http://host:port/metrics from a daemon thread."""
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # only needed for the endpoint
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.format_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # keep scrapes out of the console output
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        print(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
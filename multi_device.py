@@ -0,0 +1,182 @@
+# mavlink_transport_sender/multi_device.py
+"""
+Drives several DRI units from one process.
+
+Every device has its own transport, coordinate provider and UAS/operator
+IDs, while one Scheduler times the message streams for all of them:
+
+    python -m mavlink_transport_sender.multi_device /dev/ttyACM0 /dev/ttyACM1
+
+Without ports on the command line, the devices listed in DEVICES are used.
+"""
+import argparse
+import time
+
+from .config import (
+    DEVICES, DEMO_UAS_ID, DEMO_OPERATOR_ID, COORDINATE_SOURCE, LINK_TYPE,
+    METRICS_ENABLED, METRICS_HTTP_HOST, METRICS_HTTP_PORT, INTERVAL_STATS_REPORT,
+)
+from .mavlink_manager import MavlinkManager
+from .scheduler import Scheduler, format_stats
+from .transports.base_transport import BaseTransport
+
+class Device:
+    """One DRI unit: its transport, MavlinkManager and send statistics."""
+    def __init__(self, name: str, transport: BaseTransport, manager: MavlinkManager):
+        self.name = name
+        self.transport = transport
+        self.manager = manager
+        self.error: Exception | None = None
+        self.busy_seconds = 0.0 # time spent packing and queueing this device's messages
+
+    def send(self, method: str, *args):
+        """Calls a MavlinkManager send_* method; a link error takes the device out of the group."""
+        started = time.perf_counter()
+        try:
+            getattr(self.manager, method)(*args)
+        except IOError as e:
+            self.error = e
+            print(f"Device {self.name} failed, no longer sending to it: {e}")
+        self.busy_seconds += time.perf_counter() - started
+
+class DeviceGroup:
+    """
+    Sends every message stream to all devices.
+
+    The group stands in for a single MavlinkManager in
+    register_message_streams(): each send_* call is made on every device, so
+    the scheduler keeps one stream per message type however many devices
+    there are. Each transport always gets its own writer thread, whatever
+    TRANSPORT_WRITER_THREAD says, and frames are queued without waiting
+    (put_timeout = 0), so a slow or stalled device drops its own frames
+    instead of delaying the others.
+    """
+    def __init__(self, devices: list[Device]):
+        self.devices = devices
+        for device in devices:
+            device.transport.writer_thread = True # set before open(), which starts the thread
+            device.transport.put_timeout = 0
+
+    def __getattr__(self, name: str):
+        if not name.startswith("send_"):
+            raise AttributeError(name)
+
+        def send(*args):
+            for device in self.devices:
+                if device.error is None:
+                    device.send(name, *args)
+        setattr(self, name, send) # later calls skip __getattr__
+        return send
+
+    @property
+    def active(self) -> list[Device]:
+        return [device for device in self.devices if device.error is None]
+
+    def open(self):
+        """Opens every device; one that fails to open is reported and left out."""
+        for device in self.devices:
+            try:
+                device.transport.open()
+            except (IOError, ValueError) as e:
+                device.error = e
+                print(f"Device {device.name} could not be opened: {e}")
+        if not self.active:
+            raise IOError("No device could be opened.")
+
+    def close(self):
+        for device in self.devices:
+            device.transport.close()
+
+    def format_stats(self) -> str:
+        """Per-device link statistics as a human readable table."""
+        lines = [f"{'device':<20}{'frames':>9}{'bytes':>11}{'queued':>8}{'dropped':>9}"
+                 f"{'drop bytes':>12}{'short wr':>10}{'busy':>9}  status"]
+        for device in self.devices:
+            t = device.transport
+            status = "ok" if device.error is None else f"failed: {device.error}"
+            lines.append(f"{device.name:<20}{t.frames_written:>9}{t.bytes_written:>11}{t.queue_depth:>8}"
+                         f"{t.frames_dropped:>9}{t.bytes_dropped:>12}{t.short_writes:>10}"
+                         f"{device.busy_seconds * 1e3:>7.0f}ms  {status}")
+        return "\n".join(lines)
+
+def build_devices(device_configs: list[dict]) -> list[Device]:
+    """Creates a Device for every DEVICES entry."""
+    from .main import build_transport, build_coordinate_provider
+
+    devices = []
+    for config in device_configs:
+        port = config["port"]
+        transport = build_transport(port, config.get("link_type", LINK_TYPE))
+        provider = build_coordinate_provider(config.get("coordinate_source", COORDINATE_SOURCE))
+        manager = MavlinkManager(transport, provider,
+                                 uas_id=config.get("uas_id", DEMO_UAS_ID),
+                                 operator_id=config.get("operator_id", DEMO_OPERATOR_ID),
+                                 system_id=config.get("system_id", 1))
+        devices.append(Device(config.get("name", port), transport, manager))
+    return devices
+
+def run_devices(device_configs: list[dict], duration: float | None = None):
+    """Sends the configured message streams to all devices until stopped or for `duration` seconds."""
+    from .main import register_message_streams
+
+    group = DeviceGroup(build_devices(device_configs))
+    scheduler = Scheduler()
+    register_message_streams(scheduler, group)
+
+    metrics = None
+    metrics_server = None
+    if METRICS_ENABLED:
+        from .metrics import Metrics, MetricsServer, format_snapshot
+        metrics = Metrics()
+        scheduler.metrics = metrics
+        for device in group.devices:
+            device.transport.metrics = device.manager.metrics = metrics
+        metrics.add_gauge("devices_active", lambda: len(group.active), "Devices still being sent to")
+        metrics.add_gauge("queued_frames", lambda: sum(d.transport.queue_depth for d in group.devices),
+                          "Frames waiting for the writer threads of all devices")
+        metrics.add_counter("dropped_frames_total", lambda: sum(d.transport.frames_dropped for d in group.devices),
+                            "Frames dropped because a device queue was full")
+        if METRICS_HTTP_PORT is not None:
+            metrics_server = MetricsServer(metrics, METRICS_HTTP_PORT, METRICS_HTTP_HOST)
+
+    def report_stats(deadline: float):
+        print(format_stats(scheduler.stats(reset=True)))
+        print(group.format_stats())
+        if metrics:
+            print(format_snapshot(metrics.snapshot()))
+        print()
+    scheduler.add_stream("STATS_REPORT", INTERVAL_STATS_REPORT, report_stats, phase=INTERVAL_STATS_REPORT)
+
+    try:
+        if metrics_server:
+            try:
+                metrics_server.start()
+            except OSError as e:
+                print(f"Metrics endpoint disabled: {e}")
+                metrics_server = None
+        group.open()
+        print(f"Sending MAVLink packets to {len(group.active)} of {len(group.devices)} devices. Hit Ctrl-C to stop.")
+        scheduler.run(duration)
+    except IOError as e:
+        print(f"Link error: {e}")
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+    finally:
+        group.close()
+        print(group.format_stats())
+        if metrics_server:
+            metrics_server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sends the configured MAVLink streams to several DRI units.")
+    parser.add_argument("ports", nargs="*", help="device ports (default: DEVICES in config.py)")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    device_configs = [{"port": port} for port in args.ports] or DEVICES
+    if not device_configs:
+        parser.error("no ports given and DEVICES in config.py is empty")
+    run_devices(device_configs, args.duration)
+
+if __name__ == "__main__":
+    main()
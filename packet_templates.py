@@ -0,0 +1,106 @@
+import struct
+import sys
+
+MAVLINK_V2_STX = 0xFD
+HEADER_LEN = 10
+CHECKSUM_LEN = 2
+SEQ_OFFSET = 4
+SYSID_OFFSET = 5
+COMPID_OFFSET = 6
+
+class StaticPacketTemplate:
+    """
+    A MAVLink v2 packet whose payload never changes.
+
+    The message is packed by pymavlink once; on every send only the sequence
+    byte is patched and the CRC recomputed. Finished packets are cached per
+    sequence number, so after the first 256 sends a packet costs one list lookup.
+    Signed packets are not supported.
+    """
+    def __init__(self, msg, mav):
+        self._buf = bytearray(msg.pack(mav))
+        self._crc_extra = bytes([msg.crc_extra])
+        self._x25crc = _dialect_x25crc(mav)
+        self._packets: list[bytes | None] = [None] * 256
+
+    def pack(self, seq: int) -> bytes:
+        """Returns the packet with the given sequence number."""
+        packet = self._packets[seq]
+        if packet is None:
+            buf = self._buf
+            buf[SEQ_OFFSET] = seq
+            crc = self._x25crc(buf[1:-CHECKSUM_LEN])
+            crc.accumulate(self._crc_extra)
+            struct.pack_into("<H", buf, len(buf) - CHECKSUM_LEN, crc.crc)
+            packet = self._packets[seq] = bytes(buf)
+        return packet
+
+class FastPacker:
+    """
+    Packs a MAVLink v2 message with changing field values straight into a
+    preallocated buffer with struct.pack_into, bypassing pymavlink message
+    objects. Produces the same bytes as pymavlink, including the MAVLink 2
+    truncation of trailing zero bytes in the payload. Signed packets are not supported.
+
+    pack() returns a memoryview of the packer's buffer, which is overwritten
+    by the next pack() call; transports copy it while framing.
+    """
+    def __init__(self, msg_class, mav):
+        self._struct = msg_class.unpacker
+        self._crc_extra = bytes([msg_class.crc_extra])
+        self._x25crc = _dialect_x25crc(mav)
+        self._payload_len = self._struct.size
+
+        # Wire order of the fields with the length of array fields (0 for scalars) and the
+        # value of an omitted scalar; char[] fields are packed as a single bytes value by struct
+        self._layout = []
+        for name, array_len in zip(msg_class.ordered_fieldnames, msg_class.array_lengths):
+            is_char_array = msg_class.fieldtypes[msg_class.fieldnames.index(name)] == "char"
+            if is_char_array:
+                self._layout.append((name, 0, b""))
+            else:
+                self._layout.append((name, array_len, 0))
+
+        msg_id = msg_class.id
+        self._buf = bytearray(HEADER_LEN + self._payload_len + CHECKSUM_LEN)
+        self._view = memoryview(self._buf)
+        struct.pack_into("<BBBBBBBHB", self._buf, 0,
+                         MAVLINK_V2_STX, self._payload_len, 0, 0, 0,
+                         mav.srcSystem, mav.srcComponent, msg_id & 0xFFFF, msg_id >> 16)
+
+    def set_source(self, system_id: int, component_id: int):
+        """Changes the system and component ID of the following packets (e.g. for simulated vehicles)."""
+        self._buf[SYSID_OFFSET] = system_id
+        self._buf[COMPID_OFFSET] = component_id
+
+    def pack(self, seq: int, **fields) -> memoryview:
+        """
+        Packs the message with the given sequence number. Fields are passed by
+        their MAVLink names; omitted fields are sent as zero (char[] fields as empty strings).
+        """
+        values = []
+        for name, array_len, default in self._layout:
+            if array_len:
+                value = fields.get(name)
+                values.extend(value if value is not None else (0,) * array_len)
+            else:
+                values.append(fields.get(name, default))
+
+        buf = self._buf
+        end = HEADER_LEN + self._payload_len
+        self._struct.pack_into(buf, HEADER_LEN, *values)
+
+        # MAVLink 2 strips trailing zero bytes, but always keeps at least one payload byte
+        while end > HEADER_LEN + 1 and buf[end - 1] == 0:
+            end -= 1
+        buf[1] = end - HEADER_LEN
+        buf[SEQ_OFFSET] = seq
+
+        crc = self._x25crc(self._view[1:end])
+        crc.accumulate(self._crc_extra)
+        struct.pack_into("<H", buf, end, crc.crc)
+        return self._view[:end + CHECKSUM_LEN]
+
+def _dialect_x25crc(mav):
+    """Returns the x25crc implementation of the dialect module `mav` belongs to."""
+    return sys.modules[type(mav).__module__].x25crc
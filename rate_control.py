@@ -0,0 +1,119 @@
+from typing import Iterable
+from .scheduler import Scheduler
+from .transports.base_transport import BaseTransport
+
+class RateController:
+    """
+    Keeps the scheduled message streams within what the serial link can carry.
+
+    The link budget is the baud rate in bytes per second (8N1: 10 bits per
+    byte) times `target_utilization`. The demand of every stream is its rate
+    times the size of its last frame on the wire, so SLIP escaping and MUX
+    overhead are included. Non-critical streams are slowed down by a common
+    rate factor so the total demand fits the budget.
+
+    Backpressure is watched as well: bytes waiting in the device's output
+    buffer, frames waiting for the writer thread, write latency, short writes
+    and dropped bytes. While the link is congested the factor is reduced
+    multiplicatively; once it recovers, the factor grows back by `recovery`
+    per update up to what the budget allows. Critical streams keep their rate.
+    """
+    def __init__(self, scheduler: Scheduler, transport: BaseTransport, critical_streams: Iterable[str] = (),
+                 target_utilization: float = 0.8, min_factor: float = 0.1, backoff: float = 0.5,
+                 recovery: float = 0.1, max_out_waiting: int = 256, max_queue_depth: int = 32,
+                 max_write_latency: float = 0.05):
+        self.scheduler = scheduler
+        self.transport = transport
+        self.critical_streams = set(critical_streams)
+        self.target_utilization = target_utilization
+        self.min_factor = min_factor
+        self.backoff = backoff
+        self.recovery = recovery
+        self.max_out_waiting = max_out_waiting
+        self.max_queue_depth = max_queue_depth
+        self.max_write_latency = max_write_latency
+
+        self.factor = 1.0
+        self.utilization = 0.0
+        self.congested = False
+        self.adjustments = 0
+        # Configured interval of every stream the controller has slowed down at least once
+        self._nominal_intervals: dict[str, float] = {}
+        self._last_short_writes = 0
+        self._last_bytes_dropped = 0
+        self._overbooked_reported = False
+
+    @property
+    def link_bytes_per_s(self) -> float:
+        return self.transport.baudrate / 10
+
+    def _demand(self) -> tuple[float, float]:
+        """Returns the bytes/s of the critical streams and of the others at their nominal rates."""
+        critical = flexible = 0.0
+        frame_sizes = self.transport.frame_sizes
+        for name, stream in self.scheduler.streams.items():
+            size = frame_sizes.get(name)
+            if size is None:
+                continue # not a message stream, or nothing sent yet
+            if name in self.critical_streams:
+                critical += size / stream.interval
+            else:
+                flexible += size / self._nominal_intervals.get(name, stream.interval)
+        return critical, flexible
+
+    def _is_congested(self) -> bool:
+        transport = self.transport
+        short_writes = transport.short_writes - self._last_short_writes
+        bytes_dropped = transport.bytes_dropped - self._last_bytes_dropped
+        self._last_short_writes = transport.short_writes
+        self._last_bytes_dropped = transport.bytes_dropped
+        return (
+            short_writes > 0
+            or bytes_dropped > 0
+            or transport.out_waiting > self.max_out_waiting
+            or transport.queue_depth > self.max_queue_depth
+            or (transport.write_latency or 0.0) > self.max_write_latency
+        )
+
+    def update(self):
+        """Re-evaluates the link and adjusts the intervals of the non-critical streams."""
+        budget = self.link_bytes_per_s * self.target_utilization
+        critical, flexible = self._demand()
+        if critical > budget and not self._overbooked_reported:
+            print(f"Warning: critical streams need {critical:.0f} B/s, "
+                  f"more than the link budget of {budget:.0f} B/s")
+            self._overbooked_reported = True
+
+        fit = (budget - critical) / flexible if flexible > 0 else 1.0
+        self.congested = self._is_congested()
+        if self.congested:
+            factor = self.factor * self.backoff
+        else:
+            factor = self.factor + self.recovery
+        factor = max(self.min_factor, min(1.0, fit, factor))
+
+        if factor != self.factor:
+            self.factor = factor
+            self.adjustments += 1
+        self._apply() # also covers streams that sent their first frame since the last update
+        self.utilization = (critical + flexible * self.factor) / self.link_bytes_per_s
+
+    def _apply(self):
+        if self.factor == 1.0 and not self._nominal_intervals:
+            return
+        frame_sizes = self.transport.frame_sizes
+        for name, stream in self.scheduler.streams.items():
+            if name in self.critical_streams or name not in frame_sizes:
+                continue
+            nominal = self._nominal_intervals.setdefault(name, stream.interval)
+            self.scheduler.set_interval(name, nominal / self.factor)
+
+    def report(self) -> str:
+        """Returns a one-line summary of the link state."""
+        latency = self.transport.write_latency
+        latency_text = f"{latency * 1e3:.2f}ms" if latency is not None else "-"
+        return (f"Link: {self.utilization * 100:.0f}% of {self.link_bytes_per_s:.0f} B/s, "
+                f"rate factor {self.factor:.2f}{' (congested)' if self.congested else ''}, "
+                f"out_waiting={self.transport.out_waiting} queued={self.transport.queue_depth} "
+                f"write latency={latency_text} short_writes={self.transport.short_writes} "
+                f"dropped_bytes={self.transport.bytes_dropped}")
@@ -0,0 +1,146 @@
+import mmap
+import os
+import time
+from typing import Iterator
+from .capture import TLOG_RECORD_HEADER, FRAMES_RECORD_HEADER, FRAMES_EXTENSION
+from .mavlink_manager import mavlink2
+from .transports.base_transport import BaseTransport
+from .transports.slip_transport import Slip
+
+MAVLINK_V1_STX = 0xFE
+MAVLINK_V2_STX = 0xFD
+MAVLINK_V1_OVERHEAD = 8 # header (6) + checksum (2)
+MAVLINK_V2_OVERHEAD = 12 # header (10) + checksum (2)
+MAVLINK_V2_SIGNATURE_LEN = 13
+MAVLINK_IFLAG_SIGNED = 0x01
+
+def _mavlink_packet_len(buf, offset: int) -> int | None:
+    """Returns the length of the MAVLink packet starting at `offset`, or None if there is none."""
+    if offset + 2 > len(buf):
+        return None
+    magic = buf[offset]
+    if magic == MAVLINK_V2_STX:
+        if offset + 3 > len(buf):
+            return None
+        length = MAVLINK_V2_OVERHEAD + buf[offset + 1]
+        if buf[offset + 2] & MAVLINK_IFLAG_SIGNED:
+            length += MAVLINK_V2_SIGNATURE_LEN
+        return length
+    if magic == MAVLINK_V1_STX:
+        return MAVLINK_V1_OVERHEAD + buf[offset + 1]
+    return None
+
+def message_name(packet) -> str:
+    """
+    Returns the message type of a raw MAVLink packet from its message ID, e.g.
+    "GPS_RAW_INT", or UNKNOWN_<id> for messages outside the dialect.
+    """
+    if len(packet) >= 10 and packet[0] == MAVLINK_V2_STX:
+        msgid = packet[7] | packet[8] << 8 | packet[9] << 16
+    elif len(packet) >= 6 and packet[0] == MAVLINK_V1_STX:
+        msgid = packet[5]
+    else:
+        return "UNKNOWN"
+    message = mavlink2.mavlink_map.get(msgid)
+    return message.msgname if message is not None else f"UNKNOWN_{msgid}"
+
+def frame_message_name(frame) -> str:
+    """Returns the message type of a captured wire frame: a raw packet, or a MUX address and SLIP frame."""
+    if len(frame) and frame[0] in (MAVLINK_V2_STX, MAVLINK_V1_STX):
+        return message_name(frame)
+    try:
+        return message_name(Slip.decode(bytes(frame[1:-1])))
+    except ValueError:
+        return "UNKNOWN"
+
+def iter_tlog(path: str) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields (timestamp_us, raw_mavlink_packet) records from a .tlog file.
+    The file is memory-mapped and parsed lazily, so it is never loaded into RAM.
+    Bytes that do not form a valid record are skipped until the stream resynchronizes.
+    An empty file (e.g. a capture that was just rotated) yields nothing.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            size = len(buf)
+            offset = 0
+            header_len = TLOG_RECORD_HEADER.size
+            while offset + header_len < size:
+                packet_len = _mavlink_packet_len(buf, offset + header_len)
+                if packet_len is None or offset + header_len + packet_len > size:
+                    offset += 1
+                    continue
+                (timestamp_us,) = TLOG_RECORD_HEADER.unpack_from(buf, offset)
+                start = offset + header_len
+                yield timestamp_us, buf[start:start + packet_len]
+                offset = start + packet_len
+
+def iter_frames(path: str) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields (timestamp_us, wire_frame) records from a .frames capture.
+    The file is memory-mapped and parsed lazily, so it is never loaded into RAM.
+    An empty file yields nothing.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            size = len(buf)
+            offset = 0
+            header_len = FRAMES_RECORD_HEADER.size
+            while offset + header_len <= size:
+                timestamp_us, frame_len = FRAMES_RECORD_HEADER.unpack_from(buf, offset)
+                start = offset + header_len
+                if start + frame_len > size:
+                    break # truncated last record
+                yield timestamp_us, buf[start:start + frame_len]
+                offset = start + frame_len
+
+class Replayer:
+    """
+    Streams recorded packets back through a transport.
+
+    `speed` 1.0 keeps the original timing, N replays N times faster, and
+    0 sends as fast as the transport accepts the packets.
+    .tlog records are framed by the transport like freshly built packets;
+    .frames records are written to the link exactly as they were captured.
+    Packets are sent under their message type, so priorities, coalescing,
+    metrics and rate control treat them like freshly built ones.
+    """
+    def __init__(self, transport: BaseTransport, speed: float = 1.0):
+        self.transport = transport
+        self.speed = speed
+        self.sent = 0
+        self.late = 0
+
+    def replay_file(self, path: str, loop: bool = False):
+        """Replays a .tlog or .frames file, optionally over and over (unless it has no records)."""
+        framed = path.endswith(FRAMES_EXTENSION)
+        while True:
+            sent = self.sent
+            records = iter_frames(path) if framed else iter_tlog(path)
+            self.replay(records, framed)
+            if not loop or self.sent == sent:
+                break
+
+    def replay(self, records: Iterator[tuple[int, bytes]], framed: bool = False):
+        """Sends the given (timestamp_us, data) records, paced according to `speed`."""
+        write = self.transport.write_frame if framed else self.transport.write_packet
+        name_of = frame_message_name if framed else message_name
+        first_timestamp_us = None
+        start = 0.0
+        for timestamp_us, data in records:
+            if self.speed > 0:
+                if first_timestamp_us is None:
+                    first_timestamp_us = timestamp_us
+                    start = time.monotonic()
+                target = start + (timestamp_us - first_timestamp_us) / 1e6 / self.speed
+                delay = target - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -0.1:
+                    self.late += 1
+            write(data, name_of(data))
+            self.sent += 1
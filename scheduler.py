@@ -0,0 +1,219 @@
+import heapq
+import time
+from typing import Callable
+
+class ScheduledStream:
+    """
+    A single periodic message stream managed by the Scheduler.
+    Keeps its own timing statistics (jitter, missed deadlines).
+    """
+    def __init__(self, name: str, interval: float, callback: Callable[[float], None]):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+
+        # Deadlines are always derived as start + n * interval so they never drift
+        self.start = 0.0
+        self.period_index = 0
+        self.next_deadline = 0.0
+
+        self.fired = 0
+        self.missed = 0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+
+    def stats(self, elapsed: float) -> dict:
+        """Returns a snapshot of the timing statistics of this stream."""
+        return {
+            "interval_s": self.interval,
+            "actual_hz": (self.fired / elapsed) if elapsed > 0 else 0.0,
+            "fired": self.fired,
+            "missed": self.missed,
+            "mean_jitter_ms": (self.total_jitter / self.fired * 1e3) if self.fired else 0.0,
+            "max_jitter_ms": self.max_jitter * 1e3,
+        }
+
+    def reset_stats(self):
+        """Clears the timing statistics (e.g. after a periodic report)."""
+        self.fired = 0
+        self.missed = 0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+
+class Scheduler:
+    """
+    Drift-free deadline scheduler built on a monotonic clock.
+
+    Every stream fires at its own configured period. Pending deadlines are kept
+    in a priority queue, so the next due stream is always found in O(log n).
+    A deadline that is found to be late by one or more full periods is counted
+    as missed and skipped instead of firing a burst of catch-up sends.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.streams: dict[str, ScheduledStream] = {}
+        self._queue: list[tuple[float, int, ScheduledStream]] = []
+        self._order = 0
+        self._running = False
+        self.start_time: float | None = None
+        self._stats_since: float | None = None
+        # Optional metrics.Metrics receiving the jitter of every tick
+        self.metrics = None
+
+    def add_stream(self, name: str, interval: float, callback: Callable[[float], None], phase: float = 0.0):
+        """
+        Registers a periodic stream. The callback is called with the scheduled
+        deadline (monotonic seconds) of the tick it is fired for.
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval of stream '{name}' must be positive, got {interval}")
+        if name in self.streams:
+            raise ValueError(f"Stream '{name}' is already registered")
+
+        stream = ScheduledStream(name, interval, callback)
+        self.streams[name] = stream
+        if self.start_time is not None:
+            self._arm(stream, self.clock() + phase)
+        else:
+            stream.start = phase
+        return stream
+
+    def set_interval(self, name: str, interval: float):
+        """
+        Changes the period of a registered stream. The new period takes effect
+        from the next deadline, without shifting it.
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval of stream '{name}' must be positive, got {interval}")
+        stream = self.streams[name]
+        if stream.interval == interval:
+            return
+        # Re-anchor at the pending deadline so the already queued tick is kept
+        stream.start = stream.next_deadline
+        stream.period_index = 0
+        stream.interval = interval
+
+    def _arm(self, stream: ScheduledStream, start: float):
+        stream.start = start
+        stream.period_index = 0
+        stream.next_deadline = start
+        self._push(stream)
+
+    def _push(self, stream: ScheduledStream):
+        heapq.heappush(self._queue, (stream.next_deadline, self._order, stream))
+        self._order += 1
+
+    def start(self):
+        """Anchors all registered streams to the current clock value."""
+        self.start_time = self.clock()
+        self._stats_since = self.start_time
+        self._queue.clear()
+        # Streams registered before start() hold their phase offset in stream.start
+        for stream in self.streams.values():
+            self._arm(stream, self.start_time + stream.start)
+
+    def run_pending(self) -> int:
+        """
+        Fires every stream whose deadline has passed. Returns the number of
+        callbacks that were fired.
+        """
+        if self.start_time is None:
+            self.start()
+
+        fired = 0
+        now = self.clock()
+        while self._queue and self._queue[0][0] <= now:
+            deadline, _, stream = heapq.heappop(self._queue)
+            if stream.next_deadline != deadline or self.streams.get(stream.name) is not stream:
+                continue  # stale entry left behind by remove_stream()
+            now = self._fire(stream, deadline, now)
+            self._push(stream)
+            fired += 1
+        return fired
+
+    def _fire(self, stream: ScheduledStream, deadline: float, now: float) -> float:
+        """
+        Calls the callback of a due stream and advances it to its next deadline.
+        Returns the clock value after the callback.
+        """
+        jitter = now - deadline
+        stream.fired += 1
+        stream.total_jitter += jitter
+        if jitter > stream.max_jitter:
+            stream.max_jitter = jitter
+        if self.metrics is not None:
+            self.metrics.observe_jitter(stream.name, jitter)
+
+        stream.callback(deadline)
+
+        # Advance to the next deadline, skipping any periods that are already lost
+        now = self.clock()
+        stream.period_index += 1
+        next_deadline = stream.start + stream.period_index * stream.interval
+        if next_deadline <= now - stream.interval:
+            skipped = int((now - next_deadline) // stream.interval)
+            stream.missed += skipped
+            stream.period_index += skipped
+            next_deadline = stream.start + stream.period_index * stream.interval
+        stream.next_deadline = next_deadline
+        return now
+
+    def remove_stream(self, name: str):
+        """Unregisters a stream. Its pending deadline is discarded lazily."""
+        self.streams.pop(name, None)
+
+    def time_until_next(self) -> float | None:
+        """Returns seconds until the next deadline, or None if nothing is scheduled."""
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0][0] - self.clock())
+
+    def run(self, duration: float | None = None):
+        """
+        Runs the scheduler loop until stop() is called or, if given, until
+        `duration` seconds have elapsed.
+        """
+        if self.start_time is None:
+            self.start()
+        end_time = None if duration is None else self.clock() + duration
+
+        self._running = True
+        while self._running:
+            self.run_pending()
+            if end_time is not None and self.clock() >= end_time:
+                break
+            delay = self.time_until_next()
+            if delay is None:
+                delay = 0.1
+            if end_time is not None:
+                delay = min(delay, max(0.0, end_time - self.clock()))
+            if delay > 0:
+                self.sleep(delay)
+        self._running = False
+
+    def stop(self):
+        """Makes run() return after the currently firing callbacks finish."""
+        self._running = False
+
+    def stats(self, reset: bool = False) -> dict[str, dict]:
+        """Returns per-stream timing statistics, optionally clearing them."""
+        now = self.clock()
+        elapsed = now - self._stats_since if self._stats_since is not None else 0.0
+        snapshot = {name: stream.stats(elapsed) for name, stream in self.streams.items()}
+        if reset:
+            self._stats_since = now
+            for stream in self.streams.values():
+                stream.reset_stats()
+        return snapshot
+
+def format_stats(stats: dict[str, dict]) -> str:
+    """Formats a Scheduler.stats() snapshot as a human readable table."""
+    lines = [f"{'stream':<28}{'target':>9}{'actual':>9}{'fired':>8}{'missed':>8}{'jit avg':>10}{'jit max':>10}"]
+    for name, s in stats.items():
+        lines.append(
+            f"{name:<28}{1.0 / s['interval_s']:>7.1f}Hz{s['actual_hz']:>7.1f}Hz{s['fired']:>8}{s['missed']:>8}"
+            f"{s['mean_jitter_ms']:>8.2f}ms{s['max_jitter_ms']:>8.2f}ms"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,164 @@
+# mavlink_transport_sender/shared_position.py
+"""
+Live position feed through a shared memory block.
+
+An external process (e.g. a navigation stack) writes its latest fix into a
+named multiprocessing.shared_memory block, and the sender reads it at every
+scheduler tick, without pipes, sockets or a round trip per message.
+
+Block layout (SHARED_POSITION_SIZE bytes, little-endian, 8-byte aligned):
+
+    offset  type  field
+         0  u32   magic, 0x5350564D ("MVPS")
+         4  u32   layout version, 1
+         8  u64   sequence; odd while a write is in progress
+        16  f64   time of the fix, UNIX seconds
+        24  i32   latitude, 1e-7 degrees
+        28  i32   longitude, 1e-7 degrees
+        32  f64   altitude above MSL, metres
+        40  f32   north velocity, m/s
+        44  f32   east velocity, m/s
+        48  f32   up velocity, m/s
+        52        reserved (zero)
+
+Updates follow the seqlock protocol: the writer increments the sequence to an
+odd value, writes the fields, and increments it to the next even value. A
+reader copies the fields between two reads of the sequence and retries if the
+sequence was odd or changed. Writers in other languages must keep the stores
+in that order (release semantics on the sequence). When creating the block,
+the magic is written last, after the version and the sequence.
+"""
+import argparse
+import math
+import struct
+import time
+from multiprocessing import shared_memory
+
+SHARED_POSITION_MAGIC = 0x5350564D
+SHARED_POSITION_VERSION = 1
+SHARED_POSITION_SIZE = 64
+
+HEADER = struct.Struct("<IIQ")
+MAGIC = struct.Struct("<I")
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 8
+FIX = struct.Struct("<diidfff")
+FIX_OFFSET = 16
+
+# A reader gives up after this many torn reads in a row and keeps its previous fix
+MAX_READ_RETRIES = 100
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Opens an existing block without making this process responsible for removing it."""
+    try:
+        return shared_memory.SharedMemory(name, track=False) # Python 3.13+
+    except TypeError:
+        block = shared_memory.SharedMemory(name)
+        # Before 3.13 the resource tracker would unlink the writer's block when this process exits
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+class SharedPositionWriter:
+    """
+    Publishes fixes into a shared position block. Creates the block unless
+    `create` is False, in which case an existing one is opened.
+    """
+    def __init__(self, name: str, create: bool = True):
+        self.name = name
+        if create:
+            self.block = shared_memory.SharedMemory(name, create=True, size=SHARED_POSITION_SIZE)
+            self.block.buf[:SHARED_POSITION_SIZE] = bytes(SHARED_POSITION_SIZE)
+            # The magic goes in last, so a reader never accepts a block whose header is incomplete
+            HEADER.pack_into(self.block.buf, 0, 0, SHARED_POSITION_VERSION, 0)
+            MAGIC.pack_into(self.block.buf, 0, SHARED_POSITION_MAGIC)
+        else:
+            self.block = _attach(name)
+        self.sequence = SEQUENCE.unpack_from(self.block.buf, SEQUENCE_OFFSET)[0] & ~1
+
+    def write(self, lat_e7: int, lon_e7: int, alt_m: float,
+              v_north_ms: float = 0.0, v_east_ms: float = 0.0, v_up_ms: float = 0.0,
+              time_unix: float | None = None):
+        """Publishes a fix. `time_unix` defaults to now."""
+        buf = self.block.buf
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence + 1)
+        FIX.pack_into(buf, FIX_OFFSET, time.time() if time_unix is None else time_unix,
+                      lat_e7, lon_e7, alt_m, v_north_ms, v_east_ms, v_up_ms)
+        self.sequence += 2
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        self.block.close()
+
+    def unlink(self):
+        """Removes the block; readers keep their mapping until they close it."""
+        self.block.unlink()
+
+class SharedPositionReader:
+    """Reads consistent fixes from a shared position block written by SharedPositionWriter."""
+    def __init__(self, name: str):
+        self.name = name
+        self.block = _attach(name)
+        magic, version, _ = HEADER.unpack_from(self.block.buf, 0)
+        if magic != SHARED_POSITION_MAGIC or version != SHARED_POSITION_VERSION:
+            self.block.close()
+            raise ValueError(f"Shared memory block '{name}' is not a version {SHARED_POSITION_VERSION} position block")
+        self.sequence = 0 # of the last fix read; 0 = nothing written yet
+        self.fix: tuple[float, int, int, float, float, float, float] | None = None
+        self.torn_reads = 0
+
+    def read(self) -> tuple[float, int, int, float, float, float, float] | None:
+        """
+        Returns the latest fix as (time_unix, lat_e7, lon_e7, alt_m, v_north_ms,
+        v_east_ms, v_up_ms), or None if nothing has been written yet.
+        """
+        buf = self.block.buf
+        for _ in range(MAX_READ_RETRIES):
+            before = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0]
+            if before == self.sequence:
+                return self.fix # unchanged since the last read
+            if before & 1:
+                self.torn_reads += 1
+                continue
+            fix = FIX.unpack_from(buf, FIX_OFFSET)
+            if SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] == before:
+                self.sequence = before
+                self.fix = fix
+                return fix
+            self.torn_reads += 1
+        return self.fix
+
+    def close(self):
+        self.block.close()
+
+def main():
+    """Publishes a configured trajectory into a block, e.g. to try the "shared" coordinate source."""
+    from .main import build_coordinate_provider
+
+    parser = argparse.ArgumentParser(description="Writes positions of a simulated trajectory into a shared position block.")
+    parser.add_argument("--name", default=None, help="block name (default: SHARED_POSITION_NAME)")
+    parser.add_argument("--source", default="circle", help="coordinate source to publish (see COORDINATE_SOURCE)")
+    parser.add_argument("--rate", type=float, default=50.0, help="fixes per second")
+    args = parser.parse_args()
+
+    from .config import SHARED_POSITION_NAME
+    provider = build_coordinate_provider(args.source)
+    writer = SharedPositionWriter(args.name or SHARED_POSITION_NAME)
+    print(f"Publishing {args.source} positions to shared memory '{writer.name}' at {args.rate:g} Hz. Hit Ctrl-C to stop.")
+    started = time.monotonic()
+    try:
+        while True:
+            sample = provider.get_state_at(time.monotonic() - started)
+            heading_rad = math.radians(sample.heading_deg)
+            writer.write(sample.lat_e7, sample.lon_e7, sample.alt_m,
+                         sample.speed_ms * math.cos(heading_rad), sample.speed_ms * math.sin(heading_rad),
+                         sample.climb_ms)
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        writer.unlink()
+
+if __name__ == "__main__":
+    main()
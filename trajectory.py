@@ -0,0 +1,185 @@
+import bisect
+import math
+
+from .coordinate_providers import METERS_PER_E7
+
+class Trajectory:
+    """
+    Precomputed, time-indexed trajectory.
+
+    Positions are linearly interpolated between samples. Speed, heading and
+    vertical rate are derived once per segment when the trajectory is built,
+    so a lookup is a binary search (or a direct index for evenly spaced
+    samples) plus a few multiplications, independent of the trajectory length.
+    Looping trajectories wrap around at `duration`.
+
+    Samples are kept in plain lists, so building and sampling a trajectory
+    does not import NumPy, which is slow to import; sample_many() converts
+    them to NumPy arrays on first use.
+    """
+    def __init__(self, t_s, lon_e7, lat_e7, alt_m, loop: bool = True):
+        t = [float(v) for v in t_s]
+        if len(t) < 2:
+            raise ValueError("A trajectory needs at least two samples")
+        if len(lon_e7) != len(t) or len(lat_e7) != len(t):
+            raise ValueError("A trajectory needs a position for every timestamp")
+        self.lon_e7 = [float(v) for v in lon_e7]
+        self.lat_e7 = [float(v) for v in lat_e7]
+        self.alt_m = [float(v) for v in alt_m] if hasattr(alt_m, "__len__") else [float(alt_m)] * len(t)
+        self.loop = loop
+
+        dt = [b - a for a, b in zip(t, t[1:])]
+        if any(d <= 0 for d in dt):
+            raise ValueError("Trajectory timestamps must be strictly increasing")
+        self.t = [v - t[0] for v in t]
+        self.duration = self.t[-1]
+
+        # Evenly spaced samples allow O(1) segment lookup instead of a binary search. The absolute
+        # timestamps are compared, as per-step tolerances add up over long trajectories.
+        step = self.duration / (len(self.t) - 1)
+        evenly_spaced = all(abs(v - step * i) <= step * 1e-6 for i, v in enumerate(self.t))
+        self._step = step if evenly_spaced else None
+
+        # Per-segment velocity in a local north/east/up frame
+        self.speed_ms = []
+        self.heading_deg = []
+        self.climb_ms = []
+        for i, d in enumerate(dt):
+            cos_lat = math.cos(math.radians(self.lat_e7[i] / 1e7))
+            v_north = (self.lat_e7[i + 1] - self.lat_e7[i]) * METERS_PER_E7 / d
+            v_east = (self.lon_e7[i + 1] - self.lon_e7[i]) * METERS_PER_E7 * cos_lat / d
+            self.speed_ms.append(math.hypot(v_north, v_east))
+            self.heading_deg.append(math.degrees(math.atan2(v_east, v_north)) % 360.0)
+            self.climb_ms.append((self.alt_m[i + 1] - self.alt_m[i]) / d)
+
+        self._arrays = None # NumPy copies of the samples for sample_many()
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def _wrap(self, t: float) -> float:
+        if self.loop:
+            return t % self.duration
+        return min(max(t, 0.0), self.duration)
+
+    def _segment(self, t: float) -> int:
+        last = len(self.t) - 2
+        if self._step is not None:
+            # Rounding can put the index one segment off at a boundary
+            i = min(max(int(t / self._step), 0), last)
+            if t < self.t[i] and i > 0:
+                i -= 1
+            elif t >= self.t[i + 1] and i < last:
+                i += 1
+            return i
+        i = bisect.bisect_right(self.t, t) - 1
+        return min(max(i, 0), last)
+
+    def sample(self, t: float) -> tuple[int, int, float, float, float, float]:
+        """
+        Returns (lon_e7, lat_e7, alt_m, speed_ms, heading_deg, climb_ms) at time `t`
+        seconds from the start of the trajectory.
+        """
+        t = self._wrap(float(t))
+        i = self._segment(t)
+        t0 = self.t[i]
+        f = min(max((t - t0) / (self.t[i + 1] - t0), 0.0), 1.0)
+        lon = self.lon_e7[i] + f * (self.lon_e7[i + 1] - self.lon_e7[i])
+        lat = self.lat_e7[i] + f * (self.lat_e7[i + 1] - self.lat_e7[i])
+        alt = self.alt_m[i] + f * (self.alt_m[i + 1] - self.alt_m[i])
+        return (int(round(lon)), int(round(lat)), alt,
+                self.speed_ms[i], self.heading_deg[i], self.climb_ms[i])
+
+    def sample_many(self, t) -> tuple:
+        """
+        Vectorized variant of sample() for an array of times. Returns NumPy arrays
+        (lon_e7, lat_e7, alt_m, speed_ms, heading_deg, climb_ms).
+        """
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = tuple(np.asarray(values, dtype=np.float64) for values in (
+                self.t, self.lon_e7, self.lat_e7, self.alt_m, self.speed_ms, self.heading_deg, self.climb_ms))
+        times, lon_e7, lat_e7, alt_m, speed_ms, heading_deg, climb_ms = self._arrays
+
+        t = np.asarray(t, dtype=np.float64)
+        t = np.mod(t, self.duration) if self.loop else np.clip(t, 0.0, self.duration)
+        last = len(times) - 2
+        if self._step is not None:
+            i = np.clip((t / self._step).astype(np.int64), 0, last)
+            # Rounding can put an index one segment off at a boundary
+            i -= (t < times[i]) & (i > 0)
+            i += (t >= times[i + 1]) & (i < last)
+        else:
+            i = np.clip(np.searchsorted(times, t, side='right') - 1, 0, last)
+        t0 = times[i]
+        f = np.clip((t - t0) / (times[i + 1] - t0), 0.0, 1.0)
+        lon = lon_e7[i] + f * (lon_e7[i + 1] - lon_e7[i])
+        lat = lat_e7[i] + f * (lat_e7[i + 1] - lat_e7[i])
+        alt = alt_m[i] + f * (alt_m[i + 1] - alt_m[i])
+        return (np.rint(lon).astype(np.int64), np.rint(lat).astype(np.int64), alt,
+                speed_ms[i], heading_deg[i], climb_ms[i])
+
+    # --- Builders ---
+
+    @classmethod
+    def from_waypoints(cls, waypoints_e7, alt_m: float = 250.0, speed_ms: float | None = None,
+                       segment_duration_s: float | None = None, closed: bool = True) -> "Trajectory":
+        """
+        Builds a trajectory through absolute (lon_e7, lat_e7) waypoints, flown
+        either at a constant `speed_ms` or spending `segment_duration_s` on each leg.
+        A closed trajectory returns to the first waypoint before looping.
+        """
+        points = [(float(lon), float(lat)) for lon, lat in waypoints_e7]
+        if closed:
+            points.append(points[0])
+        lon = [p[0] for p in points]
+        lat = [p[1] for p in points]
+
+        if segment_duration_s is not None:
+            dt = [segment_duration_s] * (len(points) - 1)
+        elif speed_ms is not None and speed_ms > 0:
+            dt = []
+            for (lon0, lat0), (lon1, lat1) in zip(points, points[1:]):
+                cos_lat = math.cos(math.radians(lat0 / 1e7))
+                dist = math.hypot(lat1 - lat0, (lon1 - lon0) * cos_lat) * METERS_PER_E7
+                # Repeated waypoints still need a non-zero duration
+                dt.append(max(dist / speed_ms, 1e-3))
+        else:
+            raise ValueError("Either a positive speed_ms or segment_duration_s is required")
+
+        t = [0.0]
+        for d in dt:
+            t.append(t[-1] + d)
+        return cls(t, lon, lat, alt_m, loop=closed)
+
+    @classmethod
+    def circle(cls, center_lon_e7: int, center_lat_e7: int, radius_m: float, speed_ms: float,
+               alt_m: float = 250.0, points: int = 360) -> "Trajectory":
+        """Builds a clockwise circle (seen from above) around the given centre."""
+        m_per_e7_lon = METERS_PER_E7 * math.cos(math.radians(center_lat_e7 / 1e7))
+        period = 2.0 * math.pi * radius_m / speed_ms
+        t, lon, lat = [], [], []
+        for k in range(points + 1):
+            angle = 2.0 * math.pi * k / points
+            lat.append(center_lat_e7 + radius_m * math.cos(angle) / METERS_PER_E7)
+            lon.append(center_lon_e7 + radius_m * math.sin(angle) / m_per_e7_lon)
+            t.append(period * k / points)
+        return cls(t, lon, lat, alt_m, loop=True)
+
+    @classmethod
+    def survey(cls, origin_lon_e7: int, origin_lat_e7: int, width_m: float, height_m: float,
+               spacing_m: float, speed_ms: float, alt_m: float = 250.0) -> "Trajectory":
+        """
+        Builds a lawnmower survey pattern over a width x height rectangle whose
+        south-west corner is the origin; legs run north/south, `spacing_m` apart.
+        """
+        legs = int(width_m // spacing_m) + 1
+        m_per_e7_lon = METERS_PER_E7 * math.cos(math.radians(origin_lat_e7 / 1e7))
+        waypoints = []
+        for leg in range(legs):
+            east_m = leg * spacing_m
+            north_m = (0.0, height_m) if leg % 2 == 0 else (height_m, 0.0)
+            for n in north_m:
+                waypoints.append((origin_lon_e7 + east_m / m_per_e7_lon, origin_lat_e7 + n / METERS_PER_E7))
+        return cls.from_waypoints(waypoints, alt_m=alt_m, speed_ms=speed_ms, closed=True)
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+from typing import Callable
+from .raw_transport import RawTransport
+from .slip_transport import SlipTransport
+
+class AsyncSerialLink:
+    """
+    Serial I/O driven by an asyncio event loop instead of threads.
+
+    Mixed in before RawTransport or SlipTransport, which keep the framing,
+    frame pool and queue (MUX priorities, coalescing). open() must be called
+    from a coroutine; the transport then belongs to that loop and is not
+    thread-safe. Frames written during one loop iteration are queued and
+    written together by a single non-blocking os.write() scheduled with
+    call_soon. When the device accepts only part of it, the rest is written
+    from a writer-readiness callback (loop.add_writer) while new frames wait
+    in the queue; received bytes are read from a reader callback
+    (loop.add_reader). With `reconnect` set, a lost device is reopened with
+    the backoff of BaseTransport on loop timers.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Producers run on the loop, so a full queue drops the frame instead of blocking it
+        self.put_timeout = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._fd: int | None = None
+        self._pending: memoryview | None = None # unwritten rest of the last write
+        self._flush_scheduled = False
+        self._receive: Callable[[bytes], None] | None = None
+        self._retry_handle: asyncio.TimerHandle | None = None
+
+    def open(self):
+        """Opens the device and registers it with the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        super().open()
+        if self._queue is None:
+            self._start_writer()
+        if self._lost:
+            self._schedule_reopen()
+        else:
+            self._attach()
+
+    def close(self):
+        self._detach()
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        super().close()
+
+    def _start_writer(self):
+        """Creates the frame queue; writing is driven by the event loop, not a thread."""
+        self._writer_error = None
+        self._queue = self._new_queue()
+
+    def _stop_writer(self):
+        if self._queue is not None:
+            self._queue.close()
+            self._queue = None
+
+    def _attach(self):
+        self._fd = self.dev.fileno()
+        os.set_blocking(self._fd, False)
+        if self._receive is not None:
+            self._loop.add_reader(self._fd, self._on_readable)
+        if self._queue:
+            self._schedule_flush() # e.g. the state queued while the device was gone
+
+    def _detach(self):
+        if self._fd is None:
+            return
+        self._loop.remove_reader(self._fd)
+        self._loop.remove_writer(self._fd)
+        self._fd = None
+        if self._pending is not None:
+            self.bytes_dropped += len(self._pending)
+            self._pending = None
+
+    def _link_failed(self, error: OSError):
+        """Stops using the device; it is reopened if `reconnect` is set, else the next write raises."""
+        dev = self.dev
+        self._detach()
+        if not self.reconnect:
+            self._writer_error = error
+            return
+        self._device_lost(dev, error)
+        self._schedule_reopen()
+
+    def _schedule_reopen(self):
+        delay = max(0.0, self._retry_at - time.monotonic())
+        self._retry_handle = self._loop.call_later(delay, self._try_reopen)
+
+    def _try_reopen(self):
+        self._retry_handle = None
+        if not self._opened:
+            return
+        if self._reopen():
+            self._attach()
+        else:
+            self._schedule_reopen()
+
+    # --- Writing ---
+
+    def write_frame(self, frame: bytes, message_name: str = "MAVLink Frame"):
+        """Queues a frame; it is written once the current loop iteration's callbacks have run."""
+        super().write_frame(frame, message_name)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self._flush_scheduled and self._pending is None:
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._fd is None or self._pending is not None or self._queue is None:
+            return # device gone or not writable yet; frames stay queued
+        batch = self._queue.get_batch(timeout=0, max_bytes=self.batch_bytes)
+        if batch:
+            self._write_batch(batch)
+        if self._queue:
+            self._schedule_flush() # more than one batch; let other callbacks run in between
+
+    def _write_frames(self, frames: list[bytes]) -> bool:
+        data = self._join(frames)
+        try:
+            written = os.write(self._fd, data)
+        except BlockingIOError:
+            written = 0
+        except OSError as e:
+            self.bytes_dropped += len(data)
+            self._link_failed(e)
+            return False
+        if written < len(data):
+            self.short_writes += 1
+            # The joined data lives in a reused buffer, so the rest is copied
+            self._pending = memoryview(bytes(data[written:]))
+            self._loop.add_writer(self._fd, self._on_writable)
+        return True
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._fd, self._pending)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._link_failed(e)
+            return
+        self._pending = self._pending[written:]
+        if not self._pending:
+            self._pending = None
+            self._loop.remove_writer(self._fd)
+            self._flush()
+
+    @property
+    def queue_depth(self) -> int:
+        """Frames waiting in the queue, plus one for a partly written batch."""
+        depth = len(self._queue) if self._queue is not None else 0
+        return depth + (self._pending is not None)
+
+    # --- Reading ---
+
+    def start_reader(self, callback: Callable[[bytes], None]):
+        """Calls `callback` with the unframed MAVLink bytes of everything received, from the event loop."""
+        if not self.is_open:
+            raise IOError(f"{self.port} is not open.")
+        self._receive = callback
+        if self._fd is not None:
+            self._loop.add_reader(self._fd, self._on_readable)
+
+    def stop_reader(self):
+        if self._receive is None:
+            return
+        self._receive = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._link_failed(e)
+            return
+        if not data:
+            # End of file (e.g. hangup): the fd stays readable, so keeping it registered would spin
+            self._link_failed(OSError(f"{self.port} closed (end of file)"))
+            return
+        self.bytes_received += len(data)
+        for chunk in self.decode_received(data):
+            self._receive(chunk)
+
+class AsyncRawTransport(AsyncSerialLink, RawTransport):
+    """Raw MAVLink over serial on an asyncio event loop."""
+
+class AsyncSlipTransport(AsyncSerialLink, SlipTransport):
+    """MUX-addressed SLIP over serial on an asyncio event loop."""
@@ -1,3 +1,8 @@
+import select
+import threading
+import time
+from collections import deque
+from typing import Callable
 import serial
 from abc import ABC, abstractmethod
 
@@ -9,20 +14,258 @@ def hex_dump(prefix: str, data: bytes):
     pairs = [hex_str[i:i+2] for i in range(0, len(hex_str), 2)]
     print(f"{prefix}\nlen={len(data)} bytes: {' '.join(pairs)}\n")
 
+# Size of the pooled frame buffers: a MAVLink 2 packet (at most 280 bytes) with every byte
+# SLIP-escaped, plus the MUX address and END byte
+FRAME_BUFFER_SIZE = 1024
+
+class BufferPool:
+    """
+    Free list of fixed-size bytearrays that frames are encoded into.
+
+    Transports hand out frames as memoryviews of pooled buffers; the writer
+    returns the buffer once the frame is on the wire. When the pool is empty
+    a new buffer is allocated, so frames dropped elsewhere (e.g. evicted from
+    a full queue) only cost an allocation later. acquire() and release() use
+    single deque operations, which are atomic, so producer and writer threads
+    need no lock.
+    """
+    def __init__(self, buffer_size: int = FRAME_BUFFER_SIZE, preallocate: int = 32, max_free: int = 256):
+        self.buffer_size = buffer_size
+        self.max_free = max_free
+        self._free: deque[bytearray] = deque(bytearray(buffer_size) for _ in range(preallocate))
+        self.allocated = preallocate
+
+    def acquire(self) -> bytearray:
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.allocated += 1
+            return bytearray(self.buffer_size)
+
+    def release(self, frame):
+        """Returns the buffer behind a frame from acquire(); other frames (e.g. bytes) are ignored."""
+        buf = getattr(frame, "obj", None)
+        if type(buf) is bytearray and len(buf) == self.buffer_size and len(self._free) < self.max_free:
+            self._free.append(buf)
+
+class FrameQueue:
+    """
+    Bounded FIFO of framed packets waiting for the background writer.
+    The writer takes every frame that is ready at once, so frames produced
+    within one tick are coalesced into a single write.
+
+    With `coalesce=True` the queue holds at most one frame per message type:
+    a new frame replaces the queued one of its type in place (counted in
+    `coalesced`), so a slow or disconnected link gets the latest state
+    instead of a backlog of outdated frames, and the queue stays bounded
+    by the number of message types.
+
+    With `drop_oldest=True` a full queue drops its oldest frame (counted in
+    `evicted`) instead of blocking the producer, e.g. while the writer waits
+    for a lost device. Frames that leave the queue without being written are
+    passed to `discard`, so the transport can return their buffers to its pool.
+    """
+    def __init__(self, maxsize: int = 256, coalesce: bool = False, drop_oldest: bool = False):
+        self.maxsize = maxsize
+        self._frames: deque[bytes] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self.drop_oldest = drop_oldest
+        self.evicted = 0
+        self.discard: Callable[[bytes], None] | None = None
+        # Message type -> its last frame put, which may still be queued
+        self._latest: dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: bytes, message_name: str, timeout: float | None = None) -> bool:
+        """
+        Appends a frame, blocking while the queue is full (unless `drop_oldest`).
+        Returns False if the frame could not be queued within `timeout`.
+        """
+        with self._cond:
+            if self.coalesce and self._replace_latest(self._frames, message_name, frame):
+                return True
+            if self.drop_oldest and len(self._frames) >= self.maxsize and self._frames:
+                self._discard(self._frames.popleft())
+                self.evicted += 1
+            if not self._cond.wait_for(lambda: self._closed or len(self._frames) < self.maxsize, timeout):
+                return False
+            if self._closed:
+                return False
+            self._frames.append(frame)
+            self._cond.notify_all()
+            return True
+
+    def _replace_latest(self, frames: deque, message_name: str, frame: bytes) -> bool:
+        """
+        Replaces the queued frame of the same message type in `frames` with `frame`.
+        Returns False if none is queued. `frames` holds at most one frame per type
+        when coalescing, so the search is short.
+        """
+        msg_type = message_name.split(" ", 1)[0]
+        previous = self._latest.get(msg_type)
+        self._latest[msg_type] = frame
+        if previous is None or self._closed:
+            return False
+        for i, queued in enumerate(frames):
+            if queued is previous:
+                frames[i] = frame
+                self.coalesced += 1
+                self._discard(previous)
+                return True
+        return False
+
+    def _discard(self, frame: bytes):
+        """Hands a frame that will not be written to `discard`."""
+        if self.discard is not None:
+            self.discard(frame)
+
+    def get_batch(self, timeout: float | None = None, max_bytes: int | None = None) -> list[bytes]:
+        """
+        Waits for at least one frame and returns the frames that are ready,
+        up to `max_bytes` in total (but always at least one frame).
+        Returns an empty list on timeout or once the queue is closed and drained.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._frames, timeout)
+            if max_bytes is None:
+                batch = list(self._frames)
+                self._frames.clear()
+            else:
+                batch = []
+                size = 0
+                while self._frames and (not batch or size + len(self._frames[0]) <= max_bytes):
+                    frame = self._frames.popleft()
+                    batch.append(frame)
+                    size += len(frame)
+            self._cond.notify_all()
+            return batch
+
+    def close(self):
+        """Wakes up all waiters; frames already queued can still be drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
 class BaseTransport(ABC):
     """
     Abstract Base Class for MAVLink transport layers.
     Defines the interface for sending MAVLink packets over a physical link.
+
+    With `writer_thread=True` frames are handed to a background thread through
+    a bounded FrameQueue, so encoding and serial I/O overlap and all frames
+    ready in one tick are written and flushed as a single batch.
+
+    encode_frame() frames each packet into a buffer from `pool` and returns a
+    memoryview of it; batches are copied into one reused buffer and written
+    from a memoryview, and the frame buffers go back to the pool afterwards.
+
+    start_reader() starts a thread that reads everything the device sends,
+    removes the transport framing (decode_received) and passes the MAVLink
+    bytes to a callback.
+
+    Writes are non-blocking; when the device accepts only part of a batch
+    (the tty buffer is full), the rest is written as soon as the device is
+    writable again, or dropped and counted after `write_stall_timeout`.
+    Frame sizes, write latency and short writes are recorded for link
+    monitoring (see rate_control.RateController).
+
+    With `reconnect` set, a serial device that disappears (e.g. a USB device
+    re-enumerating) is reopened with exponential backoff instead of failing
+    the writes. While it is gone the writer thread leaves the frames queued,
+    so with `coalesce` the queue keeps the latest frame of each message type
+    and that state is written as soon as the device is back. Without it, a
+    full queue drops its oldest frames rather than blocking the producer.
+
+    The device I/O lives in open(), close(), _write_frames() and
+    _reader_loop(); network_transport replaces them with sockets and
+    async_transport with asyncio fd callbacks.
     """
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0):
+    WRITE_LATENCY_SMOOTHING = 0.2 # weight of the newest sample in the write latency average
+    RECONNECT_MIN_S = 0.5
+    RECONNECT_MAX_S = 10.0
+
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0,
+                 writer_thread: bool = False, queue_size: int = 256, batch_ms: float | None = None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.dev: serial.Serial | None = None
+        self._opened = False
+
+        self.writer_thread = writer_thread
+        self.queue_size = queue_size
+        # Limit each write to about `batch_ms` of link time (8N1: 10 bits per byte), so frames
+        # stay queued, and can be reordered, while the link is saturated. None = no limit.
+        self.batch_bytes = None if batch_ms is None else max(1, int(baudrate / 10 * batch_ms / 1e3))
+        self._queue: FrameQueue | None = None
+        self._writer: threading.Thread | None = None
+        self._writer_error: Exception | None = None
+        # Seconds write_frame() waits for space in a full queue; None = until there is space,
+        # 0 = drop the frame at once (frames_dropped), so a slow link never blocks the producer
+        self.put_timeout: float | None = None
+        self.frames_dropped = 0
+        # Keep only the newest queued frame of each message type (see FrameQueue)
+        self.coalesce = False
+        # Reopen a lost serial device with backoff instead of raising IOError
+        self.reconnect = False
+        self.reconnects = 0
+        self._lost = False
+        self._retry_at = 0.0
+        self._retry_delay = self.RECONNECT_MIN_S
+        self._dev_lock = threading.Lock()
+        self.pool = BufferPool(preallocate=min(queue_size, 32), max_free=queue_size + 8)
+        self._batch_buffer = bytearray(self.batch_bytes + FRAME_BUFFER_SIZE if self.batch_bytes else 4096)
+
+        # Link monitoring
+        self.write_stall_timeout = 1.0
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.short_writes = 0
+        self.bytes_dropped = 0
+        self.write_latency: float | None = None # smoothed seconds per write + flush
+        self.frame_sizes: dict[str, int] = {} # message type -> size of its last frame on the wire
+
+        # Optional recorder (e.g. capture.CaptureRecorder) receiving every packet and frame sent
+        self.capture = None
+        # Optional metrics.Metrics collecting frame sizes and framing/write latencies
+        self.metrics = None
+        # Optional debug output called with (message_name, frame) for every frame, e.g. hex_dump
+        self.debug_sink: Callable[[str, bytes], None] | None = None
+
+        self._reader: threading.Thread | None = None
+        self._reading = False
+        self.bytes_received = 0
 
     def open(self):
-        """Opens the serial device with pyserial."""
-        self.dev = serial.Serial(
+        """
+        Opens the serial device with pyserial. With `reconnect` set, a device
+        that is not there yet is retried in the background instead of raising.
+        """
+        try:
+            self.dev = self._open_device()
+        except serial.SerialException as e:
+            if not self.reconnect:
+                raise
+            print(f"Serial device {self.port} not available ({e}), retrying")
+            self._lost = True
+            self._schedule_retry()
+        else:
+            print(f"Opened serial device: {self.port} @ {self.baudrate} baud")
+        self._opened = True
+        if self.writer_thread:
+            self._start_writer()
+
+    def _open_device(self) -> serial.Serial:
+        return serial.Serial(
             port=self.port,
             baudrate=self.baudrate,
             bytesize=serial.EIGHTBITS,
@@ -31,19 +274,338 @@ class BaseTransport(ABC):
             timeout=self.timeout,
             write_timeout=0  # non-blocking writes
         )
-        print(f"Opened serial device: {self.port} @ {self.baudrate} baud")
+
+    @property
+    def is_open(self) -> bool:
+        """True between open() and close(), also while a lost device is being reconnected."""
+        return self._opened
 
     def close(self):
         """Closes the serial device."""
-        if self.dev and self.dev.is_open:
-            self.dev.close()
+        self.stop_reader()
+        self._stop_writer()
+        if self._opened:
+            self._opened = False
+            self._lost = False
+            with self._dev_lock:
+                dev, self.dev = self.dev, None
+            if dev is not None and dev.is_open:
+                dev.close()
             print(f"Closed serial device: {self.port}")
+
+    def _device_lost(self, dev: serial.Serial, reason):
+        """Closes `dev` if it is still the current device, and schedules reopening it."""
+        with self._dev_lock:
+            if self.dev is not dev:
+                return # already handled by the other thread
             self.dev = None
+            self._lost = True
+        try:
+            dev.close()
+        except (OSError, serial.SerialException):
+            pass
+        self._reset_retry()
+        self._schedule_retry()
+        print(f"Serial device {self.port} lost ({reason}), reconnecting")
+
+    def _schedule_retry(self) -> float:
+        """
+        Sets the time of the next reconnection attempt, doubling the delay up to
+        RECONNECT_MAX_S for the one after it. Returns the delay until the next attempt.
+        """
+        delay = self._retry_delay
+        self._retry_at = time.monotonic() + delay
+        self._retry_delay = min(delay * 2, self.RECONNECT_MAX_S)
+        return delay
+
+    def _reset_retry(self):
+        """Starts over with RECONNECT_MIN_S once the link is up or newly lost."""
+        self._retry_delay = self.RECONNECT_MIN_S
+
+    def _reopen(self) -> bool:
+        """Tries to reopen a lost device once its backoff has expired. Returns True if it is open."""
+        if not self._lost:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            dev = self._open_device()
+        except serial.SerialException:
+            self._schedule_retry()
+            return False
+        with self._dev_lock:
+            self.dev = dev
+            self._lost = False
+        self._reset_retry()
+        self.reconnects += 1
+        print(f"Serial device {self.port} reconnected")
+        return True
+
+    def _start_writer(self):
+        self._writer_error = None
+        self._queue = self._new_queue()
+        self._writer = threading.Thread(target=self._writer_loop, name=f"writer-{self.port}", daemon=True)
+        self._writer.start()
+
+    def _create_queue(self) -> FrameQueue:
+        """Creates the queue between producers and the writer thread."""
+        return FrameQueue(self.queue_size)
+
+    def _new_queue(self) -> FrameQueue:
+        """
+        Creates the queue and configures it for this transport. With `reconnect`
+        a full queue drops its oldest frame, so the producer never blocks on a
+        lost device.
+        """
+        queue = self._create_queue()
+        queue.coalesce = self.coalesce
+        queue.drop_oldest = self.reconnect
+        queue.discard = self.pool.release
+        return queue
+
+    def _stop_writer(self):
+        """Stops the writer thread after the frames already queued are written."""
+        if self._writer is None:
+            return
+        self._queue.close()
+        self._writer.join()
+        self._writer = None
+        self._queue = None
+
+    def _writer_loop(self):
+        queue = self._queue
+        while True:
+            if not self._reopen():
+                # Frames stay queued (and coalesce) until the device is back
+                if queue.closed:
+                    return
+                time.sleep(min(0.1, max(0.0, self._retry_at - time.monotonic())))
+                continue
+            batch = queue.get_batch(timeout=0.5, max_bytes=self.batch_bytes)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    # Surfaced to the producer by the next write_packet() call
+                    self._writer_error = e
+                    queue.close()
+                    return
+            elif queue.closed:
+                return
+
+    def _write_batch(self, frames: list[bytes]):
+        """
+        Writes already framed packets, then returns their buffers to the pool,
+        also when writing raises.
+        A batch dropped without reaching the device (counted in bytes_dropped)
+        is not counted as written and does not affect the write latency.
+        """
+        started = time.monotonic()
+        try:
+            if self._write_frames(frames):
+                latency = time.monotonic() - started
+                if self.write_latency is None:
+                    self.write_latency = latency
+                else:
+                    self.write_latency += self.WRITE_LATENCY_SMOOTHING * (latency - self.write_latency)
+                self.frames_written += len(frames)
+                self.bytes_written += sum(len(frame) for frame in frames)
+                if self.metrics is not None:
+                    self.metrics.observe_write(latency)
+        finally:
+            for frame in frames:
+                self.pool.release(frame)
+
+    def _join(self, frames: list[bytes]) -> bytes:
+        """Returns a single frame as is, or several copied into the reused batch buffer."""
+        if len(frames) == 1:
+            return frames[0]
+        size = sum(len(frame) for frame in frames)
+        if size > len(self._batch_buffer):
+            self._batch_buffer = bytearray(size)
+        view = memoryview(self._batch_buffer)
+        offset = 0
+        for frame in frames:
+            view[offset:offset + len(frame)] = frame
+            offset += len(frame)
+        return view[:size]
+
+    def _write_frames(self, frames: list[bytes]) -> bool:
+        """
+        Writes frames to the device with a single write and flush. Returns False
+        if they were dropped because the device is gone.
+        """
+        if not self._reopen():
+            self.bytes_dropped += sum(len(frame) for frame in frames)
+            return False
+        data = self._join(frames)
+        dev = self.dev
+        try:
+            written = dev.write(data)
+            if written is not None and written < len(data):
+                self.short_writes += 1
+                self._write_remaining(dev, memoryview(data)[written:])
+            dev.flush()
+        except (serial.SerialException, OSError) as e:
+            if not self.reconnect:
+                raise
+            self._device_lost(dev, e)
+            self.bytes_dropped += len(data)
+            return False
+        return True
+
+    def _write_remaining(self, dev: serial.Serial, data: memoryview):
+        """
+        Writes what a non-blocking write to `dev` did not accept, waiting up to
+        `write_stall_timeout`. Takes the device from the caller, as the reader
+        thread may clear self.dev when it loses the device.
+        """
+        deadline = time.monotonic() + self.write_stall_timeout
+        try:
+            fd = dev.fileno()
+        except (AttributeError, OSError):
+            fd = None
+        while data:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.bytes_dropped += len(data)
+                print(f"Serial link stalled, dropped {len(data)} bytes")
+                return
+            if fd is not None:
+                select.select([], [fd], [], remaining)
+            else:
+                time.sleep(0.001)
+            data = data[dev.write(data) or 0:]
+
+    @property
+    def out_waiting(self) -> int:
+        """Bytes in the device's output buffer that have not been transmitted yet."""
+        try:
+            return self.dev.out_waiting if self.is_open else 0
+        except (AttributeError, OSError, NotImplementedError):
+            return 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Frames waiting for the writer thread."""
+        return len(self._queue) if self._queue is not None else 0
+
+    @property
+    def frames_coalesced(self) -> int:
+        """Queued frames replaced by a newer frame of the same message type."""
+        return self._queue.coalesced if self._queue is not None else 0
+
+    def start_reader(self, callback: Callable[[bytes], None]):
+        """
+        Starts a background thread that reads from the device and calls
+        `callback` with the unframed MAVLink bytes of everything received.
+        """
+        if not self.is_open:
+            raise IOError(f"{self.port} is not open.")
+        self._reading = True
+        self._reader = threading.Thread(target=self._reader_loop, args=(callback,),
+                                        name=f"reader-{self.port}", daemon=True)
+        self._reader.start()
+
+    def stop_reader(self):
+        """Stops the reader thread."""
+        if self._reader is None:
+            return
+        self._reading = False
+        self._reader.join()
+        self._reader = None
+
+    def _reader_loop(self, callback: Callable[[bytes], None]):
+        dev = fd = None
+        while self._reading:
+            if dev is None or dev is not self.dev:
+                dev = self.dev
+                if dev is None:
+                    time.sleep(0.1) # waiting for the device to be reopened
+                    continue
+                try:
+                    fd = dev.fileno()
+                except (AttributeError, OSError):
+                    fd = None # no selectable descriptor (e.g. Windows); fall back to polling
+            try:
+                if fd is not None:
+                    readable, _, _ = select.select([fd], [], [], 0.1)
+                    if not readable:
+                        continue
+                data = dev.read(max(dev.in_waiting, 1))
+            except (serial.SerialException, OSError, TypeError, ValueError) as e:
+                if not self.reconnect:
+                    raise
+                self._device_lost(dev, e) # no-op if the writer already replaced it
+                continue
+            if not data:
+                if fd is None:
+                    time.sleep(0.01)
+                continue
+            self.bytes_received += len(data)
+            for chunk in self.decode_received(data):
+                callback(chunk)
+
+    def decode_received(self, data: bytes) -> list[bytes]:
+        """
+        Removes the transport framing from received bytes and returns MAVLink
+        byte chunks for the parser. The raw transport passes them through.
+        """
+        return [data]
 
     @abstractmethod
-    def write_packet(self, raw_mavlink_packet: bytes, message_name: str = "MAVLink Message"):
+    def encode_frame(self, raw_mavlink_packet: bytes, message_name: str = "") -> bytes:
         """
-        Abstract method to write a MAVLink packet.
-        Concrete implementations will handle specific framing (e.g., SLIP).
+        Abstract method to frame a MAVLink packet.
+        Concrete implementations will handle specific framing (e.g., SLIP),
+        writing the frame into a buffer from self.pool and returning a memoryview of it.
+        `raw_mavlink_packet` may be a view of a reused buffer and must be copied.
         """
         pass
+
+    def write_packet(self, raw_mavlink_packet: bytes, message_name: str = "MAVLink Message"):
+        """
+        Frames a MAVLink packet and writes it to the device, either directly or
+        through the background writer thread.
+        """
+        msg_type = message_name.split(" ", 1)[0]
+        started = time.perf_counter() if self.metrics is not None else 0.0
+        final_packet = self.encode_frame(raw_mavlink_packet, message_name)
+        try:
+            if self.metrics is not None:
+                self.metrics.record_frame(msg_type, len(raw_mavlink_packet), len(final_packet),
+                                          time.perf_counter() - started)
+            self.frame_sizes[msg_type] = len(final_packet)
+            if self.capture is not None:
+                # The capture keeps the packets until its thread writes them, so it gets copies
+                self.capture.record(bytes(raw_mavlink_packet), bytes(final_packet))
+        except BaseException:
+            self.pool.release(final_packet)
+            raise
+        self.write_frame(final_packet, message_name) # releases the buffer if it does not take it
+
+    def write_frame(self, frame: bytes, message_name: str = "MAVLink Frame"):
+        """
+        Writes an already framed packet (e.g. a replayed wire capture) to the device.
+        A pooled frame goes back to the pool once written, dropped, or if this raises.
+        """
+        owned = True # until the queue or _write_batch() takes the frame
+        try:
+            if not self.is_open:
+                raise IOError(f"{self.port} is not open.")
+            if self._writer_error is not None:
+                raise IOError(f"Writer for {self.port} failed: {self._writer_error}")
+
+            if self.debug_sink is not None:
+                self.debug_sink(message_name, frame)
+            if self._queue is not None:
+                if self._queue.put(frame, message_name, self.put_timeout):
+                    owned = False
+                else:
+                    self.frames_dropped += 1
+            else:
+                owned = False
+                self._write_batch([frame])
+        finally:
+            if owned:
+                self.pool.release(frame)
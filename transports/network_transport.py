@@ -0,0 +1,270 @@
+import select
+import socket
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+from .raw_transport import RawTransport
+from .slip_transport import SlipTransport
+
+try:
+    import fcntl
+except ImportError: # Windows: out_waiting is not available
+    fcntl = None
+
+# Linux socket ioctls: bytes in the send queue, and bytes in it not sent yet (TCP)
+SIOCOUTQ = 0x5411
+SIOCOUTQNSD = 0x894B
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Splits "host:port" (or "[v6 address]:port"); the host defaults to localhost."""
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"Expected a host:port network address, got '{address}'")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+class SocketLink(ABC):
+    """
+    Socket I/O replacing the serial device of BaseTransport.
+
+    Mixed in before RawTransport or SlipTransport, which keep the framing,
+    frame pool, writer queue and MUX priorities. `port` is the "host:port"
+    to send to; `baudrate` only sets the link budget used for batch sizing
+    and rate control. Sockets are non-blocking: when the kernel buffer is
+    full, sending waits up to `write_stall_timeout` for it to drain and then
+    drops the rest, like a stalled serial link.
+    """
+    KIND = "socket"
+    OUT_WAITING_IOCTL = SIOCOUTQ
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.address = parse_address(self.port)
+        self.sock: socket.socket | None = None
+        self._sock_lock = threading.Lock()
+
+    def open(self):
+        """Creates the socket and starts the writer thread if enabled."""
+        self._opened = True
+        self._connect()
+        print(f"Opened {self.KIND} link to {self.port}")
+        if self.writer_thread:
+            self._start_writer()
+
+    def close(self):
+        """Stops the threads and closes the socket."""
+        self.stop_reader()
+        self._stop_writer()
+        if self._opened:
+            self._opened = False
+            with self._sock_lock:
+                sock, self.sock = self.sock, None
+            if sock is not None:
+                sock.close()
+            print(f"Closed {self.KIND} link to {self.port}")
+
+    @abstractmethod
+    def _connect(self) -> bool:
+        """Creates and connects the socket. Returns False if it is not usable yet."""
+        pass
+
+    def _connection_lost(self, sock: socket.socket, reason):
+        """Closes `sock` if it is still the current socket; the next write reconnects."""
+        with self._sock_lock:
+            if self.sock is not sock:
+                return # already handled by the other thread
+            self.sock = None
+        sock.close()
+        print(f"{self.KIND} link to {self.port} lost ({reason})")
+
+    def _wait_writable(self, sock: socket.socket, deadline: float) -> bool:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        select.select([], [sock], [], remaining)
+        return True
+
+    def _drop(self, size: int, reason: str = ""):
+        self.bytes_dropped += size
+        if reason:
+            print(f"{self.KIND} link to {self.port} {reason}, dropped {size} bytes")
+
+    @property
+    def out_waiting(self) -> int:
+        """Bytes queued in the socket's kernel send buffer (Linux only)."""
+        sock = self.sock
+        if sock is None or fcntl is None:
+            return 0
+        try:
+            return struct.unpack("i", fcntl.ioctl(sock.fileno(), self.OUT_WAITING_IOCTL, b"\0" * 4))[0]
+        except (OSError, ValueError):
+            return 0
+
+    def _peer_closed(self, sock: socket.socket):
+        """Called when the socket reads end of stream."""
+
+    def _receive_failed(self, sock: socket.socket, error: Exception):
+        """Called when reading fails, e.g. the socket was closed by the writer."""
+
+    def _reader_loop(self, callback: Callable[[bytes], None]):
+        while self._reading:
+            sock = self.sock
+            if sock is None:
+                time.sleep(0.1) # waiting for the writer to reconnect
+                continue
+            try:
+                readable, _, _ = select.select([sock], [], [], 0.1)
+                if not readable:
+                    continue
+                data = sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except (OSError, ValueError) as e:
+                self._receive_failed(sock, e)
+                continue
+            if not data:
+                self._peer_closed(sock)
+                continue
+            self.bytes_received += len(data)
+            for chunk in self.decode_received(data):
+                callback(chunk)
+
+class UdpLink(SocketLink):
+    """
+    Sends frames as UDP datagrams from one connected socket. A batch is
+    packed into as few datagrams as possible, up to MAX_DATAGRAM bytes each,
+    without splitting a frame. Datagrams the destination refuses (nothing
+    listening) are counted as dropped.
+    """
+    KIND = "UDP"
+    MAX_DATAGRAM = 1472 # Ethernet MTU minus IP and UDP headers
+
+    def _connect(self) -> bool:
+        family, kind, proto, _, address = socket.getaddrinfo(*self.address, type=socket.SOCK_DGRAM)[0]
+        sock = socket.socket(family, kind, proto)
+        sock.setblocking(False)
+        sock.connect(address) # only sets the default destination
+        self.sock = sock
+        return True
+
+    def _write_frames(self, frames: list[bytes]) -> bool:
+        """Returns False if no datagram of the batch could be sent."""
+        start = 0
+        size = 0
+        sent = False
+        for i, frame in enumerate(frames):
+            if size and size + len(frame) > self.MAX_DATAGRAM:
+                sent |= self._send_datagram(self._join(frames[start:i]))
+                start = i
+                size = 0
+            size += len(frame)
+        sent |= self._send_datagram(self._join(frames[start:]))
+        return sent
+
+    def _send_datagram(self, data: bytes) -> bool:
+        sock = self.sock
+        if sock is None:
+            self._drop(len(data))
+            return False
+        deadline = None
+        while True:
+            try:
+                sock.send(data)
+                return True
+            except BlockingIOError:
+                if deadline is None:
+                    self.short_writes += 1
+                    deadline = time.monotonic() + self.write_stall_timeout
+                if not self._wait_writable(sock, deadline):
+                    self._drop(len(data), "stalled")
+                    return False
+            except ConnectionRefusedError:
+                self._drop(len(data)) # ICMP port unreachable for an earlier datagram
+                return False
+
+class TcpLink(SocketLink):
+    """
+    Sends the frame stream over one TCP connection. The connection is kept
+    open across writes; when it is lost or cannot be established, frames are
+    dropped and counted, and reconnecting is retried with the exponential
+    backoff of BaseTransport (RECONNECT_MIN_S to RECONNECT_MAX_S).
+
+    Reconnecting blocks for up to CONNECT_TIMEOUT_S, so it must not happen on
+    the producer's (scheduler's) thread: TCP links always write from the
+    writer thread, whatever `writer_thread` was given.
+    """
+    KIND = "TCP"
+    OUT_WAITING_IOCTL = SIOCOUTQNSD # unsent bytes only; acknowledgements in flight are not backpressure
+    CONNECT_TIMEOUT_S = 2.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer_thread = True
+        self._connected_before = False
+
+    def _connect(self) -> bool:
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            sock = socket.create_connection(self.address, timeout=self.CONNECT_TIMEOUT_S)
+        except OSError as e:
+            print(f"TCP connect to {self.port} failed ({e}), retrying in {self._schedule_retry():.1f} s")
+            return False
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(False)
+        self._reset_retry()
+        if self._connected_before:
+            self.reconnects += 1
+            print(f"TCP link to {self.port} reconnected")
+        self._connected_before = True
+        self.sock = sock
+        return True
+
+    def _write_frames(self, frames: list[bytes]) -> bool:
+        """Returns False if nothing of the batch could be sent."""
+        data = memoryview(self._join(frames))
+        total = len(data)
+        sock = self.sock
+        if sock is None:
+            if not self._connect():
+                self._drop(total)
+                return False
+            sock = self.sock
+        deadline = None
+        while data:
+            try:
+                data = data[sock.send(data):]
+                continue
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                self._connection_lost(sock, e)
+                self._drop(len(data))
+                return len(data) < total
+            if deadline is None:
+                self.short_writes += 1
+                deadline = time.monotonic() + self.write_stall_timeout
+            if not self._wait_writable(sock, deadline):
+                self._drop(len(data), "stalled")
+                return len(data) < total
+        return True
+
+    def _peer_closed(self, sock: socket.socket):
+        self._connection_lost(sock, "closed by peer")
+
+    def _receive_failed(self, sock: socket.socket, error: Exception):
+        if self.sock is sock:
+            self._connection_lost(sock, error)
+
+class UdpRawTransport(UdpLink, RawTransport):
+    """Raw MAVLink packets over UDP, as MAVLink routers and ground stations expect them."""
+
+class UdpSlipTransport(UdpLink, SlipTransport):
+    """MUX-addressed SLIP frames over UDP."""
+
+class TcpRawTransport(TcpLink, RawTransport):
+    """Raw MAVLink packets over a TCP connection."""
+
+class TcpSlipTransport(TcpLink, SlipTransport):
+    """MUX-addressed SLIP frames over a TCP connection, byte-identical to the serial stream."""
@@ -0,0 +1,31 @@
+from .raw_transport import RawTransport
+from .slip_transport import SlipTransport
+
+class NullLink:
+    """
+    Link without a device, mixed in before RawTransport or SlipTransport:
+    packets are framed, captured and counted like on a real link, and the
+    frames are discarded. Used for benchmarks and to generate captures
+    without hardware.
+    """
+    def open(self):
+        self._opened = True
+        if self.writer_thread:
+            self._start_writer()
+
+    def close(self):
+        self._stop_writer()
+        self._opened = False
+
+    def _write_frames(self, frames: list[bytes]) -> bool:
+        return True
+
+    @property
+    def out_waiting(self) -> int:
+        return 0
+
+class NullRawTransport(NullLink, RawTransport):
+    """Raw MAVLink framing on a discarding link."""
+
+class NullSlipTransport(NullLink, SlipTransport):
+    """MUX-addressed SLIP framing on a discarding link."""
@@ -1,4 +1,6 @@
-from .base_transport import BaseTransport, hex_dump
+from collections import deque
+from typing import Callable
+from .base_transport import BaseTransport, FrameQueue
 
 class Slip:
     """
@@ -15,6 +17,9 @@ class Slip:
     ESC_END_b = b"\xdc"
     ESC_ESC_b = b"\xdd"
 
+    # Frames with more escapes than this are escaped with bytes.replace() in encode_into()
+    MAX_INPLACE_ESCAPES = 8
+
     @staticmethod
     def encode(data: bytes) -> bytes:
         """Encodes raw bytes into a SLIP frame."""
@@ -24,19 +29,313 @@ class Slip:
             .replace(Slip.END_b, Slip.ESC_b + Slip.ESC_END_b)
             + Slip.END_b
         )
+
+    @staticmethod
+    def encode_into(data, buf: bytearray, offset: int = 0) -> int:
+        """
+        Writes the SLIP frame of `data` (any bytes-like object) into `buf` at
+        `offset` and returns the offset after its END byte.
+
+        `data` is copied into place and the bytes that need escaping are
+        counted with bytearray.count(). A few escapes are expanded in place,
+        moving the segments between them backwards from the end; only frames
+        with many escapes fall back to bytes.replace() and allocate.
+        """
+        length = len(data)
+        view = memoryview(buf)
+        view[offset:offset + length] = data
+        read_end = offset + length
+        escapes = buf.count(Slip.END, offset, read_end) + buf.count(Slip.ESC, offset, read_end)
+        if escapes > Slip.MAX_INPLACE_ESCAPES:
+            encoded = Slip.encode(bytes(view[offset:read_end]))
+            view[offset:offset + len(encoded)] = encoded
+            return offset + len(encoded)
+
+        frame_end = read_end + escapes
+        write_end = frame_end
+        while escapes:
+            special = max(buf.rfind(Slip.END, offset, read_end), buf.rfind(Slip.ESC, offset, read_end))
+            segment = read_end - special - 1
+            if segment:
+                view[write_end - segment:write_end] = view[special + 1:read_end]
+                write_end -= segment
+            buf[write_end - 1] = Slip.ESC_END if buf[special] == Slip.END else Slip.ESC_ESC
+            buf[write_end - 2] = Slip.ESC
+            write_end -= 2
+            read_end = special
+            escapes -= 1
+        buf[frame_end] = Slip.END
+        return frame_end + 1
+
+    @staticmethod
+    def decode(frame: bytes) -> bytes:
+        """
+        Decodes the contents of one SLIP frame (without the END byte).
+        Raises ValueError on an invalid escape sequence.
+        """
+        escapes = frame.count(Slip.ESC_b)
+        if escapes == 0:
+            return bytes(frame)
+        if escapes != frame.count(Slip.ESC_b + Slip.ESC_END_b) + frame.count(Slip.ESC_b + Slip.ESC_ESC_b):
+            raise ValueError("Invalid SLIP escape sequence")
+        # The byte after ESC is never ESC itself, so the two replacements cannot overlap
+        return (
+            bytes(frame)
+            .replace(Slip.ESC_b + Slip.ESC_END_b, Slip.END_b)
+            .replace(Slip.ESC_b + Slip.ESC_ESC_b, Slip.ESC_b)
+        )
+
+class SlipDecoder:
+    """
+    Incremental decoder for a stream of MUX-addressed SLIP frames
+    (one MUX address byte, SLIP-encoded payload, END).
+
+    Bytes can be fed in arbitrary chunks; frame boundaries are found with
+    bytes.find() and whole frames are unescaped at once, so decoding does not
+    create an object per byte. A frame with an invalid escape sequence or one
+    that grows beyond `max_frame_len` is dropped, and decoding resynchronizes
+    at the next END byte.
+    """
+    def __init__(self, max_frame_len: int = 1024):
+        self.max_frame_len = max_frame_len
+        self._buf = bytearray()
+        self._discarding = False
+
+        self.frames = 0
+        self.corrupt_frames = 0
+
+    def feed(self, data: bytes) -> list[tuple[int, bytes]]:
+        """Decodes `data` and returns the (mux_address, payload) of every frame it completed."""
+        buf = self._buf
+        scan_from = len(buf)
+        buf += data
+
+        decoded = []
+        start = 0
+        end = buf.find(Slip.END_b, scan_from)
+        while end != -1:
+            if self._discarding:
+                # Tail of an oversized frame; the stream is in sync again after this END
+                self._discarding = False
+            elif end - start > self.max_frame_len:
+                self.corrupt_frames += 1
+            elif end - start > 1:
+                frame = buf[start:end]
+                try:
+                    decoded.append((frame[0], Slip.decode(frame[1:])))
+                    self.frames += 1
+                except ValueError:
+                    self.corrupt_frames += 1
+            elif end - start == 1:
+                self.corrupt_frames += 1 # MUX address without payload
+            start = end + 1
+            end = buf.find(Slip.END_b, start)
+        del buf[:start]
+
+        if len(buf) > self.max_frame_len:
+            buf.clear()
+            self._discarding = True
+            self.corrupt_frames += 1
+        return decoded
+
+    def reset(self):
+        """Drops any partially received frame."""
+        self._buf.clear()
+        self._discarding = False
+
+class _MuxChannel:
+    """Per MUX address queues (one per priority level) and deficit counter."""
+    def __init__(self, mux_address: int, weight: int, levels: int):
+        self.mux_address = mux_address
+        self.weight = weight
+        self.levels: list[deque[bytes]] = [deque() for _ in range(levels)]
+        self.deficit = 0
+
+class MuxFrameQueue(FrameQueue):
+    """
+    Outbound queue for several logical MUX channels sharing one serial link.
+
+    Frames are classified by the MUX address they are framed for (their first
+    byte) and by the priority of their message type (0 = most important).
+    The writer always takes the most important priority level that has frames;
+    within a level, channels share the link by deficit round robin according
+    to their weights. When the queue is full, a more important frame evicts
+    the oldest frame of the least important level instead of waiting for space.
+    With `coalesce` a frame replaces the queued one of its type, and with
+    `drop_oldest` a full queue never blocks (see FrameQueue).
+    """
+    QUANTUM_BYTES = 600 # larger than any SLIP-escaped MAVLink frame, so every visit can send
+
+    def __init__(self, maxsize: int = 256, priorities: dict[str, int] | None = None,
+                 weights: dict[int, int] | None = None, levels: int = 3, default_priority: int = 1):
+        super().__init__(maxsize)
+        self.priorities = priorities or {}
+        self.levels = levels
+        self.default_priority = min(default_priority, levels - 1)
+        self._channels: dict[int, _MuxChannel] = {}
+        self._channel_order: list[_MuxChannel] = []
+        self._rr_index = 0
+        self._rr_fresh = True
+        self._count = 0
+        for mux_address, weight in (weights or {}).items():
+            self._add_channel(mux_address, weight)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _add_channel(self, mux_address: int, weight: int = 1) -> _MuxChannel:
+        channel = _MuxChannel(mux_address, max(1, weight), self.levels)
+        self._channels[mux_address] = channel
+        self._channel_order.append(channel)
+        return channel
+
+    def priority_of(self, message_name: str) -> int:
+        """Priority level of a message, looked up by its type (the name up to the first space)."""
+        priority = self.priorities.get(message_name.split(" ", 1)[0], self.default_priority)
+        return min(max(priority, 0), self.levels - 1)
+
+    def put(self, frame: bytes, message_name: str, timeout: float | None = None) -> bool:
+        priority = self.priority_of(message_name)
+        with self._cond:
+            channel = self._channels.get(frame[0])
+            if self.coalesce and self._replace_latest(channel.levels[priority] if channel else (),
+                                                      message_name, frame):
+                return True
+            if self._count >= self.maxsize and not self._closed:
+                # With drop_oldest, frames of the same priority can be evicted too; a frame
+                # that would only evict more important ones is dropped instead of waiting
+                floor = priority - 1 if self.drop_oldest else priority
+                if not self._evict_below(floor):
+                    if self.drop_oldest:
+                        timeout = 0
+                    if not self._cond.wait_for(lambda: self._closed or self._count < self.maxsize, timeout):
+                        return False
+            if self._closed:
+                return False
+            channel = channel or self._add_channel(frame[0])
+            channel.levels[priority].append(frame)
+            self._count += 1
+            self._cond.notify_all()
+            return True
+
+    def _evict_below(self, priority: int) -> bool:
+        """Drops the oldest frame of the least important level below `priority`."""
+        for level in range(self.levels - 1, priority, -1):
+            for channel in self._channel_order:
+                if channel.levels[level]:
+                    self._discard(channel.levels[level].popleft())
+                    self._count -= 1
+                    self.evicted += 1
+                    return True
+        return False
+
+    def _highest_level(self) -> int | None:
+        for level in range(self.levels):
+            for channel in self._channel_order:
+                if channel.levels[level]:
+                    return level
+        return None
+
+    def _next_queue(self) -> tuple[_MuxChannel, deque[bytes]] | None:
+        """
+        Returns the channel and level queue whose first frame is sent next, in
+        priority and deficit round robin order, or None if the queue is empty.
+        Only advances the round robin, so calling it again before popping
+        returns the same queue.
+        """
+        level = self._highest_level()
+        if level is None:
+            return None
+        channels = self._channel_order
+        while True:
+            channel = channels[self._rr_index]
+            queue = channel.levels[level]
+            if queue:
+                if self._rr_fresh:
+                    channel.deficit += self.QUANTUM_BYTES * channel.weight
+                    self._rr_fresh = False
+                if len(queue[0]) <= channel.deficit:
+                    return channel, queue
+            else:
+                channel.deficit = 0
+            self._rr_index = (self._rr_index + 1) % len(channels)
+            self._rr_fresh = True
+
+    def _pop_next(self) -> bytes | None:
+        """Pops the next frame in priority and deficit round robin order."""
+        found = self._next_queue()
+        if found is None:
+            return None
+        channel, queue = found
+        frame = queue.popleft()
+        channel.deficit -= len(frame)
+        self._count -= 1
+        return frame
+
+    def get_batch(self, timeout: float | None = None, max_bytes: int | None = None) -> list[bytes]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._count, timeout)
+            batch = []
+            size = 0
+            while self._count:
+                # Like FrameQueue: at least one frame, then only frames that fit in max_bytes
+                if batch and max_bytes is not None and size + len(self._next_queue()[1][0]) > max_bytes:
+                    break
+                frame = self._pop_next()
+                batch.append(frame)
+                size += len(frame)
+            self._cond.notify_all()
+            return batch
+
 class SlipTransport(BaseTransport):
-    """Implements sending of MAVLink bytes framed with SLIP over serial."""
-    def __init__(self, port: str, mux_address: int, baudrate: int = 115200, timeout: float = 0):
-        super().__init__(port, baudrate, timeout)
+    """
+    Implements sending of MAVLink bytes framed with SLIP over serial.
+
+    Messages are sent to `mux_address` unless `message_routes` maps their type
+    to another MUX address. With the writer thread enabled, frames are queued
+    in a MuxFrameQueue: message types are ranked by `priorities` (0 = most
+    important) and MUX channels share the link according to `channel_weights`.
+    """
+    def __init__(self, port: str, mux_address: int, baudrate: int = 115200, timeout: float = 0,
+                 writer_thread: bool = False, queue_size: int = 256, batch_ms: float | None = None,
+                 priorities: dict[str, int] | None = None, message_routes: dict[str, int] | None = None,
+                 channel_weights: dict[int, int] | None = None):
+        super().__init__(port, baudrate, timeout, writer_thread, queue_size, batch_ms)
         self.mux_address = mux_address
 
-    def write_packet(self, raw_mavlink_packet: bytes, message_name: str = "MAVLink Message"):
-        if not self.dev or not self.dev.is_open:
-            raise IOError("Serial device is not open.")
-        
-        slip_encoded_packet = Slip.encode(raw_mavlink_packet)
-        final_packet = bytes([self.mux_address]) + slip_encoded_packet
-        
-        hex_dump(message_name, final_packet)
-        self.dev.write(final_packet)
-        self.dev.flush()
\ No newline at end of file
+        self.priorities = priorities or {}
+        self.channel_weights = channel_weights or {mux_address: 1}
+        # Message type -> MUX address for messages not sent to the default address
+        self.message_routes = message_routes or {}
+
+        self._decoder = SlipDecoder()
+        # Receivers for frames addressed to other MUX addresses, keyed by address
+        self.mux_handlers: dict[int, Callable[[bytes], None]] = {}
+
+    def _create_queue(self) -> FrameQueue:
+        return MuxFrameQueue(self.queue_size, self.priorities, self.channel_weights)
+
+    def encode_frame(self, raw_mavlink_packet: bytes, message_name: str = "") -> bytes:
+        """Writes the MUX address and the SLIP-encoded packet into a pooled buffer."""
+        buf = self.pool.acquire()
+        buf[0] = self.mux_address
+        if self.message_routes:
+            buf[0] = self.message_routes.get(message_name.split(" ", 1)[0], self.mux_address)
+        end = Slip.encode_into(raw_mavlink_packet, buf, 1)
+        return memoryview(buf)[:end]
+
+    def add_mux_handler(self, mux_address: int, callback: Callable[[bytes], None]):
+        """Registers a receiver for the decoded payload of frames sent to another MUX address."""
+        self.mux_handlers[mux_address] = callback
+
+    def decode_received(self, data: bytes) -> list[bytes]:
+        """Returns the MAVLink payloads of frames addressed to our MUX address."""
+        packets = []
+        for mux_address, payload in self._decoder.feed(data):
+            if mux_address == self.mux_address:
+                packets.append(payload)
+            else:
+                handler = self.mux_handlers.get(mux_address)
+                if handler is not None:
+                    handler(payload)
+        return packets